@@ -0,0 +1,105 @@
+#!/usr/bin/python
+"""Benchmark partition codecs on tick files.
+
+Reports compression ratio and compress/decompress throughput (MB/s of
+uncompressed text) for each codec and level.
+
+Command line arguments:
+--codecs : codecs to test (none gzip bz2 lzma)
+--levels : compression levels to test (1 6 9)
+--repeat : number of timed repetitions (3)
+files : tks files of any codec
+
+"""
+
+import argparse
+import time
+
+import tick_codecs
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+
+def benchmark(data, codec, level, repeat):
+    """
+    Return tuple of ratio, compress MB/s, and decompress MB/s for data
+    compressed with codec at level, best of repeat runs.
+
+    """
+    size = float(len(data))
+    best_compress = best_decompress = None
+    for i in range(repeat):
+        start = time.time()
+        packed = tick_codecs.compress(data, codec, level)
+        elapsed = time.time() - start
+        if best_compress is None or elapsed < best_compress:
+            best_compress = elapsed
+        start = time.time()
+        tick_codecs.decompress(packed, codec)
+        elapsed = time.time() - start
+        if best_decompress is None or elapsed < best_decompress:
+            best_decompress = elapsed
+    megabytes = size / 2 ** 20
+    return (size / max(len(packed), 1),
+            megabytes / max(best_compress, 1e-9),
+            megabytes / max(best_decompress, 1e-9))
+
+
+def read_data(files):
+    """Return uncompressed text of all files."""
+    values = []
+    for i in files:
+        values.extend(tick_codecs.read_lines(i))
+    return '\n'.join(values) + '\n'
+
+
+def set_parser():
+    """Return parser for command line arguments."""
+    values = argparse.ArgumentParser(description='Benchmark tks codecs.')
+    values.add_argument('--codecs',
+                        default=['none', 'gzip', 'bz2', 'lzma'],
+                        dest='codecs',
+                        help='Space-separated names (default: %(default)s)',
+                        nargs='+')
+    values.add_argument('--levels',
+                        default=[1, 6, 9],
+                        dest='levels',
+                        help='Space-separated levels (default: %(default)s)',
+                        nargs='+',
+                        type=int)
+    values.add_argument('--repeat',
+                        default=3,
+                        dest='repeat',
+                        type=int,
+                        help='Timed repetitions (default: %(default)s)')
+    values.add_argument('files',
+                        help='tks files to compress',
+                        nargs='+')
+    return values
+
+
+def main():
+    """Print ratio and MB/s for each codec and level."""
+    args = set_parser().parse_args()
+    data = read_data(args.files)
+    print("{0} files, {1:.1f} MB uncompressed").format(
+        len(args.files), len(data) / float(2 ** 20))
+    print("{0:<6} {1:>5} {2:>7} {3:>10} {4:>10}").format(
+        'codec', 'level', 'ratio', 'comp MB/s', 'decomp MB/s')
+    for codec in args.codecs:
+        try:
+            codec = tick_codecs.check_codec(codec)
+        except ValueError as err:
+            print("{0:<6} skipped: {1}").format(codec, err)
+            continue
+        levels = [None] if codec == 'none' else args.levels
+        for level in levels:
+            ratio, comp, decomp = benchmark(data, codec, level, args.repeat)
+            print("{0:<6} {1:>5} {2:>7.2f} {3:>10.1f} {4:>10.1f}").format(
+                codec, '-' if level is None else level, ratio, comp, decomp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/python
+"""Benchmark the tick text parser against numpy.loadtxt.
+
+Reports rows per second parsing the uncompressed text of the given
+files with numpy.loadtxt and with tick_text, and checks that both
+give the same rows.
+
+Command line arguments:
+--repeat : number of timed repetitions (3)
+files : tks files of any codec
+
+"""
+
+import StringIO
+import argparse
+import time
+
+import numpy
+
+import tick_binary
+import tick_codecs
+import tick_text
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+
+def parse_loadtxt(data):
+    """Return structured array for text data parsed with loadtxt."""
+    return numpy.loadtxt(StringIO.StringIO(data),
+                         dtype=tick_binary.RECORDTYPE, ndmin=1)
+
+
+def parse_text(data):
+    """Return structured array for text data parsed with tick_text."""
+    return tick_text.read(StringIO.StringIO(data), tick_binary.RECORDTYPE)
+
+
+def benchmark(data, parser, repeat):
+    """Return tuple of rows and best of repeat times parsing data."""
+    best = None
+    for i in range(repeat):
+        start = time.time()
+        values = parser(data)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return values, best
+
+
+def read_data(files):
+    """Return uncompressed text of all files."""
+    values = []
+    for i in files:
+        values.extend(tick_codecs.read_lines(i))
+    return '\n'.join(values) + '\n'
+
+
+def set_parser():
+    """Return parser for command line arguments."""
+    values = argparse.ArgumentParser(description='Benchmark tks parsing.')
+    values.add_argument('--repeat',
+                        default=3,
+                        dest='repeat',
+                        type=int,
+                        help='Timed repetitions (default: %(default)s)')
+    values.add_argument('files',
+                        help='tks files to parse',
+                        nargs='+')
+    return values
+
+
+def main():
+    """Print rows per second for loadtxt and tick_text."""
+    args = set_parser().parse_args()
+    data = read_data(args.files)
+    print("{0} files, {1:.1f} MB uncompressed").format(
+        len(args.files), len(data) / float(2 ** 20))
+    print("{0:<10} {1:>10} {2:>10} {3:>12}").format(
+        'parser', 'rows', 'seconds', 'rows/s')
+    results = []
+    for name, parser in [('loadtxt', parse_loadtxt),
+                         ('tick_text', parse_text)]:
+        values, elapsed = benchmark(data, parser, args.repeat)
+        results.append(values)
+        print("{0:<10} {1:>10} {2:>10.3f} {3:>12.0f}").format(
+            name, len(values), elapsed, len(values) / max(elapsed, 1e-9))
+    if not numpy.array_equal(results[0], results[1]):
+        print("Parsers disagree.")
+
+
+if __name__ == '__main__':
+    main()
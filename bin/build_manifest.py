@@ -0,0 +1,97 @@
+#!/usr/bin/python
+"""Build partition manifests for existing ticker plant trees.
+
+Partitions written since manifests were introduced are recorded at
+write time; this rebuilds the manifest of every symbol (or contract)
+tree under the given paths from the partitions themselves.
+
+Command line arguments:
+paths : directories to search recursively for YYYY/MM/DD partitions
+        and packed month or year files
+
+"""
+
+import argparse
+import collections
+import os
+
+import tick_binary
+import tick_layout
+import tick_manifest
+import tick_partition
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+def get_entry(infile):
+    """Return manifest Entry for partition infile."""
+    with open(infile, 'rb') as tmp:
+        data = tmp.read()
+    codec = tick_binary.get_codec(infile)
+    first = last = float('nan')
+    tks = None
+    if data:
+        tks = tick_binary.load_partition(infile)
+    if tks is not None and len(tks):
+        first = tks['timestamp'][0]
+        last = tks['timestamp'][-1]
+    rows = 0 if tks is None else len(tks)
+    return tick_manifest.make_entry(infile, data, first, last, rows, codec)
+
+
+def get_packed_entries(infile, period):
+    """Return manifest entries for the days in packed file infile."""
+    index, data = tick_layout.load_packed(infile)
+    days = [(day, data[first:first + rows])
+            for day, first, rows in index.tolist()]
+    return tick_layout.get_entries(tick_layout.get_tree_path(infile, period),
+                                   infile, days, period)
+
+
+def build_manifests(path):
+    """Rebuild manifests for all trees under path, return tree count."""
+    trees = collections.defaultdict(list)
+    for dirname, dirs, files in os.walk(path):
+        dirs.sort()
+        # Packed files sit above day directories, so days override them.
+        for name in sorted(files):
+            for period, suffix in tick_layout.SUFFIXES.items():
+                if name.endswith(suffix):
+                    infile = os.path.join(dirname, name)
+                    trees[tick_layout.get_tree_path(infile, period)].extend(
+                        get_packed_entries(infile, period))
+        if not tick_partition.is_day_path(dirname):
+            continue
+        # One partition per symbol and day: the one readers use.
+        symbols = set(tick_binary.get_symbol(name) for name in files
+                      if tick_binary.is_partition(name))
+        for symbol in sorted(symbols):
+            infile = tick_binary.find_partition(dirname, symbol)
+            trees[tick_manifest.get_tree_path(infile)].append(
+                get_entry(infile))
+    for tree, entries in trees.items():
+        tick_writer.write_manifest(tree, entries)
+    return len(trees)
+
+
+def set_parser():
+    """Return parser for command line arguments."""
+    values = argparse.ArgumentParser(description='Build tick manifests.')
+    values.add_argument('paths',
+                        help='Directories to search',
+                        nargs='+')
+    return values
+
+
+def main(argv=None):
+    """Build manifests under each path."""
+    args = set_parser().parse_args(argv)
+    for path in args.paths:
+        count = build_manifests(path)
+        print("Built {0} manifests under {1}.").format(count, path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+#!/usr/bin/python
+"""Convert ticker plant partitions between text, binary and block formats.
+
+Command line arguments:
+--to : output format (binary, blocks, or text)
+--codec : codec for text or block output (none, gzip, bz2, or lzma)
+--level : compression level for text or block output
+--block-rows : rows per independently compressed block
+--remove : remove source partition after conversion
+paths : directories to convert, searched recursively
+
+"""
+
+import argparse
+import os
+
+import tick_binary
+import tick_blocks
+import tick_codecs
+import tick_partition
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+
+def get_format(name):
+    """Return format (binary, blocks, or text) of partition file name."""
+    codec = tick_binary.get_codec(name)
+    if codec in ['binary', 'blocks']:
+        return codec
+    return 'text'
+
+
+def convert_file(infile, to, **kwargs):
+    """
+    Convert partition infile to format to, return manifest Entry for
+    the partition written or None if infile is already in that format.
+
+    """
+    codec = kwargs.get('codec', None)
+    level = kwargs.get('level', None)
+    dirs = kwargs.get('dirs', None)
+    dirname, name = os.path.split(infile)
+    if get_format(name) == to:
+        return None
+    symbol = tick_binary.get_symbol(name)
+    options = {'dirs': dirs}
+    if to == 'binary':
+        outfile = tick_binary.get_filename(symbol)
+    elif to == 'blocks':
+        outfile = tick_blocks.get_filename(symbol)
+        options.update(codec=codec or tick_blocks.CODEC, level=level,
+                       block_rows=kwargs.get('block_rows',
+                                             tick_blocks.BLOCK_ROWS))
+    else:
+        outfile = tick_codecs.get_filename(symbol, codec or 'none')
+        options.update(codec=codec or 'none', level=level)
+    return tick_writer.write_array(os.path.join(dirname, outfile),
+                                   tick_binary.load_partition(infile),
+                                   **options)
+
+
+def convert_tree(path, to, **kwargs):
+    """Convert all partitions under path, return count converted."""
+    remove = kwargs.pop('remove', False)
+    kwargs['dirs'] = set()
+    entries = []
+    for dirname, dirs, files in os.walk(path):
+        dirs.sort()
+        if not tick_partition.is_day_path(dirname):
+            continue
+        for name in sorted(files):
+            if not tick_binary.is_partition(name):
+                continue
+            infile = os.path.join(dirname, name)
+            entry = convert_file(infile, to, **kwargs)
+            if entry is not None:
+                entries.append(entry)
+                if remove and entry.path != os.path.abspath(infile):
+                    os.remove(infile)
+        tick_writer.sync_dirs(kwargs['dirs'])
+    tick_writer.update_manifest(entries)
+    return len(entries)
+
+
+def set_parser():
+    """Return parser for command line arguments."""
+    values = argparse.ArgumentParser(description='Convert tick partitions.')
+    values.add_argument('--to',
+                        choices=['binary', 'blocks', 'text'],
+                        default='binary',
+                        dest='to',
+                        help='One of: %(choices)s (default: %(default)s)')
+    values.add_argument('--codec',
+                        choices=['none', 'gzip', 'zlib', 'bz2', 'lzma'],
+                        default=None,
+                        dest='codec',
+                        help='Codec for text or block output (default: '
+                             'none for text, gzip for blocks)')
+    values.add_argument('--level',
+                        default=None,
+                        dest='level',
+                        type=int,
+                        help='Compression level for text or block output')
+    values.add_argument('--block-rows',
+                        default=tick_blocks.BLOCK_ROWS,
+                        dest='block_rows',
+                        type=int,
+                        help='Rows per block for block output '
+                             '(default: %(default)s)')
+    values.add_argument('--remove',
+                        action='store_true',
+                        default=False,
+                        dest='remove',
+                        help='Remove source partitions after conversion')
+    values.add_argument('paths',
+                        help='Directories to convert',
+                        nargs='+')
+    return values
+
+
+def main(argv=None):
+    """Convert partitions under each path."""
+    args = set_parser().parse_args(argv)
+    for path in args.paths:
+        count = convert_tree(path, args.to, codec=args.codec,
+                             level=args.level, block_rows=args.block_rows,
+                             remove=args.remove)
+        print("Converted {0} partitions under {1}.").format(count, path)
+
+
+if __name__ == '__main__':
+    main()
@@ -6,94 +6,113 @@ Command line arguments:
 --source : data source (ib)
 --start : start date and time (2011-11-01 00:00:00)
 --end : end date and time (2011-11-02 00:00:00)
+--jobs : number of worker processes (1)
+--codec : partition codec (none, gzip, bz2, or lzma)
+--level : compression level
+--dedup : duplicate resolution policy (none, first, last, volume, orders,
+          or merge)
+--partition : partition on UTC days (day) or trading sessions (session)
 
 """
 
 import argparse
-import bisect
-import bz2
 import configobj
 import datetime
+import multiprocessing
 import os
 import sys
 
+import tick_calendar
+import tick_codecs
+import tick_dedup
+import tick_partition
+import tick_session
+import tick_source
+import tick_watermark
+import tick_writer
+
 __author__ = "Todd Minehardt"
 __copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
 __email__ = "todd@bicycletrading.com"
 
 
-def holidays():
-    """Return holiday dates from text file."""
-    infile = os.path.join(os.getenv('BICYCLE_HOME'),
-                          'share/dates/holidays.txt')
-    with open(infile, 'r') as tmp:
-        values = tmp.readlines()
-    values = [i.strip() for i in values]
-    return values
-
-
-HOLIDAYS = holidays()
-
-
-def check_date(date):
-    """
-    Returns True if date is not a Saturday or Sunday or
-    holiday, False otherwise.
-
-    """
-    if (date.weekday() < 5) and (date.strftime('%Y-%m-%d') not in HOLIDAYS):
-        return True
-    return False
-
-
-def create_tks_files(config, options):
+def create_tks_files(config, args):
     """Read source files, write tks files."""
-    group = options.parse_args().group
-    source = options.parse_args().source
-    start = options.parse_args().start
-    end = options.parse_args().end
+    group = args.group
+    source = args.source
+    start = args.start
+    end = args.end
+    jobs = args.jobs
+    codec = args.codec
+    level = args.level
+    dedup = args.dedup
+    partition = args.partition
     start = datetime.datetime.strptime(start, '%Y-%m-%d %H:%M:%S')
     end = datetime.datetime.strptime(end, '%Y-%m-%d %H:%M:%S')
     srcdir = config[group]['root']  # like /home/bicycle/tmp/futures
+    # Codec and level are set per plant in config.ini unless given.
+    if codec is None:
+        codec = config[group].get('codec', tick_codecs.DEFAULT)
+    if level is None:
+        level = config[group].get('level', None)
+    if dedup is None:
+        dedup = config[group].get('dedup', 'none')
+    if partition is None:
+        partition = config[group].get('partition', 'day')
+    codec = tick_codecs.check_codec(codec)
     exchanges = set_exchanges(config, group, source)
+    # Exchanges without a session are partitioned on UTC days. Sessions
+    # are read here once; workers inherit them.
+    tick_session.set_sessions(tick_session.read_sessions(config))
+    sessions = {}
+    if partition == 'session':
+        sessions = tick_session.SESSIONS
+    # Collect one task per symbol (equities, fx) or contract (futures).
+    tasks = []
     if group == 'futures':
         symbols = set_symbols(config, group, source)
         for exchange in exchanges:
             expiry = get_expiry(srcdir, symbols[exchange])
             for symbol in expiry.keys():  # filters-out unlisted symbols
                 for contract in expiry[symbol]:
-                    data = read_tks_file(srcdir, symbol, contract=contract)
                     path = os.path.join(os.getenv('TICKS_HOME'), group,
                                         source, exchange, symbol, contract)
-                    print("Writing ticks for {0}{1}...").format(symbol,
-                                                                contract)
-                    write_tks_file(start, end, symbol, data, path)
+                    tasks.append((start, end, srcdir, exchange, symbol,
+                                  contract, path, codec, level, dedup,
+                                  sessions.get(exchange)))
     else:
         symbols = get_symbols(srcdir)
         for exchange in exchanges:
             for symbol in symbols:
-                data = read_tks_file(srcdir, symbol)
                 path = os.path.join(os.getenv('TICKS_HOME'), group, source,
                                     exchange, symbol)
-                print("Writing ticks for {0}...").format(symbol)
-                write_tks_file(start, end, symbol, data, path)
-    return
+                tasks.append((start, end, srcdir, exchange, symbol, "",
+                              path, codec, level, dedup,
+                              sessions.get(exchange)))
+    failed = run_tasks(tasks, jobs)
+    for label, error in failed:
+        print("Failed writing ticks for {0}: {1}").format(label, error)
+    return failed
 
 
-def find_ge(values, threshold):
-    """Return index for leftmost value => threshold."""
-    i = bisect.bisect_left(values, threshold)
-    if i != len(values):
-        return i
-    raise ValueError
-
+def create_tks_task(task):
+    """
+    Read source file and write tks files for one (symbol, contract)
+    task. Return tuple of label and error string (None on success).
 
-def find_le(values, threshold):
-    """Return index for rightmost value > threshold."""
-    i = bisect.bisect_right(values, threshold)
-    if i:
-        return i
-    raise ValueError
+    """
+    (start, end, srcdir, exchange, symbol, contract, path, codec, level,
+     dedup, session) = task
+    label = symbol + contract
+    try:
+        data = read_tks_file(srcdir, symbol, contract=contract)
+        write_tks_file(start, end, symbol, data, path,
+                       codec=codec, level=level, dedup=dedup,
+                       calendar=tick_calendar.get_calendar(exchange),
+                       session=session)
+    except (Exception, SystemExit) as err:
+        return label, repr(err)
+    return label, None
 
 
 def get_expiry(srcdir, symbols):
@@ -106,27 +125,6 @@ def get_expiry(srcdir, symbols):
     return values
 
 
-def get_subset(values, threshold):
-    """
-    Return subset of values, indexed on first column, for a given threshold.
-
-    Start time is set as threshold: year, month, day, 0, 0, 0.
-    End time is set as threshold: year, month, day + 1 day, 0, 0, 0.
-
-    """
-    subset = []
-    index = [datetime.datetime.utcfromtimestamp(float(i.split()[0]))
-             for i in values]
-    s_time = datetime.datetime.combine(threshold, datetime.time(0, 0, 0))
-    s_indx = find_ge(index, s_time)
-    e_time = datetime.datetime.combine(threshold +
-                                       datetime.timedelta(days=1),
-                                       datetime.time(0, 0, 0))
-    e_indx = find_le(index, e_time)
-    subset = values[s_indx:e_indx]
-    return subset
-
-
 def get_symbols(srcdir):
     """Get symbols for which tks files are non-zero length."""
     values = []
@@ -170,12 +168,43 @@ def get_exchanges_symbols(config, group, source):
 
 
 def read_tks_file(srcdir, symbol, **kwargs):
-    """Read tks file, return list sorted on timestamp. """
+    """
+    Return iterator of (timestamp, line) records from tks file, sorted
+    on full numeric timestamp in bounded memory.
+
+    """
     contract = kwargs.get('contract', "")
     infile = os.path.join(srcdir, symbol + contract + '.tks')
     if os.path.isfile(infile) and os.path.getsize(infile):
-        values = read_file(srcdir, symbol + contract + '.tks')
-    return sorted(values, key=lambda x: x[0])
+        return tick_source.iter_sorted(infile)
+    return iter([])
+
+
+def run_tasks(tasks, jobs):
+    """
+    Run create_tks_task over tasks on jobs processes (serially if jobs
+    is 1), printing progress. Return list of (label, error) failures.
+
+    """
+    if jobs > 1:
+        pool = multiprocessing.Pool(jobs)
+        results = pool.imap_unordered(create_tks_task, tasks)
+    else:
+        pool = None
+        results = (create_tks_task(i) for i in tasks)
+    failed = []
+    try:
+        for count, (label, error) in enumerate(results, 1):
+            status = 'done' if error is None else 'failed'
+            print("[{0}/{1}] Writing ticks for {2}... {3}").format(
+                count, len(tasks), label, status)
+            if error is not None:
+                failed.append((label, error))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return failed
 
 
 def set_exchanges(config, group, source):
@@ -210,28 +239,39 @@ def set_parser():
                         dest='end',
                         help='Date string format %%Y-%%m-%%d %%H:%%M:%%S '
                              '(default: %(default)s)')
+    values.add_argument('--jobs',
+                        default=1,
+                        dest='jobs',
+                        type=int,
+                        help='Number of worker processes '
+                             '(default: %(default)s)')
+    values.add_argument('--codec',
+                        choices=['none', 'gzip', 'zlib', 'bz2', 'lzma'],
+                        default=None,
+                        dest='codec',
+                        help='Partition codec, one of: %(choices)s '
+                             '(default: codec in config.ini, else bz2)')
+    values.add_argument('--level',
+                        default=None,
+                        dest='level',
+                        type=int,
+                        help='Compression level (default: level in '
+                             'config.ini, else codec default)')
+    values.add_argument('--dedup',
+                        choices=['none'] + tick_dedup.POLICIES,
+                        default=None,
+                        dest='dedup',
+                        help='Duplicate resolution policy (default: dedup '
+                             'in config.ini, else none)')
+    values.add_argument('--partition',
+                        choices=['day', 'session'],
+                        default=None,
+                        dest='partition',
+                        help='Partition on UTC days or trading sessions '
+                             '(default: partition in config.ini, else day)')
     return values
 
 
-def set_start_end(start, end, data):
-    """
-    Return tuple of start/end date modifed if data first (last)
-    date is after (before) start (end) date given by user.
-
-    """
-    first = datetime.datetime.utcfromtimestamp(
-        float(data[0].split()[0])).date()
-    last = datetime.datetime.utcfromtimestamp(
-        float(data[-1].split()[0])).date()
-    start = start.date()
-    end = end.date()
-    if first > start:
-        start = first
-    if last < end:
-        end = last
-    return start, end
-
-
 def set_symbols(config, group, source):
     """Returns dict of symbols keyed on exchanges."""
     values = {}
@@ -248,42 +288,76 @@ def set_symbols(config, group, source):
     return values
 
 
-def write_tks_file(start, end, symbol, data, path):
-    """Write ticks to files with .tks suffix."""
-    # Adjust beginning ('now') and end ('end') if needed.
-    now, then = set_start_end(start, end, data)
-    while now <= then:
-        # Make sure date is not on a weekend or holiday.
-        if check_date(now):
-            # Extract subset of data for this day only.
-            subset = get_subset(data, now)
-            if subset:
-                # Set directory for writing ticks, create if needed.
-                outdir = os.path.join(path,
-                                      '{0:04d}'.format(now.year),
-                                      '{0:02d}'.format(now.month),
-                                      '{0:02d}'.format(now.day))
-                if not os.path.isdir(outdir):
-                    os.makedirs(outdir, 0755)
-                    tks = os.path.join(outdir, symbol + '.tks.bz2')
-                    # if not os.path.isfile(tks):
-                    #    outfile = bz2.BZ2File(tks, 'wb')
-                    #    try:
-                    #        for i in subset:
-                    #            outfile.write(i + '\n')
-                    #    finally:
-                    #        outfile.close()
-                    outfile = bz2.BZ2File(tks, 'wb')
-                    try:
-                        for i in subset:
-                            outfile.write(i + '\n')
-                    finally:
-                        outfile.close()
-        now += datetime.timedelta(days=1)
+def write_tks_file(start, end, symbol, data, path, **kwargs):
+    """
+    Write ticks to files with .tks suffix plus codec extension. data is
+    an iterable of (timestamp, line) records sorted on timestamp.
+
+    Only ticks after the high-water mark for path are written; the
+    day holding the mark is merged with its existing partition. The
+    mark only moves if start through end holds every tick after it,
+    so ticks outside a limited window are written by a later run.
+    Rows sharing a timestamp are resolved with policy dedup unless it
+    is none. Only trading days of calendar are written. With a
+    session (a tick_session.Session), partitions hold trading sessions
+    instead of UTC days; a tree keeps the partitioning it was first
+    written with.
+
+    """
+    codec = kwargs.get('codec', tick_codecs.DEFAULT)
+    level = kwargs.get('level', None)
+    dedup = kwargs.get('dedup', 'none')
+    calendar = kwargs.get('calendar', tick_calendar.get_calendar())
+    session = kwargs.get('session', None)
+    mark = tick_watermark.get_watermark(path)
+    if mark is not None and tick_session.get_tree_session(path) != session:
+        raise ValueError("{0} is partitioned differently; rebuild it to "
+                         "change its partitions.".format(path))
+    mark_day = tick_watermark.get_watermark_day(mark, session)
+    get_day = tick_partition.get_day
+    if session is not None:
+        tick_session.set_tree_session(path, session)
+        get_day = lambda x: tick_session.get_session_day(x, session)
+    last = mark
+    dirs = set()
+    entries = []
+    seen = {}
+    records = tick_watermark.track_records(
+        tick_watermark.filter_records(data, mark), seen)
+    # Walk records once, one subset per trading day between start and end.
+    for now, subset in tick_partition.iter_record_days(records, start, end,
+                                                       calendar=calendar,
+                                                       get_day=get_day):
+        # Set directory for writing ticks, create if needed.
+        outdir = tick_partition.get_day_path(path, now)
+        if not os.path.isdir(outdir):
+            tick_partition.make_dirs(outdir)
+        tks = os.path.join(outdir, tick_codecs.get_filename(symbol, codec))
+        existing = tick_codecs.find_tks(outdir, symbol)
+        # Complete the partial day holding the high-water mark, which
+        # may be held in a packed file or a binary partition.
+        if now == mark_day:
+            subset = tick_watermark.merge_lines(
+                tick_watermark.get_day_lines(path, symbol, now), subset,
+                mark)
+        if dedup != 'none':
+            subset = tick_dedup.resolve_lines(subset, dedup)[0]
+        entries.append(tick_writer.write_lines(tks, subset, codec=codec,
+                                               level=level, dirs=dirs))
+        # Drop a partition left behind in a different codec.
+        if existing is not None and existing != tks:
+            os.remove(existing)
+        last = float(subset[-1].split(None, 1)[0])
+    # Make renames durable before moving the high-water mark.
+    tick_writer.sync_dirs(dirs)
+    tick_writer.update_manifest(entries)
+    if last is not None and last != mark and tick_watermark.in_window(
+            seen.get('first'), seen.get('last'), start, end, get_day):
+        tick_watermark.set_watermark(path, last)
     return
 
 
-def main():
+def main(argv=None):
     """
     Creates ticker plant directories and populates
     appropriate directories therein.
@@ -292,9 +366,11 @@ def main():
     # Read configuration file, parse command line arguments.
     config = configobj.ConfigObj(os.path.join(os.getenv('BICYCLE_HOME'),
                                               'config.ini'))
-    parser = set_parser()
+    args = set_parser().parse_args(argv)
 
-    create_tks_files(config, parser)
+    # Exit non-zero if any symbol or contract failed.
+    if create_tks_files(config, args):
+        sys.exit(1)
 
 
 if __name__ == '__main__':
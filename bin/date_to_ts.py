@@ -8,52 +8,174 @@ TIMESTAMP OPEN HIGH LOW CLOSE VOLUME COUNT VWAP GAPS
 where TIMESTAMP, OPEN, HIGH, LOW, CLOSE, and VWAP are
 type float and VOLUME, GAPS, and COUNT are type int.
 
+Input lines are parsed in chunks into arrays and timestamps are
+converted in bulk. Many input files may be given; they are converted
+in parallel.
+
+Command line arguments:
+--jobs : number of worker processes (1)
+--format : output format, text or npy (text)
+--outdir : write one output file per input file to this directory
+files : mysqldump files
+
 """
 
-import calendar
+import argparse
+import itertools
+import multiprocessing
+import os
 import sys
-import time
+
+import numpy
+
+import tick_binary
 
 __author__ = "Todd Minehardt"
 __copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
 __email__ = "todd@bicycletrading.com"
 
+CHUNK_SIZE = 500000
+FIELDS = 10
+TEXT_FORMAT = '%f %f %f %f %f %d %d %f %d'
+
+
+def convert_lines(lines):
+    """
+    Return array of tick recordtype for mysqldump lines, columns
+    DATE TIME OPEN HIGH LOW CLOSE VOLUME VWAP GAPS COUNT. A line
+    without exactly those fields raises ValueError.
+
+    """
+    rows = [i.split() for i in lines]
+    bad = [i for i, j in enumerate(rows) if len(j) != FIELDS]
+    if bad:
+        raise ValueError("{0} lines without {1} fields, first: {2!r}".format(
+            len(bad), FIELDS, lines[bad[0]].strip()))
+    tokens = numpy.array(rows, dtype=str).reshape(-1, FIELDS)
+    values = numpy.empty(len(tokens), dtype=tick_binary.RECORDTYPE)
+    stamps = numpy.core.defchararray.add(
+        numpy.core.defchararray.add(tokens[:, 0], ' '), tokens[:, 1])
+    values['timestamp'] = stamps.astype('datetime64[s]').astype(numpy.int64)
+    values['open'] = tokens[:, 2].astype(numpy.float64)
+    values['high'] = tokens[:, 3].astype(numpy.float64)
+    values['low'] = tokens[:, 4].astype(numpy.float64)
+    values['close'] = tokens[:, 5].astype(numpy.float64)
+    values['volume'] = tokens[:, 6].astype(numpy.int64)
+    values['vwap'] = tokens[:, 7].astype(numpy.float64)
+    values['gaps'] = tokens[:, 8].astype(numpy.int64) != 0
+    values['orders'] = tokens[:, 9].astype(numpy.int64)
+    return values
+
 
-def date_to_ts(date):
+def format_ticks(values):
+    """Return tks text for array of tick recordtype."""
+    if not len(values):
+        return ''
+    return '\n'.join(TEXT_FORMAT % i for i in values.tolist()) + '\n'
+
+
+def convert_chunk(lines):
+    """Return tks text for a chunk of mysqldump lines."""
+    return format_ticks(convert_lines(lines))
+
+
+def iter_chunks(infile, size=CHUNK_SIZE):
+    """Yield lists of at most size non-blank lines from infile."""
+    with open(infile, 'r') as tmp:
+        lines = (i for i in tmp if i.strip())
+        while True:
+            chunk = list(itertools.islice(lines, size))
+            if not chunk:
+                break
+            yield chunk
+
+
+def convert_file(task):
     """
-    Return UNIX timestamp from UTC timestamp string as
-    returned from a mysqldump.
+    Convert mysqldump file infile to outfile in format (text or npy).
+    Return infile.
 
     """
-    t_struct = time.strptime(date, '%Y-%m-%d %H:%M:%S')
-    t_int = calendar.timegm(t_struct)
-    return float(t_int)
+    infile, outfile, fmt = task
+    if fmt == 'npy':
+        chunks = [convert_lines(i) for i in iter_chunks(infile)]
+        if chunks:
+            values = numpy.concatenate(chunks)
+        else:
+            values = numpy.zeros(0, dtype=tick_binary.RECORDTYPE)
+        numpy.save(outfile, values)
+    else:
+        with open(outfile, 'w') as output:
+            for chunk in iter_chunks(infile):
+                output.write(convert_chunk(chunk))
+    return infile
+
+
+def get_outfile(outdir, infile, fmt):
+    """Return output path in outdir for infile in format fmt."""
+    name = os.path.splitext(os.path.basename(infile))[0]
+    return os.path.join(outdir, name + ('.npy' if fmt == 'npy' else '.tks'))
+
+
+def set_parser():
+    """Return parser for command line arguments."""
+    values = argparse.ArgumentParser(description='Convert mysqldump files '
+                                                 'to tks format.')
+    values.add_argument('--jobs',
+                        default=1,
+                        dest='jobs',
+                        type=int,
+                        help='Number of worker processes '
+                             '(default: %(default)s)')
+    values.add_argument('--format',
+                        choices=['text', 'npy'],
+                        default='text',
+                        dest='format',
+                        help='One of: %(choices)s (default: %(default)s)')
+    values.add_argument('--outdir',
+                        default=None,
+                        dest='outdir',
+                        help='Write one file per input file here '
+                             '(default: stdout, text only)')
+    values.add_argument('files',
+                        help='mysqldump files',
+                        nargs='+')
+    return values
 
 
 def main():
-    """Read old-type files and write new-type to stdout."""
-    with open(sys.argv[1], 'r') as infile:
-        for line in infile:
-            t_stamp = date_to_ts(line.split()[0] + ' ' + line.split()[1])
-            open_price = float(line.split()[2])
-            high_price = float(line.split()[3])
-            low_price = float(line.split()[4])
-            close_price = float(line.split()[5])
-            volume = line.split()[6]
-            vwap = float(line.split()[7])
-            gaps = line.split()[8]
-            count = line.split()[9]
-            print('{0:0f} {1:0f} {2:0f} {3:0f} {4:0f} '
-                  '{5} {6} {7:0f} {8}').format(
-                  t_stamp,
-                  open_price,
-                  high_price,
-                  low_price,
-                  close_price,
-                  volume,
-                  count,
-                  vwap,
-                  gaps)
+    """Read old-type files and write new-type to stdout or outdir."""
+    args = set_parser().parse_args()
+    if args.outdir is None and args.format == 'npy':
+        set_parser().error('--format npy requires --outdir')
+    pool = None
+    if args.jobs > 1:
+        pool = multiprocessing.Pool(args.jobs)
+    mapper = pool.map if pool is not None else map
+    try:
+        if args.outdir is None:
+            # Convert jobs chunks at a time in parallel, write in order.
+            chunks = itertools.chain.from_iterable(
+                iter_chunks(i) for i in args.files)
+            while True:
+                batch = list(itertools.islice(chunks, max(args.jobs, 1)))
+                if not batch:
+                    break
+                for text in mapper(convert_chunk, batch):
+                    sys.stdout.write(text)
+        else:
+            tasks = [(i, get_outfile(args.outdir, i, args.format),
+                      args.format) for i in args.files]
+            if pool is not None:
+                results = pool.imap_unordered(convert_file, tasks)
+            else:
+                results = (convert_file(i) for i in tasks)
+            for infile in results:
+                sys.stderr.write("Converted {0}\n".format(infile))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
 
 
 if __name__ == '__main__':
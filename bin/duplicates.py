@@ -3,80 +3,22 @@
 
 import argparse
 import bisect
-import collections
 import datetime
-import numpy
 import os
 
+import tick_binary
+import tick_calendar
+import tick_codecs
+import tick_dedup
+import tick_manifest
+import tick_scan
+import tick_writer
+
 __author__ = "Todd Minehardt"
 __copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
 __email__ = "todd@bicycletrading.com"
 
 
-class Holiday(object):
-    """Holidays class."""
-    infile = os.path.join(os.getenv('BICYCLE_HOME'),
-                                    'share/dates/holidays.txt')
-    with open(infile, 'r') as tmp:
-        values = tmp.readlines()
-    values = [i.strip() for i in values]
-    holidays = values
-
-
-HOLIDAYS = Holiday.holidays
-
-
-def check_date(date):
-    """
-    Returns True if date is weekday/non-holiday, False otherwise. Expects
-    date as type(datetime.datetime).
-
-    """
-    # Ensure that date is not a Saturday, Sunday, or holiday.
-    if (date.weekday() < 5) and (date.strftime('%Y-%m-%d') not in HOLIDAYS):
-        return True
-    else:
-        return False
-
-
-def remove_duplicates(root, **kwargs):
-    """Remove duplicate rows in tks files, write new file."""
-    exchange = kwargs.get('exchange', "")
-    expiry = kwargs.get('expiry', "")
-    symbol = kwargs.get('symbol', "")
-    cwd = os.path.join(root, exchange, symbol, expiry)
-    recordtype = ([('timestamp', float), ('open', float), ('high', float),
-                   ('low', float), ('close', float), ('volume', int),
-                   ('orders', int), ('vwap', float), ('gaps', bool)])
-    for year in os.listdir(cwd):
-        for month in os.listdir(os.path.join(cwd, year)):
-            for day in os.listdir(os.path.join(cwd, year, month)):
-                infile = os.path.join(cwd, year, month, day, symbol + '.tks')
-                if (os.path.isfile(infile) and os.stat(infile).st_size != 0):
-                    tks = numpy.loadtxt(infile, dtype=recordtype)
-                    timestamps = []
-                    if tks.ndim != 0:
-                        timestamps = [tks[i][0] for i in range(len(tks))]
-                        timestamps.sort()
-                        counter = collections.Counter(timestamps)
-                        if bool([i for i in counter.values() if i > 1]):
-                            numpy.savetxt(infile + '.original', tks)
-                            outlist = []
-                            added_keys = set()
-                            for i in tks:
-                                lookup = tuple(i)[:1]
-                                if lookup not in added_keys:
-                                    outlist.append(i)
-                                    added_keys.add(lookup)
-#                            outlist = outlist.tolist()
-#                            with open(infile, 'w') as outfile:
-#                                for i in outlist:
-#                                    outfile.write(str(i) + '\n')
-                            outlist = numpy.asarray(outlist, dtype=recordtype)
-                            numpy.savetxt(infile, outlist)
-    return
-
-
 def find_ge(values, threshold):
     """Return index for leftmost value => threshold."""
     i = bisect.bisect_left(values, threshold)
@@ -95,15 +37,6 @@ def find_le(values, threshold):
         raise ValueError
 
 
-def get_start_end_datetime(data):
-    """Return tuple of start date and time and end time for a data file."""
-    start = datetime.datetime.utcfromtimestamp(
-             data[0][0]).strftime('%Y/%m/%d %H:%M:%S.%f')
-    end = datetime.datetime.utcfromtimestamp(
-           data[-1][0]).strftime('%H:%M:%S.%f')
-    return start, end
-
-
 def get_subset(index, values, threshold):
     """
     Return subset of values for a given threshold by indexing on index.
@@ -141,19 +74,9 @@ def get_tks_datetime(root, **kwargs):
     expiry = kwargs.get('expiry', "")
     symbol = kwargs.get('symbol', "")
     cwd = os.path.join(root, exchange, symbol, expiry)
-    recordtype = ([('timestamp', float), ('open', float), ('high', float),
-                   ('low', float), ('close', float), ('volume', int),
-                   ('orders', int), ('vwap', float), ('gaps', bool)])
-    values = []
-    for year in os.listdir(cwd):
-        for month in os.listdir(os.path.join(cwd, year)):
-            for day in os.listdir(os.path.join(cwd, year, month)):
-                infile = os.path.join(cwd, year, month, day, symbol + '.tks')
-                if (os.path.isfile(infile) and os.stat(infile).st_size != 0):
-                    tks = numpy.loadtxt(infile, dtype=recordtype)
-                    start, end = get_start_end_datetime(tks)
-                    values.append(start + ' ' + end)
-    return values
+    return tick_manifest.get_tks_datetime(
+        tick_scan.get_entries(cwd, symbol, count=False),
+        fmt='%Y/%m/%d %H:%M:%S.%f', end_fmt='%H:%M:%S.%f')
 
 
 def read_file(fname):
@@ -169,28 +92,17 @@ def read_file(fname):
 
 
 def read_tks_files(root, **kwargs):
-    """Read and return tks file as list of lists."""
+    """Return list of structured arrays, one per non-empty tks file."""
     exchange = kwargs.get('exchange', "")
     expiry = kwargs.get('expiry', "")
     symbol = kwargs.get('symbol', "")
     cwd = os.path.join(root, exchange, symbol, expiry)
-    recordtype = ([('timestamp', float), ('open', float), ('high', float),
-                   ('low', float), ('close', float), ('volume', int),
-                   ('orders', int), ('vwap', float), ('gaps', bool)])
     values = []
-    for year in os.listdir(cwd):
-        for month in os.listdir(os.path.join(cwd, year)):
-            for day in os.listdir(os.path.join(cwd, year, month)):
-                infile = os.path.join(cwd, year, month, day, symbol + '.tks')
-                if (os.path.isfile(infile) and os.stat(infile).st_size != 0):
-                    timestamps = []
-                    if tks.ndim != 0:
-                        timestamps = [tks[i][0] for i in range(len(tks))]
-                        timestamps.sort()
-                        counter = collections.Counter(timestamps)
-                        if bool([i for i in counter.values() if i > 1]):
-                            tks = numpy.loadtxt(infile, dtype=recordtype)
-    return tks
+    for partition in tick_scan.scan_tree(cwd, symbol=symbol):
+        if partition.size == 0 or not tick_codecs.is_tks(partition.path):
+            continue
+        values.append(tick_binary.load_text(partition.path))
+    return values
 
 
 def read_ticks_files(root, **kwargs):
@@ -199,29 +111,9 @@ def read_ticks_files(root, **kwargs):
     expiry = kwargs.get('expiry', "")
     symbol = kwargs.get('symbol', "")
     cwd = os.path.join(root, exchange, symbol, expiry)
-    recordtype = ([('timestamp', float), ('open', float), ('high', float),
-                   ('low', float), ('close', float), ('volume', int),
-                   ('orders', int), ('vwap', float), ('gaps', bool)])
-    values = []
-    for year in os.listdir(cwd):
-        for month in os.listdir(os.path.join(cwd, year)):
-            for day in os.listdir(os.path.join(cwd, year, month)):
-                infile = os.path.join(cwd, year, month, day, symbol + '.tks')
-                if (os.path.isfile(infile) and os.stat(infile).st_size != 0):
-                    tks = numpy.loadtxt(infile, dtype=recordtype)
-                    values.append([exchange,
-                                   symbol + expiry,
-                                   year,
-                                   month,
-                                   day,
-                                   datetime.datetime.utcfromtimestamp(
-                                     tks[0][0]).strftime(
-                                     '%Y/%m/%d %H:%M:%S.%f'),
-                                   datetime.datetime.utcfromtimestamp(
-                                     tks[-1][0]).strftime(
-                                     '%Y/%m/%d %H:%M:%S.%f'),
-                                   len(tks)])
-    return values
+    return tick_manifest.get_tks_data(tick_scan.get_entries(cwd, symbol),
+                                      exchange, symbol + expiry,
+                                      fmt='%Y/%m/%d %H:%M:%S.%f')
 
 
 def set_expiry(root, exchanges, symbols):
@@ -263,6 +155,18 @@ def set_parser():
                         dest='end',
                         help='Date string format %%Y-%%m-%%d %%H:%%M:%%S '
                              '(default: %(default)s)')
+    values.add_argument('--policy',
+                        choices=tick_dedup.POLICIES,
+                        default='first',
+                        dest='policy',
+                        help='Duplicate resolution, one of: %(choices)s '
+                             '(default: %(default)s)')
+    values.add_argument('--jobs',
+                        default=1,
+                        dest='jobs',
+                        type=int,
+                        help='Number of trees scanned at a time '
+                             '(default: %(default)s)')
     return values
 
 
@@ -366,71 +270,57 @@ def show_missing_data(root, exchanges, symbols, **kwargs):
     return missing
 
 
-def write_ticks(start, end, symbol, data, path):
-    """Write ticks to files with .tks suffix."""
+def write_ticks(start, end, symbol, data, path, **kwargs):
+    """Write ticks to files with .tks suffix, one per trading day."""
+    calendar = kwargs.get('calendar', tick_calendar.get_calendar())
     # Extract list of timestamps from data.
     timestamps = get_timestamps(data)
-    # Adjust beginning ('now') and end ('end') if needed.
-    now, then = set_start_end(start, end, data)
-    while now <= then:
-        # Make sure date is not on a weekend or holiday.
-        if check_date(now):
-            # Extract subset of data for this day only.
-            subset = get_subset(timestamps, data, now)
-            # Set directory for writing ticks; create if required.
-            outdir = os.path.join(path,
-                                  '{0:04d}'.format(now.year),
-                                  '{0:02d}'.format(now.month),
-                                  '{0:02d}'.format(now.day))
-            if not os.path.isdir(outdir):
-                os.makedirs(outdir, 0755)
-            # Set tks file for output.
-            tks = os.path.join(outdir, symbol + '.tks')
-            # If tks file does not exist or is zero size,
-            # create/append tks file.
-            if not os.path.isfile(tks) or os.stat(tks).st_size == 0:
-                with open(tks, 'a') as outfile:
-                    for i in range(len(subset)):
-                        # Append newline before writing to file.
-                        outfile.write(subset[i] + '\n')
-            now += datetime.timedelta(days=1)
+    # Adjust beginning ('first') and end ('last') if needed.
+    first, last = set_start_end(start, end, data)
+    for now in calendar.trading_dates(first, last):
+        # Extract subset of data for this day only.
+        subset = get_subset(timestamps, data, now)
+        # Set directory for writing ticks; create if required.
+        outdir = os.path.join(path,
+                              '{0:04d}'.format(now.year),
+                              '{0:02d}'.format(now.month),
+                              '{0:02d}'.format(now.day))
+        if not os.path.isdir(outdir):
+            os.makedirs(outdir, 0755)
+        # Set tks file for output.
+        tks = os.path.join(outdir, symbol + '.tks')
+        # If tks file does not exist or is zero size,
+        # create/append tks file.
+        if not os.path.isfile(tks) or os.stat(tks).st_size == 0:
+            tick_writer.update_manifest(
+                [tick_writer.write_lines(tks, subset)])
     return
 
 
-def main():
+def main(argv=None):
     """
     Searches ticker plant directories and outputs
     statistics for what is collected and missing.
 
     """
     # Parse command line arguments, set local variables.
-    parser = set_parser()
-    end = parser.parse_args().end
+    args = set_parser().parse_args(argv)
+    end = args.end
     end = datetime.datetime.strptime(end, '%Y-%m-%d %H:%M:%S')
-    exchanges = parser.parse_args().exchanges
-    group = parser.parse_args().group
-    source = parser.parse_args().source
-    start = parser.parse_args().start
+    exchanges = args.exchanges
+    group = args.group
+    source = args.source
+    start = args.start
     start = datetime.datetime.strptime(start, '%Y-%m-%d %H:%M:%S')
 
     root = os.path.join(os.getenv('TICKS_HOME'), group, source)
-    symbols = set_symbols(root, exchanges)
-
-    if (group == 'futures'):
-        expiry = set_expiry(root, exchanges, symbols)
-
-    for exchange in exchanges:
-        for symbol in symbols[exchange]:
-            if expiry:
-                for expiration in expiry[symbol]:
-                    remove_duplicates(root,
-                                      exchange=exchange,
-                                      symbol=symbol,
-                                      expiry=expiration)
-            else:
-                remove_duplicates(root,
-                                  exchange=exchange,
-                                  symbol=symbol)
+    for (exchange, symbol, contract), partitions in tick_scan.scan_trees(
+            root, exchanges, args.jobs):
+        count = tick_dedup.remove_duplicates(partitions,
+                                             policy=args.policy)
+        if count:
+            print("Removed {0} duplicate rows for {1} {2}.").format(
+                count, exchange, symbol + contract)
 
 
 if __name__ == '__main__':
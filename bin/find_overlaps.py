@@ -0,0 +1,72 @@
+#!/usr/bin/python
+"""Find ticks written more than once across ticker plant partitions.
+
+Command line arguments:
+--group : equities, futures, fx, or indices
+--source : data source
+--exchanges : exchanges to check (default: all)
+--jobs : processes hashing new or changed partitions
+--rebuild : discard the overlap index and hash every partition
+
+One line is printed per finding, KIND COUNT PATH [PATH ...] (see
+tick_overlap.find_overlaps).
+
+"""
+
+import argparse
+import os
+
+import tick_overlap
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+
+def set_parser():
+    """Return parser for command line arguments."""
+    values = argparse.ArgumentParser(description='Find overlapping ticks.')
+    values.add_argument('--group',
+                        choices=['equities', 'futures', 'fx', 'indices'],
+                        default='futures',
+                        dest='group',
+                        help='One of: %(choices)s (default: %(default)s)')
+    values.add_argument('--source',
+                        choices=['ib'],
+                        default='ib',
+                        dest='source',
+                        help='One of: %(choices)s (default: %(default)s)')
+    values.add_argument('--exchanges',
+                        default=None,
+                        dest='exchanges',
+                        help='Space-separated names (default: all)',
+                        nargs='+')
+    values.add_argument('--jobs',
+                        default=1,
+                        dest='jobs',
+                        type=int,
+                        help='Hashing processes (default: %(default)s)')
+    values.add_argument('--rebuild',
+                        action='store_true',
+                        default=False,
+                        dest='rebuild',
+                        help='Hash every partition (default: %(default)s)')
+    return values
+
+
+def main(argv=None):
+    """Update the overlap index of a plant and print its findings."""
+    args = set_parser().parse_args(argv)
+    root = os.path.join(os.getenv('TICKS_HOME'), args.group, args.source)
+    infile = tick_overlap.get_index_file(root)
+    if args.rebuild and os.path.isfile(infile):
+        os.remove(infile)
+    records, count = tick_overlap.update_index(root, args.exchanges,
+                                               args.jobs)
+    print("Hashed {0} of {1} partitions.").format(count, len(records))
+    for i in tick_overlap.find_overlaps(records):
+        print(tick_overlap.format_finding(i))
+
+
+if __name__ == '__main__':
+    main()
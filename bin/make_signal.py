@@ -11,85 +11,20 @@ Command line arguments:
 """
 
 import argparse
-import bisect
 import configobj
 import datetime
 import os
 import sys
 
+import tick_calendar
+import tick_partition
+import tick_writer
+
 __author__ = "Todd Minehardt"
 __copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
 __email__ = "todd@bicycletrading.com"
 
 
-class Holiday(object):
-    """Holidays class."""
-    infile = os.path.join(os.getenv('BICYCLE_HOME'),
-                                    'share/dates/holidays.txt')
-    with open(infile, 'r') as tmp:
-        values = tmp.readlines()
-    values = [i.strip() for i in values]
-    holidays = values
-
-
-HOLIDAYS = Holiday.holidays
-
-
-def check_date(date):
-    """
-    Returns True if date is not a Saturday or Sunday or
-    holiday, False otherwise.
-
-    """
-    if (date.weekday() < 5) and (date.strftime('%Y-%m-%d') not in HOLIDAYS):
-        return True
-    return False
-
-
-def find_ge(values, threshold):
-    """Return index for leftmost value => threshold."""
-    i = bisect.bisect_left(values, threshold)
-    if i != len(values):
-        return i
-    raise ValueError
-
-
-def find_le(values, threshold):
-    """Return index for rightmost value > threshold."""
-    i = bisect.bisect_right(values, threshold)
-    if i:
-        return i
-    raise ValueError
-
-
-def get_subset(index, values, threshold):
-    """
-    Return subset of values for a given threshold by indexing on index.
-
-    Start time is set as threshold: year, month, day, 0, 0, 0.
-    End time is set as threshold: year, month, day + 1 day, 0, 0, 0.
-
-    """
-    subset = []
-    s_time = datetime.datetime.combine(threshold, datetime.time(0, 0, 0))
-    s_indx = find_ge(index, s_time)
-    e_time = datetime.datetime.combine(threshold +
-                                       datetime.timedelta(days=1),
-                                       datetime.time(0, 0, 0))
-    e_indx = find_le(index, e_time)
-    subset = values[s_indx:e_indx]
-    return subset
-
-
-def get_timestamps(data):
-    """Return list of sorted timestamps from first column of data."""
-    values = []
-    for i in range(len(data)):
-        values.append(datetime.datetime.utcfromtimestamp(
-            float(data[i].split()[0])))
-    return sorted(values)
-
-
 def read_file(path, name):
     """Read file and return a list of strings without newlines."""
     if not os.path.isdir(path):
@@ -151,58 +86,33 @@ def set_parser():
     return values
 
 
-def set_start_end(start, end, data):
+def write_ticks(start, end, symbol, data, path, **kwargs):
     """
-    Return tuple of start/end date modifed if data first (last)
-    date is after (before) start (end) date given by user.
+    Write ticks to files with .tks suffix, one per trading day of
+    calendar.
 
     """
-    first = datetime.datetime.utcfromtimestamp(float(
-                                               data[0].split()[0])).date()
-    last = datetime.datetime.utcfromtimestamp(float(
-                                              data[-1].split()[0])).date()
-    start = start.date()
-    end = end.date()
-    if first > start:
-        start = first
-    if last < end:
-        end = last
-    return start, end
-
-
-def write_ticks(start, end, symbol, data, path):
-    """Write ticks to files with .tks suffix."""
-    # Extract list of timestamps from data.
-    timestamps = get_timestamps(data)
-    # Adjust beginning ('now') and end ('end') if needed.
-    now, then = set_start_end(start, end, data)
-    while now <= then:
-        # Make sure date is not on a weekend or holiday.
-        if check_date(now):
-            # Extract subset of data for this day only.
-            subset = get_subset(timestamps, data, now)
-            # Make sure subset length is non-zero.
-            if len(subset) != 0:
-                # Set directory for writing ticks; create if required.
-                outdir = os.path.join(path,
-                                      '{0:04d}'.format(now.year),
-                                      '{0:02d}'.format(now.month),
-                                      '{0:02d}'.format(now.day))
-                if not os.path.isdir(outdir):
-                    os.makedirs(outdir, 0755)  # Set tks file for output.
-                tks = os.path.join(outdir, symbol + '.tks')
-                # If tks file does not exist or is zero size,
-                # create/append tks file.
-                if not os.path.isfile(tks) or os.stat(tks).st_size == 0:
-                    with open(tks, 'a') as outfile:
-                        for i in range(len(subset)):
-                            # Append newline before writing to file.
-                            outfile.write(subset[i] + '\n')
-        now += datetime.timedelta(days=1)
+    calendar = kwargs.get('calendar', tick_calendar.get_calendar())
+    dirs = set()
+    entries = []
+    # Walk data once, one subset per trading day between start and end.
+    for now, subset in tick_partition.iter_days(data, start, end,
+                                                calendar=calendar):
+        # Set directory for writing ticks; create if required.
+        outdir = tick_partition.get_day_path(path, now)
+        if not os.path.isdir(outdir):
+            os.makedirs(outdir, 0755)  # Set tks file for output.
+        tks = os.path.join(outdir, symbol + '.tks')
+        # If tks file does not exist or is zero size,
+        # create/append tks file.
+        if not os.path.isfile(tks) or os.stat(tks).st_size == 0:
+            entries.append(tick_writer.write_lines(tks, subset, dirs=dirs))
+    tick_writer.sync_dirs(dirs)
+    tick_writer.update_manifest(entries)
     return
 
 
-def main():
+def main(argv=None):
     """
     Create signals.
 
@@ -212,16 +122,16 @@ def main():
                                                         'config.ini'))
 
     # Parse command line arguments, set local variables.
-    parser = set_parser()
-    group = parser.parse_args().group
-    source = parser.parse_args().source
+    args = set_parser().parse_args(argv)
+    group = args.group
+    source = args.source
     srcdir = config[group]['srcdir']
-    start = parser.parse_args().start
-    end = parser.parse_args().end
+    start = args.start
+    end = args.end
     start = datetime.datetime.strptime(start, '%Y-%m-%d %H:%M:%S')
     end = datetime.datetime.strptime(end, '%Y-%m-%d %H:%M:%S')
-    exchange = parser.parse_args().exchange
-    symbol = parser.parse_args().symbol
+    exchange = args.exchange
+    symbol = args.symbol
 
     # Set path for per-symbol expiry file for futures.
     if group == 'futures':
@@ -254,7 +164,9 @@ def main():
                     print("Writing ticks for {0}{1}...").format(
                                                            symbol,
                                                            contract)
-                    write_ticks(start, end, symbol, data, path)
+                    write_ticks(start, end, symbol, data, path,
+                                calendar=tick_calendar.get_calendar(
+                                    exchange))
     else:
         # Read ticks from file if it exists and is non-zero size.
         fname = os.path.join(srcdir, symbol + '.tks')
@@ -268,7 +180,8 @@ def main():
                                 symbol)
             # Write tick data to files.
             print("Writing ticks for {0}...").format(symbol)
-            write_ticks(start, end, symbol, data, path)
+            write_ticks(start, end, symbol, data, path,
+                        calendar=tick_calendar.get_calendar(exchange))
 
 
 if __name__ == '__main__':
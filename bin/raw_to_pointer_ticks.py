@@ -3,20 +3,110 @@
 Convert raw ticks to pointer ticks for futures contracts.
 Write pointer ticks to files.
 
+Command line arguments:
+--exchanges : exchanges to convert (default: all)
+--source : data source (ib)
+
+Each day copied into a rolling series (make_rolling_ticks --copy) is
+replaced with a pointer to the contract partition it was copied from
+(see tick_pointer), taken from the series roll log. A day is only
+converted if its pointer resolves to the same rows as the copy.
+
 """
 
 import argparse
-import calendar
 import os
-import sys
-import time
+
+import numpy
+
+import tick_binary
+import tick_layout
+import tick_manifest
+import tick_partition
+import tick_pointer
+import tick_roll
+import tick_scan
+import tick_writer
 
 __author__ = "Todd Minehardt"
 __copyright__ = "Copyright 2011, bicycle trading, llc"
 __maintainer__ = "Todd Minehardt"
 __email__ = "todd@bicycletrading.com"
 
-if os.getenv("TICKS_HOME") is None:
-    return 0
 
-parser = argparse.ArgumentParser(description='Create rolling futures ticks files.')
+def convert_tree(path, plant, exchange, symbol):
+    """
+    Replace copied days of series tree path with pointers to contract
+    trees under plant. Return tuple of days converted and kept.
+
+    """
+    pointers = []
+    removed = []
+    kept = 0
+    for date, contract, offset in tick_roll.get_roll_log(path):
+        dirname = tick_partition.get_day_path(path, date)
+        if not os.path.isdir(dirname):
+            continue
+        infile = tick_binary.find_partition(dirname, symbol)
+        if infile is None:
+            continue
+        source = os.path.join(plant, exchange, symbol, contract)
+        data = tick_layout.load_day(source, symbol, date)
+        if data is None:
+            kept += 1
+            continue
+        pointer = tick_pointer.Pointer(date, tick_pointer.get_source(source),
+                                       0, None, offset)
+        if not numpy.array_equal(tick_pointer.resolve(pointer, data),
+                                 tick_binary.load_partition(infile)):
+            kept += 1
+            continue
+        pointers.append(pointer)
+        removed.append(infile)
+    if pointers:
+        tick_pointer.write_pointers(
+            tick_pointer.get_pointer_file(path, symbol), pointers)
+    for infile in removed:
+        os.remove(infile)
+        tick_layout.remove_empty_dirs(path, os.path.dirname(infile))
+    entries = tick_manifest.read_manifest(path)
+    if removed and entries is not None:
+        tick_writer.write_manifest(path, [
+            i for i in entries if os.path.isfile(os.path.join(path, i.path))])
+    return len(pointers), kept
+
+
+def set_parser():
+    """Return parser for command line arguments."""
+    values = argparse.ArgumentParser(
+        description='Create rolling futures pointer ticks files.')
+    values.add_argument('--exchanges',
+                        default=None,
+                        dest='exchanges',
+                        help='Space-separated names (default: all)',
+                        nargs='+')
+    values.add_argument('--source',
+                        default='ib',
+                        dest='source',
+                        help='Data source (default: %(default)s)')
+    return values
+
+
+def main(argv=None):
+    """Convert the copied days of every rolling series to pointers."""
+    args = set_parser().parse_args(argv)
+    plant = os.path.join(os.getenv('TICKS_HOME'), 'futures', args.source)
+    root = os.path.join(os.getenv('TICKS_HOME'), tick_roll.GROUP,
+                        args.source)
+    if not os.path.isdir(root):
+        print("{0} is not a directory.").format(root)
+        return
+    for exchange, symbol, depth, path in tick_scan.find_trees(
+            root, args.exchanges):
+        count, kept = convert_tree(path, plant, exchange, symbol)
+        print("Pointed {0} days of {1}[{2}], kept {3} copies.").format(
+            count, symbol, depth, kept)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/python
+"""Repack ticker plant symbol trees between partition layouts.
+
+Command line arguments:
+--layout : day (one partition per day), month, or year (see tick_layout)
+--codec : day partition format when unpacking (binary, none, gzip, bz2,
+          or lzma)
+--level : compression level for text day partitions
+paths : directories to search recursively for symbol trees
+
+"""
+
+import argparse
+import os
+
+import tick_layout
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+
+def is_tree(path):
+    """Return True if path holds YYYY directories of partitions."""
+    return any(i.isdigit() and len(i) == 4 and
+               os.path.isdir(os.path.join(path, i))
+               for i in os.listdir(path))
+
+
+def find_trees(path):
+    """Return list of symbol trees at or under path."""
+    values = []
+    for dirname, dirs, files in os.walk(path):
+        dirs.sort()
+        if is_tree(dirname):
+            values.append(dirname)
+            del dirs[:]
+    return values
+
+
+def repack_tree(path, layout, **kwargs):
+    """Repack tree path into layout, return count of files written."""
+    if layout == 'day':
+        return tick_layout.unpack_tree(path, kwargs.get('codec', 'binary'),
+                                       kwargs.get('level', None))
+    return tick_layout.pack_tree(path, layout)
+
+
+def set_parser():
+    """Return parser for command line arguments."""
+    values = argparse.ArgumentParser(description='Repack tick partitions.')
+    values.add_argument('--layout',
+                        choices=['day', 'month', 'year'],
+                        default='month',
+                        dest='layout',
+                        help='One of: %(choices)s (default: %(default)s)')
+    values.add_argument('--codec',
+                        choices=['binary', 'none', 'gzip', 'zlib', 'bz2',
+                                 'lzma'],
+                        default='binary',
+                        dest='codec',
+                        help='Day partition format (default: %(default)s)')
+    values.add_argument('--level',
+                        default=None,
+                        dest='level',
+                        type=int,
+                        help='Compression level for text day partitions')
+    values.add_argument('paths',
+                        help='Directories to search',
+                        nargs='+')
+    return values
+
+
+def main(argv=None):
+    """Repack symbol trees under each path."""
+    args = set_parser().parse_args(argv)
+    for path in args.paths:
+        for tree in find_trees(path):
+            count = repack_tree(tree, args.layout, codec=args.codec,
+                                level=args.level)
+            print("Wrote {0} files under {1}.").format(count, tree)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,74 +1,42 @@
 #!/usr/bin/python
-"""Gather statistics for entries in the ticker plant."""
+"""Gather statistics for entries in the ticker plant.
 
+With --report, write one JSON or CSV report for every symbol (or
+contract) tree on the exchanges instead of removing duplicates: a row
+per partition (date, rows, first and last tick, size, codec) and a
+rollup per tree (days covered, ticks, first and last tick, empty
+days, and missing trading days: days of the exchange's calendar
+between the first and last day with no ticks). --duplicates also
+counts duplicate timestamps, which reads every partition. Trees are
+spread over --jobs worker processes.
+
+"""
+
+import StringIO
 import argparse
 import bisect
-import collections
+import csv
 import datetime
+import json
+import multiprocessing
 import numpy
 import os
+import sys
+
+import tick_calendar
+import tick_dedup
+import tick_layout
+import tick_manifest
+import tick_scan
+import tick_writer
 
 __author__ = "Todd Minehardt"
 __copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
 __email__ = "todd@bicycletrading.com"
 
-
-class Holiday(object):
-    """Holidays class."""
-    infile = os.path.join(os.getenv('BICYCLE_HOME'),
-                                    'share/dates/holidays.txt')
-    with open(infile, 'r') as tmp:
-        values = tmp.readlines()
-    values = [i.strip() for i in values]
-    holidays = values
-
-
-HOLIDAYS = Holiday.holidays
-
-
-def check_date(date):
-    """
-    Returns True if date is weekday/non-holiday, False otherwise. Expects
-    date as type(datetime.datetime).
-
-    """
-    # Ensure that date is not a Saturday, Sunday, or holiday.
-    if (date.weekday() < 5) and (date.strftime('%Y-%m-%d') not in HOLIDAYS):
-        return True
-    return False
-
-
-def remove_duplicates(root, **kwargs):
-    """Remove duplicate rows in tks files, write new file."""
-    exchange = kwargs.get('exchange', "")
-    expiry = kwargs.get('expiry', "")
-    symbol = kwargs.get('symbol', "")
-    cwd = os.path.join(root, exchange, symbol, expiry)
-    recordtype = ([('timestamp', float), ('open', float), ('high', float),
-                   ('low', float), ('close', float), ('volume', int),
-                   ('orders', int), ('vwap', float), ('gaps', bool)])
-    for year in os.listdir(cwd):
-        for month in os.listdir(os.path.join(cwd, year)):
-            for day in os.listdir(os.path.join(cwd, year, month)):
-                infile = os.path.join(cwd, year, month, day, symbol + '.tks')
-                if (os.path.isfile(infile) and os.stat(infile).st_size != 0):
-                    tks = numpy.loadtxt(infile, dtype=recordtype)
-                    tmstmp = []
-                    if tks.ndim != 0:
-                        tmstmp = sorted([tks[i][0] for i in range(len(tks))])
-                        counter = collections.Counter(tmstmp)
-                        if bool([i for i in counter.values() if i > 1]):
-                            numpy.savetxt(infile + '.original', tks)
-                            outlist = []
-                            added_keys = set()
-                            for i in tks:
-                                lookup = tuple(i)[:1]
-                                if lookup not in added_keys:
-                                    outlist.append(i)
-                                    added_keys.add(lookup)
-                            outlist = numpy.asarray(outlist, dtype=recordtype)
-                            numpy.savetxt(infile, outlist)
-    return
+REPORT_FIELDS = ['level', 'exchange', 'symbol', 'contract', 'date', 'days',
+                 'rows', 'first', 'last', 'empty', 'missing', 'duplicates',
+                 'size', 'codec', 'path']
 
 
 def find_ge(values, threshold):
@@ -93,23 +61,11 @@ def get_missing_tks(root, **kwargs):
     expiry = kwargs.get('expiry', "")
     symbol = kwargs.get('symbol', "")
     cwd = os.path.join(root, exchange, symbol, expiry)
-    dates = []
-    for year in os.listdir(cwd):
-        for month in os.listdir(os.path.join(cwd, year)):
-            for day in os.listdir(os.path.join(cwd, year, month)):
-                infile = os.path.join(cwd, year, month, day, symbol + '.tks')
-                if (os.path.isfile(infile) and os.stat(infile).st_size == 0):
-                    dates.append(year + '/' + month + '/' + day)
-    return dates
-
-
-def get_start_end_datetime(data):
-    """Return tuple of start date and time and end time for a data file."""
-    start = datetime.datetime.utcfromtimestamp(
-             data[0][0]).strftime('%Y/%m/%d %H:%M:%S.%f')
-    end = datetime.datetime.utcfromtimestamp(
-           data[-1][0]).strftime('%H:%M:%S.%f')
-    return start, end
+    entries = tick_manifest.read_manifest(cwd)
+    if entries is not None:
+        return tick_manifest.get_missing_dates(entries)
+    return [i.date.strftime('%Y/%m/%d')
+            for i in tick_scan.scan_tree(cwd, symbol=symbol) if i.size == 0]
 
 
 def get_subset(index, values, threshold):
@@ -148,19 +104,9 @@ def get_tks_datetime(root, **kwargs):
     expiry = kwargs.get('expiry', "")
     symbol = kwargs.get('symbol', "")
     cwd = os.path.join(root, exchange, symbol, expiry)
-    recordtype = ([('timestamp', float), ('open', float), ('high', float),
-                   ('low', float), ('close', float), ('volume', int),
-                   ('orders', int), ('vwap', float), ('gaps', bool)])
-    values = []
-    for year in os.listdir(cwd):
-        for month in os.listdir(os.path.join(cwd, year)):
-            for day in os.listdir(os.path.join(cwd, year, month)):
-                infile = os.path.join(cwd, year, month, day, symbol + '.tks')
-                if (os.path.isfile(infile) and os.stat(infile).st_size != 0):
-                    tks = numpy.loadtxt(infile, dtype=recordtype)
-                    start, end = get_start_end_datetime(tks)
-                    values.append(start + ' ' + end)
-    return values
+    return tick_manifest.get_tks_datetime(
+        tick_scan.get_entries(cwd, symbol, count=False),
+        fmt='%Y/%m/%d %H:%M:%S.%f', end_fmt='%H:%M:%S.%f')
 
 
 def read_ticks_files(root, **kwargs):
@@ -169,29 +115,146 @@ def read_ticks_files(root, **kwargs):
     expiry = kwargs.get('expiry', "")
     symbol = kwargs.get('symbol', "")
     cwd = os.path.join(root, exchange, symbol, expiry)
-    recordtype = ([('timestamp', float), ('open', float), ('high', float),
-                   ('low', float), ('close', float), ('volume', int),
-                   ('orders', int), ('vwap', float), ('gaps', bool)])
+    return tick_manifest.get_tks_data(tick_scan.get_entries(cwd, symbol),
+                                      exchange, symbol + expiry,
+                                      fmt='%Y/%m/%d %H:%M:%S.%f')
+
+
+def count_duplicates(data):
+    """Return number of rows in data repeating an earlier timestamp."""
+    timestamps = data['timestamp']
+    return len(timestamps) - len(numpy.unique(timestamps))
+
+
+def format_report_time(timestamp):
+    """Return UTC time string for timestamp, None if it is NaN."""
+    if numpy.isnan(timestamp):
+        return None
+    return tick_manifest.format_time(timestamp, '%Y-%m-%d %H:%M:%S.%f')
+
+
+def get_report_row(tree, entry, duplicates=None):
+    """Return partition report row (dict) for manifest entry of tree."""
+    exchange, symbol, contract, path = tree
+    infile = os.path.join(path, entry.path)
+    if entry.codec in tick_layout.SUFFIXES:
+        date = datetime.date(*[int(i) for i in tick_manifest.get_date(entry)])
+        infile = tick_layout.get_packed_file(path, symbol, date, entry.codec)
+    return {'level': 'partition',
+            'exchange': exchange,
+            'symbol': symbol,
+            'contract': contract,
+            'date': '-'.join(tick_manifest.get_date(entry)),
+            'days': 1 if entry.rows else 0,
+            'rows': entry.rows,
+            'first': format_report_time(entry.first),
+            'last': format_report_time(entry.last),
+            'empty': 0 if entry.rows else 1,
+            'missing': None,
+            'duplicates': duplicates,
+            'size': entry.size,
+            'codec': entry.codec,
+            'path': infile}
+
+
+def get_rollup(tree, rows):
+    """Return symbol report row rolling up partition rows of tree."""
+    exchange, symbol, contract, path = tree
+    times = [i['first'] for i in rows if i['rows']] + \
+        [i['last'] for i in rows if i['rows']]
+    duplicates = [i['duplicates'] for i in rows
+                  if i['duplicates'] is not None]
+    missing = tick_calendar.get_calendar(exchange).missing_days(
+        [i['date'] for i in rows if i['rows']])
+    return {'level': 'symbol',
+            'exchange': exchange,
+            'symbol': symbol,
+            'contract': contract,
+            'date': None,
+            'days': sum(i['days'] for i in rows),
+            'rows': sum(i['rows'] for i in rows),
+            'first': min(times) if times else None,
+            'last': max(times) if times else None,
+            'empty': sum(i['empty'] for i in rows),
+            'missing': len(missing),
+            'duplicates': sum(duplicates) if duplicates else None,
+            'size': sum(i['size'] for i in rows),
+            'codec': ' '.join(sorted(set(i['codec'] for i in rows))),
+            'path': path}
+
+
+def report_task(task):
+    """
+    Return tuple of label, report rows (partitions, then the symbol
+    rollup), and error (None on success) for task of (tree,
+    duplicates). Counting duplicates reads every partition; otherwise
+    rows come from the tree's manifest when it has one.
+
+    """
+    tree, duplicates = task
+    exchange, symbol, contract, path = tree
+    label = exchange + ' ' + symbol + contract
+    try:
+        rows = []
+        if duplicates:
+            for i in tick_scan.scan_tree(path, exchange=exchange,
+                                         symbol=symbol, contract=contract):
+                data = tick_scan.load(i) if i.size else None
+                count = 0 if data is None else count_duplicates(data)
+                rows.append(get_report_row(
+                    tree, tick_scan.make_entry(i, data), count))
+        else:
+            for i in tick_scan.get_entries(path, symbol):
+                rows.append(get_report_row(tree, i))
+        rows.append(get_rollup(tree, rows))
+    except Exception as error:
+        return label, [], error
+    return label, rows, None
+
+
+def run_report(trees, jobs, duplicates=False):
+    """
+    Run report_task over trees from find_trees on jobs processes
+    (serially if jobs is 1). Return tuple of report rows in tree order
+    and list of (label, error) failures.
+
+    """
+    tasks = [(i, duplicates) for i in trees]
+    if jobs > 1:
+        pool = multiprocessing.Pool(jobs)
+        results = pool.imap(report_task, tasks)
+    else:
+        pool = None
+        results = (report_task(i) for i in tasks)
     values = []
-    for year in os.listdir(cwd):
-        for month in os.listdir(os.path.join(cwd, year)):
-            for day in os.listdir(os.path.join(cwd, year, month)):
-                infile = os.path.join(cwd, year, month, day, symbol + '.tks')
-                if (os.path.isfile(infile) and os.stat(infile).st_size != 0):
-                    tks = numpy.loadtxt(infile, dtype=recordtype)
-                    values.append([exchange,
-                                   symbol + expiry,
-                                   year,
-                                   month,
-                                   day,
-                                   datetime.datetime.utcfromtimestamp(
-                                     tks[0][0]).strftime(
-                                     '%Y/%m/%d %H:%M:%S.%f'),
-                                   datetime.datetime.utcfromtimestamp(
-                                     tks[-1][0]).strftime(
-                                     '%Y/%m/%d %H:%M:%S.%f'),
-                                   len(tks)])
-    return values
+    failed = []
+    try:
+        for label, rows, error in results:
+            values.extend(rows)
+            if error is not None:
+                failed.append((label, error))
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    return values, failed
+
+
+def format_report(rows, fmt='json'):
+    """
+    Return report of rows as a JSON document with partitions and
+    symbols lists, or as CSV with one line per row.
+
+    """
+    if fmt == 'json':
+        values = {'partitions': [i for i in rows if i['level'] == 'partition'],
+                  'symbols': [i for i in rows if i['level'] == 'symbol']}
+        return json.dumps(values, indent=1, sort_keys=True) + '\n'
+    outfile = StringIO.StringIO()
+    writer = csv.DictWriter(outfile, REPORT_FIELDS, lineterminator='\n')
+    writer.writeheader()
+    writer.writerows(rows)
+    return outfile.getvalue()
 
 
 def set_expiry(root, exchanges, symbols):
@@ -233,6 +296,34 @@ def set_parser():
                         dest='end',
                         help='Date string format %%Y-%%m-%%d %%H:%%M:%%S '
                              '(default: %(default)s)')
+    values.add_argument('--policy',
+                        choices=tick_dedup.POLICIES,
+                        default='first',
+                        dest='policy',
+                        help='Duplicate resolution, one of: %(choices)s '
+                             '(default: %(default)s)')
+    values.add_argument('--report',
+                        choices=['json', 'csv'],
+                        default=None,
+                        dest='report',
+                        help='Write statistics report in one of: '
+                             '%(choices)s (default: %(default)s)')
+    values.add_argument('--output',
+                        default='-',
+                        dest='output',
+                        help='Report file, - for stdout '
+                             '(default: %(default)s)')
+    values.add_argument('--duplicates',
+                        action='store_true',
+                        default=False,
+                        dest='duplicates',
+                        help='Count duplicate timestamps in the report')
+    values.add_argument('--jobs',
+                        default=1,
+                        dest='jobs',
+                        type=int,
+                        help='Number of worker processes '
+                             '(default: %(default)s)')
     return values
 
 
@@ -336,71 +427,71 @@ def show_missing_data(root, exchanges, symbols, **kwargs):
     return missing
 
 
-def write_ticks(start, end, symbol, data, path):
-    """Write ticks to files with .tks suffix."""
+def write_ticks(start, end, symbol, data, path, **kwargs):
+    """Write ticks to files with .tks suffix, one per trading day."""
+    calendar = kwargs.get('calendar', tick_calendar.get_calendar())
     # Extract list of timestamps from data.
     tmstmp = get_timestamps(data)
-    # Adjust beginning ('now') and end ('end') if needed.
-    now, then = set_start_end(start, end, data)
-    while now <= then:
-        # Make sure date is not on a weekend or holiday.
-        if check_date(now):
-            # Extract subset of data for this day only.
-            subset = get_subset(tmstmp, data, now)
-            # Set directory for writing ticks; create if required.
-            outdir = os.path.join(path,
-                                  '{0:04d}'.format(now.year),
-                                  '{0:02d}'.format(now.month),
-                                  '{0:02d}'.format(now.day))
-            if not os.path.isdir(outdir):
-                os.makedirs(outdir, 0755)
-            # Set tks file for output.
-            tks = os.path.join(outdir, symbol + '.tks')
-            # If tks file does not exist or is zero size,
-            # create/append tks file.
-            if not os.path.isfile(tks) or os.stat(tks).st_size == 0:
-                with open(tks, 'a') as outfile:
-                    for i in range(len(subset)):
-                        # Append newline before writing to file.
-                        outfile.write(subset[i] + '\n')
-            now += datetime.timedelta(days=1)
+    # Adjust beginning ('first') and end ('last') if needed.
+    first, last = set_start_end(start, end, data)
+    for now in calendar.trading_dates(first, last):
+        # Extract subset of data for this day only.
+        subset = get_subset(tmstmp, data, now)
+        # Set directory for writing ticks; create if required.
+        outdir = os.path.join(path,
+                              '{0:04d}'.format(now.year),
+                              '{0:02d}'.format(now.month),
+                              '{0:02d}'.format(now.day))
+        if not os.path.isdir(outdir):
+            os.makedirs(outdir, 0755)
+        # Set tks file for output.
+        tks = os.path.join(outdir, symbol + '.tks')
+        # If tks file does not exist or is zero size,
+        # create/append tks file.
+        if not os.path.isfile(tks) or os.stat(tks).st_size == 0:
+            tick_writer.update_manifest(
+                [tick_writer.write_lines(tks, subset)])
     return
 
 
-def main():
+def main(argv=None):
     """
     Searches ticker plant directories and outputs
     statistics for what is collected and missing.
 
     """
     # Parse command line arguments, set local variables.
-    parser = set_parser()
-    end = parser.parse_args().end
+    args = set_parser().parse_args(argv)
+    end = args.end
     end = datetime.datetime.strptime(end, '%Y-%m-%d %H:%M:%S')
-    exchanges = parser.parse_args().exchanges
-    group = parser.parse_args().group
-    source = parser.parse_args().source
-    start = parser.parse_args().start
+    exchanges = args.exchanges
+    group = args.group
+    source = args.source
+    start = args.start
     start = datetime.datetime.strptime(start, '%Y-%m-%d %H:%M:%S')
 
     root = os.path.join(os.getenv('TICKS_HOME'), group, source)
-    symbols = set_symbols(root, exchanges)
-
-    if (group == 'futures'):
-        expiry = set_expiry(root, exchanges, symbols)
-
-    for exchange in exchanges:
-        for symbol in symbols[exchange]:
-            if expiry:
-                for expiration in expiry[symbol]:
-                    remove_duplicates(root,
-                                      exchange=exchange,
-                                      symbol=symbol,
-                                      expiry=expiration)
-            else:
-                remove_duplicates(root,
-                                  exchange=exchange,
-                                  symbol=symbol)
+    report = args.report
+    if report is not None:
+        rows, failed = run_report(tick_scan.find_trees(root, exchanges),
+                                  args.jobs, args.duplicates)
+        data = format_report(rows, report)
+        if args.output == '-':
+            sys.stdout.write(data)
+        else:
+            tick_writer.write_atomic(args.output, data)
+        for label, error in failed:
+            sys.stderr.write("Failed reading {0}: {1}\n".format(label, error))
+        if failed:
+            sys.exit(1)
+        return
+    for (exchange, symbol, contract), partitions in tick_scan.scan_trees(
+            root, exchanges, args.jobs):
+        count = tick_dedup.remove_duplicates(partitions,
+                                             policy=args.policy)
+        if count:
+            print("Removed {0} duplicate rows for {1} {2}.").format(
+                count, exchange, symbol + contract)
 
 
 if __name__ == '__main__':
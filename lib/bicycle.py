@@ -6,31 +6,20 @@ import collections
 import datetime
 import os
 
+import tick_calendar
+import tick_dedup
+import tick_manifest
+import tick_partition
+import tick_scan
+import tick_text
+import tick_watermark
+import tick_writer
+
 __author__ = "Todd Minehardt"
 __copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
 __email__ = "todd@bicycletrading.com"
 
 
-class Holiday(object):
-    """Holidays class."""
-    infile = os.path.join(os.getenv('BICYCLE_HOME'),
-                                    'share/dates/holidays.txt')
-    with open(infile, 'r') as tmp:
-        values = tmp.readlines()
-    values = [i.strip() for i in values]
-    holidays = values
-
-
-def check_date(date):
-    """Returns True if date is weekday/non-holiday, False otherwise."""
-    # Ensure that date is not a Saturday, Sunday, or holiday.
-    holidays = Holiday.holidays
-    if (date.weekday() < 5) and (date.strftime('%Y-%m-%d') not in holidays):
-        return True
-    else:
-        return False
-
-
 def find_ge(values, threshold):
     """Return index for leftmost value => threshold."""
     i = bisect.bisect_left(values, threshold)
@@ -60,15 +49,6 @@ def get_duplicates(values):
     return False
 
 
-def get_start_end_datetime(tks):
-    """Return tuple of start and end times for a tks file."""
-    start = datetime.datetime.utcfromtimestamp(
-             float(tks[0].split()[0])).strftime('%Y/%m/%d %H:%M:%S')
-    end = datetime.datetime.utcfromtimestamp(
-           float(tks[-1].split()[0])).strftime('%H:%M:%S')
-    return start, end
-
-
 def get_subset(index, values, threshold):
     """
     Return subset of values for a given threshold by indexing on index.
@@ -88,10 +68,8 @@ def get_subset(index, values, threshold):
 
 def get_timestamps(data):
     """Return list of sorted timestamps from first column of data."""
-    values = []
-    for i in range(len(data)):
-        values.append(datetime.datetime.utcfromtimestamp(
-            float(data[i].split()[0])))
+    values = [datetime.datetime.utcfromtimestamp(i)
+              for i in tick_text.get_timestamps(data).tolist()]
     values.sort()
     return values
 
@@ -108,18 +86,8 @@ def get_tks_datetime(root, **kwargs):
     expiry = kwargs.get('expiry', "")
     symbol = kwargs.get('symbol', "")
     cwd = os.path.join(root, exchange, symbol, expiry)
-    values = []
-    for year in os.listdir(cwd):
-        for month in os.listdir(os.path.join(cwd, year)):
-            for day in os.listdir(os.path.join(cwd, year, month)):
-                infile = os.path.join(cwd, year, month, day, symbol + '.tks')
-                if not os.stat(infile).st_size == 0:
-                    with open(infile, 'r') as tmp:
-                        tks = tmp.readlines()
-                    tks = [i.strip() for i in tks]
-                    start, end = get_start_end_datetime(tks)
-                    values.append(start + ' ' + end)
-    return values
+    return tick_manifest.get_tks_datetime(
+        tick_scan.get_entries(cwd, symbol, count=False))
 
 
 def get_tks_data(root, **kwargs):
@@ -128,29 +96,8 @@ def get_tks_data(root, **kwargs):
     expiry = kwargs.get('expiry', "")
     symbol = kwargs.get('symbol', "")
     cwd = os.path.join(root, exchange, symbol, expiry)
-    values = []
-    for year in os.listdir(cwd):
-        for month in os.listdir(os.path.join(cwd, year)):
-            for day in os.listdir(os.path.join(cwd, year, month)):
-                infile = os.path.join(cwd, year, month, day, symbol + '.tks')
-                if not os.stat(infile).st_size == 0:
-                    with open(infile, 'r') as tmp:
-                        tks = tmp.readlines()
-                    tks = [i.strip() for i in tks]
-                    tmp.close()
-                    values.append([exchange,
-                                   symbol + expiry,
-                                   year,
-                                   month,
-                                   day,
-                                   datetime.datetime.utcfromtimestamp(
-                                   float(tks[0].split()[0])).strftime(
-                                   '%Y/%m/%d %H:%M:%S'),
-                                   datetime.datetime.utcfromtimestamp(
-                                   float(tks[-1].split()[0])).strftime(
-                                   '%Y/%m/%d %H:%M:%S'),
-                                   len(tks)])
-    return values
+    return tick_manifest.get_tks_data(tick_scan.get_entries(cwd, symbol),
+                                      exchange, symbol + expiry)
 
 
 def set_expiry(root, exchanges, symbols):
@@ -190,10 +137,9 @@ def set_start_end(start, end, data):
     and/or times are before/after start/end.
 
     """
-    first = datetime.datetime.utcfromtimestamp(float(
-                                               data[0].split()[0])).date()
-    last = datetime.datetime.utcfromtimestamp(float(
-                                              data[-1].split()[0])).date()
+    first, last = tick_text.get_timestamps([data[0], data[-1]]).tolist()
+    first = datetime.datetime.utcfromtimestamp(first).date()
+    last = datetime.datetime.utcfromtimestamp(last).date()
     start = start.date()
     end = end.date()
     if first:
@@ -211,30 +157,50 @@ def set_symbols(root, exchanges):
     return values
 
 
-def write_ticks(start, end, symbol, data, path):
-    """Write ticks to files with .tks suffix."""
-    # Extract list of timestamps from data.
-    timestamps = get_timestamps(data)
-    # Adjust beginning ('now') and end ('end') if needed.
-    now, then = set_start_end(start, end, data)
-    while now <= then:
-        # Make sure date is not on a weekend or holiday.
-        if check_date(now):
-            # Extract subset of data for this day only.
-            subset = get_subset(timestamps, data, now)
-            # Set directory for writing ticks; create if required.
-            outdir = os.path.join(path,
-                                  '{0:04d}'.format(now.year),
-                                  '{0:02d}'.format(now.month),
-                                  '{0:02d}'.format(now.day))
-            if not os.path.isdir(outdir):
-                os.makedirs(outdir, 0755)
-            # Set tks file for output.
-            tks = os.path.join(outdir, symbol + '.tks')
-            # Create outfile in append mode.
-            with open(tks, 'a') as outfile:
-                for i in range(len(subset)):
-                    # Append newline before writing to file.
-                    outfile.write(subset[i] + '\n')
-        now += datetime.timedelta(days=1)
+def write_ticks(start, end, symbol, data, path, **kwargs):
+    """
+    Write ticks to files with .tks suffix.
+
+    Only ticks after the high-water mark for path are written; the
+    day holding the mark is merged with its existing tks file. The
+    mark only moves if start through end holds every tick after it.
+    Rows sharing a timestamp are resolved with policy dedup if given.
+    Only trading days of calendar (the shared one by default) are
+    written.
+
+    """
+    dedup = kwargs.get('dedup', 'none')
+    calendar = kwargs.get('calendar', tick_calendar.get_calendar())
+    mark = tick_watermark.get_watermark(path)
+    mark_day = tick_watermark.get_watermark_day(mark)
+    last = mark
+    dirs = set()
+    entries = []
+    data = tick_watermark.filter_lines(data, mark)
+    timestamps = tick_partition.get_timestamps(data)
+    # Walk data once, one subset per trading day between start and end.
+    for now, subset in tick_partition.iter_days(data, start, end,
+                                                calendar=calendar,
+                                                timestamps=timestamps):
+        # Set directory for writing ticks; create if required.
+        outdir = tick_partition.get_day_path(path, now)
+        if not os.path.isdir(outdir):
+            os.makedirs(outdir, 0755)
+        # Set tks file for output.
+        tks = os.path.join(outdir, symbol + '.tks')
+        # Complete the partial day holding the high-water mark.
+        if now == mark_day:
+            subset = tick_watermark.merge_lines(
+                tick_watermark.get_day_lines(path, symbol, now), subset,
+                mark)
+        if dedup != 'none':
+            subset = tick_dedup.resolve_lines(subset, dedup)[0]
+        entries.append(tick_writer.write_lines(tks, subset, dirs=dirs))
+        last = float(subset[-1].split(None, 1)[0])
+    # Make renames durable before moving the high-water mark.
+    tick_writer.sync_dirs(dirs)
+    tick_writer.update_manifest(entries)
+    if last is not None and last != mark and tick_watermark.in_window(
+            min(timestamps), max(timestamps), start, end):
+        tick_watermark.set_watermark(path, last)
     return
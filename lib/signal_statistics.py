@@ -4,8 +4,6 @@ Statistical functions for determining good predictors.
 """
 
 import math
-import matplotlib as mpl
-import matplotlib.pyplot as plt
 import numpy as np
 
 __author__ = "Todd Minehardt"
@@ -159,6 +157,9 @@ def ks_test(x_1, y_1, plot=True):
                                                  (rows_x_1 + rows_y_1))
 
     if plot:
+        # pyplot is slow to import and only needed to plot.
+        import matplotlib as mpl
+        import matplotlib.pyplot as plt
         y_2 = np.arange(rows_x_1 + rows_y_1) / float(rows_x_1 + rows_y_1)
         plt.plot(f_of_t, y_2, 'm-', label='F(t)')
         plt.plot(g_of_t, y_2, 'b-', label='G(t)')
@@ -175,6 +176,7 @@ def ks_test(x_1, y_1, plot=True):
 
 def plot_lift(y_1, y_2, y_3, y_4):
     """Plot normalized lift and sorted predictors."""
+    import matplotlib.pyplot as plt
     len_y_1 = len(y_1)
     fig = plt.figure()
     p_1 = fig.add_subplot(111)
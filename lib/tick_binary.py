@@ -0,0 +1,256 @@
+"""
+Binary fixed-width tick partitions.
+
+A binary partition (SYMBOL.tkb) is a header followed by rows of
+RECORDTYPE stored as is, so a day loads through numpy.memmap without
+parsing. The header is:
+
+magic : 4 bytes, '\\x93TKB'
+version : uint16
+header length : uint16, bytes before the first row
+rows : uint64
+dtype : repr of dtype.descr, ASCII, space padded
+
+"""
+
+import ast
+import os
+import struct
+
+import numpy
+
+import tick_blocks
+import tick_codecs
+import tick_text
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+RECORDTYPE = numpy.dtype([('timestamp', '<f8'), ('open', '<f8'),
+                          ('high', '<f8'), ('low', '<f8'),
+                          ('close', '<f8'), ('volume', '<i8'),
+                          ('orders', '<i8'), ('vwap', '<f8'),
+                          ('gaps', '?')])
+
+TEXT_FORMAT = '%.6f %f %f %f %f %d %d %f %d'
+
+MAGIC = '\x93TKB'
+VERSION = 1
+PREFIX = struct.Struct('<4sHHQ')
+ALIGN = 64
+SUFFIX = '.tkb'
+
+# Bytes read at a time when scanning text partitions.
+CHUNK = 1 << 20
+TAIL = 4096
+
+
+def get_filename(symbol):
+    """Return binary partition file name for symbol."""
+    return symbol + SUFFIX
+
+
+def make_header(dtype, rows):
+    """Return header bytes for rows of dtype."""
+    descr = repr(numpy.dtype(dtype).descr)
+    length = PREFIX.size + len(descr) + 1
+    length += -length % ALIGN
+    header = PREFIX.pack(MAGIC, VERSION, length, rows) + descr
+    return header + ' ' * (length - len(header) - 1) + '\n'
+
+
+def read_header(infile):
+    """Return tuple of version, header length, rows, and dtype."""
+    prefix = infile.read(PREFIX.size)
+    if len(prefix) != PREFIX.size:
+        raise ValueError("Truncated tkb header.")
+    magic, version, length, rows = PREFIX.unpack(prefix)
+    if magic != MAGIC:
+        raise ValueError("Not a tkb file.")
+    if version > VERSION:
+        raise ValueError("Unsupported tkb version {0}.".format(version))
+    descr = infile.read(length - PREFIX.size).strip()
+    dtype = numpy.dtype(ast.literal_eval(descr))
+    return version, length, rows, dtype
+
+
+def load(filename, mode='r'):
+    """
+    Return structured array for binary partition filename, memory
+    mapped with mode unless the partition is empty.
+
+    """
+    with open(filename, 'rb') as infile:
+        version, length, rows, dtype = read_header(infile)
+    if rows == 0:
+        return numpy.zeros(0, dtype=dtype)
+    return numpy.memmap(filename, dtype=dtype, mode=mode, offset=length,
+                        shape=(rows,))
+
+
+def load_text(filename):
+    """Return structured array for text partition filename (any codec)."""
+    return tick_text.load(filename, RECORDTYPE)
+
+
+def get_codec(filename):
+    """Return manifest codec (binary, blocks, or text codec) of filename."""
+    if filename.endswith(SUFFIX):
+        return 'binary'
+    if filename.endswith(tick_blocks.SUFFIX):
+        return 'blocks'
+    return tick_codecs.get_codec(filename)
+
+
+def is_partition(filename):
+    """Return True if filename is a binary, block, or text partition."""
+    return (filename.endswith(SUFFIX) or
+            filename.endswith(tick_blocks.SUFFIX) or
+            tick_codecs.is_tks(filename))
+
+
+def get_symbol(filename):
+    """Return symbol of partition file name filename."""
+    name = os.path.basename(filename)
+    for suffix in [SUFFIX, tick_blocks.SUFFIX]:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name[:name.index(tick_codecs.SUFFIX)]
+
+
+def load_partition(filename, low=None, high=None):
+    """
+    Return structured array for binary, block, or text partition
+    filename. A block partition decompresses only the blocks holding
+    low <= timestamp < high; other formats return every row.
+
+    """
+    if filename.endswith(SUFFIX):
+        return load(filename)
+    if filename.endswith(tick_blocks.SUFFIX):
+        return tick_blocks.load(filename, low, high)
+    return load_text(filename)
+
+
+def find_partition(dirname, symbol):
+    """
+    Return path of the most recently written partition for symbol in
+    dirname, else None. Ties prefer binary, then block, then text of
+    any codec, so a text partition ingested after conversion (without
+    --remove) is not hidden by its stale binary copy.
+
+    """
+    values = []
+    for rank, infile in enumerate([
+            os.path.join(dirname, get_filename(symbol)),
+            os.path.join(dirname, tick_blocks.get_filename(symbol)),
+            tick_codecs.find_tks(dirname, symbol)]):
+        try:
+            values.append((os.stat(infile).st_mtime, -rank, infile))
+        except (OSError, TypeError):
+            continue
+    return max(values)[2] if values else None
+
+
+def to_bytes(data):
+    """Return binary partition contents for structured array data."""
+    data = numpy.ascontiguousarray(numpy.asarray(data, dtype=RECORDTYPE))
+    return make_header(RECORDTYPE, len(data)) + data.tostring()
+
+
+def parse_lines(lines):
+    """Return structured array of RECORDTYPE for text partition lines."""
+    return tick_text.parse_lines(lines, RECORDTYPE)
+
+
+def read_binary_bounds(filename):
+    """
+    Return tuple of first record, last record, and rows of binary
+    partition filename, reading only the header and those two rows.
+
+    """
+    with open(filename, 'rb') as infile:
+        version, length, rows, dtype = read_header(infile)
+        if rows == 0:
+            return None, None, 0
+        first = numpy.fromstring(infile.read(dtype.itemsize), dtype=dtype)
+        infile.seek(length + (rows - 1) * dtype.itemsize)
+        last = numpy.fromstring(infile.read(dtype.itemsize), dtype=dtype)
+    return first[0], last[0], rows
+
+
+def read_tail(infile):
+    """Return last non-empty line of seekable file object infile."""
+    infile.seek(0, os.SEEK_END)
+    end = infile.tell()
+    tail = ''
+    while end > 0:
+        start = max(0, end - TAIL)
+        infile.seek(start)
+        tail = infile.read(end - start) + tail
+        end = start
+        line = tail.rstrip()
+        i = line.rfind('\n')
+        if i >= 0:
+            return line[i + 1:]
+    return tail.strip()
+
+
+def scan_text(infile):
+    """
+    Return tuple of first line, last line, and line count of text
+    file object infile, read once in chunks without splitting lines.
+
+    """
+    first = None
+    tail = ''
+    rows = 0
+    while True:
+        chunk = infile.read(CHUNK)
+        if not chunk:
+            break
+        rows += chunk.count('\n')
+        tail += chunk
+        if first is None and tail.strip():
+            first = tail.lstrip().split('\n', 1)[0]
+        # Keep only the last (possibly partial) line.
+        i = tail.rstrip().rfind('\n')
+        if i >= 0:
+            tail = tail[i + 1:]
+    if tail and not tail.endswith('\n'):
+        rows += 1
+    return first, tail.strip() or None, rows
+
+
+def read_bounds(filename, count=False):
+    """
+    Return tuple of first record, last record (None if empty), and
+    rows of partition filename without loading it. A binary partition
+    costs two row reads, a block partition the decompression of its
+    first and last blocks, and a plain text one a read of its first and
+    last lines, with rows None unless count is True. Compressed text
+    is decompressed once as a stream but never split or parsed: the
+    text format has no index, so its bounds are kept in the tree's
+    manifest (see tick_scan.get_entries) and this is the fallback for
+    trees without one.
+
+    """
+    if filename.endswith(SUFFIX):
+        return read_binary_bounds(filename)
+    if filename.endswith(tick_blocks.SUFFIX):
+        return tick_blocks.read_bounds(filename)
+    rows = None
+    if tick_codecs.get_codec(filename) == 'none' and not count:
+        with open(filename, 'rb') as infile:
+            first = infile.readline()
+            while first and not first.strip():
+                first = infile.readline()
+            last = read_tail(infile)
+    else:
+        with tick_codecs.open_tks(filename) as infile:
+            first, last, rows = scan_text(infile)
+    if not first or not first.strip():
+        return None, None, rows if rows is not None else 0
+    records = parse_lines([first.strip(), last])
+    return records[0], records[-1], rows
@@ -0,0 +1,177 @@
+"""
+Seekable block-compressed tick partitions.
+
+A block partition (SYMBOL.tkz) holds rows of a structured dtype in
+blocks of up to block rows, each compressed on its own with any codec
+of tick_codecs, followed by an index of the blocks and a trailer:
+
+header : magic '\\x93TKZ', uint16 version, uint16 header length,
+         uint64 rows, uint32 block rows, 8 byte codec name, then the
+         repr of dtype.descr, ASCII, space padded
+blocks : compressed rows
+index : one row of (first, last, offset, length, rows) per block,
+        first and last the timestamps of the block's first and last
+        rows, offset and length the compressed bytes
+trailer : uint64 offset of the index, uint32 blocks, magic
+
+A time-range read decompresses only the blocks whose timestamps
+overlap the range, and the blocks of one read can be decompressed on
+several threads (Python 3's codecs release the GIL while working).
+Rows are expected sorted on timestamp, as partitions are.
+
+"""
+
+import ast
+import multiprocessing.pool
+import struct
+
+import numpy
+
+import tick_codecs
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+MAGIC = '\x93TKZ'
+VERSION = 1
+PREFIX = struct.Struct('<4sHHQI8s')
+TRAILER = struct.Struct('<QI4s')
+INDEX = numpy.dtype([('first', '<f8'), ('last', '<f8'), ('offset', '<i8'),
+                     ('length', '<i8'), ('rows', '<i8')])
+ALIGN = 64
+SUFFIX = '.tkz'
+BLOCK_ROWS = 8192
+CODEC = 'gzip'
+
+
+def get_filename(symbol):
+    """Return block partition file name for symbol."""
+    return symbol + SUFFIX
+
+
+def to_bytes(data, **kwargs):
+    """
+    Return block partition contents for structured array data, in
+    blocks of block_rows rows compressed with codec at level.
+
+    """
+    codec = tick_codecs.check_codec(kwargs.get('codec', CODEC))
+    level = kwargs.get('level', None)
+    block_rows = int(kwargs.get('block_rows', BLOCK_ROWS))
+    data = numpy.ascontiguousarray(data)
+    descr = repr(data.dtype.descr)
+    length = PREFIX.size + len(descr) + 1
+    length += -length % ALIGN
+    header = PREFIX.pack(MAGIC, VERSION, length, len(data), block_rows,
+                         codec) + descr
+    header += ' ' * (length - len(header) - 1) + '\n'
+    blocks = []
+    index = numpy.zeros((len(data) + block_rows - 1) // block_rows,
+                        dtype=INDEX)
+    offset = length
+    for i in range(len(index)):
+        rows = data[i * block_rows:(i + 1) * block_rows]
+        block = tick_codecs.compress(rows.tostring(), codec, level)
+        index[i] = (rows['timestamp'].min(), rows['timestamp'].max(),
+                    offset, len(block), len(rows))
+        blocks.append(block)
+        offset += len(block)
+    return header + ''.join(blocks) + index.tostring() + \
+        TRAILER.pack(offset, len(index), MAGIC)
+
+
+def read_index(infile):
+    """
+    Return tuple of rows, codec, dtype, and block index of block
+    partition file object infile.
+
+    """
+    prefix = infile.read(PREFIX.size)
+    if len(prefix) != PREFIX.size:
+        raise ValueError("Truncated tkz header.")
+    magic, version, length, rows, block_rows, codec = PREFIX.unpack(prefix)
+    if magic != MAGIC:
+        raise ValueError("Not a tkz file.")
+    if version > VERSION:
+        raise ValueError("Unsupported tkz version {0}.".format(version))
+    dtype = numpy.dtype(ast.literal_eval(
+        infile.read(length - PREFIX.size).strip()))
+    infile.seek(-TRAILER.size, 2)
+    offset, blocks, magic = TRAILER.unpack(infile.read(TRAILER.size))
+    if magic != MAGIC:
+        raise ValueError("Truncated tkz file.")
+    infile.seek(offset)
+    index = numpy.fromstring(infile.read(blocks * INDEX.itemsize),
+                             dtype=INDEX)
+    return rows, codec.rstrip('\0'), dtype, index
+
+
+def get_blocks(index, low=None, high=None):
+    """Return indices of blocks in index holding low <= timestamp < high."""
+    keep = numpy.ones(len(index), dtype=bool)
+    if low is not None:
+        keep &= index['last'] >= low
+    if high is not None:
+        keep &= index['first'] < high
+    return numpy.flatnonzero(keep)
+
+
+def read_blocks(filename, index, blocks):
+    """Return list of compressed bytes of blocks of index in filename."""
+    values = []
+    with open(filename, 'rb') as infile:
+        for i in blocks:
+            infile.seek(index['offset'][i])
+            values.append(infile.read(index['length'][i]))
+    return values
+
+
+def load(filename, low=None, high=None, jobs=1):
+    """
+    Return structured array of rows of block partition filename with
+    low <= timestamp < high (all rows if None), decompressing only the
+    blocks in range, on jobs threads.
+
+    """
+    with open(filename, 'rb') as infile:
+        rows, codec, dtype, index = read_index(infile)
+    raw = read_blocks(filename, index, get_blocks(index, low, high))
+    if jobs > 1 and len(raw) > 1:
+        pool = multiprocessing.pool.ThreadPool(min(jobs, len(raw)))
+        try:
+            raw = pool.map(lambda x: tick_codecs.decompress(x, codec), raw)
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        raw = [tick_codecs.decompress(i, codec) for i in raw]
+    if not raw:
+        return numpy.zeros(0, dtype=dtype)
+    values = numpy.fromstring(''.join(raw), dtype=dtype)
+    if len(values) and (low is not None or high is not None):
+        first = 0 if low is None else numpy.searchsorted(
+            values['timestamp'], low, side='left')
+        last = len(values) if high is None else numpy.searchsorted(
+            values['timestamp'], high, side='left')
+        values = values[first:last]
+    return values
+
+
+def read_bounds(filename):
+    """
+    Return tuple of first record, last record (None if empty), and
+    rows of block partition filename, decompressing at most the first
+    and last blocks.
+
+    """
+    with open(filename, 'rb') as infile:
+        rows, codec, dtype, index = read_index(infile)
+    if rows == 0:
+        return None, None, 0
+    first, last = read_blocks(filename, index, [0, len(index) - 1])
+    first = numpy.fromstring(tick_codecs.decompress(first, codec),
+                             dtype=dtype)
+    last = numpy.fromstring(tick_codecs.decompress(last, codec),
+                            dtype=dtype)
+    return first[0], last[-1], rows
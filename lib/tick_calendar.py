@@ -0,0 +1,146 @@
+"""
+Exchange trading calendars.
+
+A TradingCalendar holds an exchange's holidays as a sorted array of
+day ordinals (numpy datetime64[D]) in a numpy.busdaycalendar, so
+testing, offsetting, counting, and listing trading days are array
+operations over any number of dates:
+
+>>> calendar = get_calendar('globex')
+>>> calendar.is_trading_day(numpy.arange('2012-01-01', '2012-01-08',
+...                                      dtype='datetime64[D]'))
+array([False, False,  True,  True,  True,  True, False])
+
+Holidays are read from $BICYCLE_HOME/share/dates/holidays_EXCHANGE.txt
+for an exchange that has its own list (LIFFE, DTB, and GLOBEX holidays
+differ), else from share/dates/holidays.txt, one YYYY-MM-DD date per
+line. The shared list holds US holidays; an exchange outside
+US_EXCHANGES without its own list is warned about on stderr, once.
+Calendars are read once per process.
+
+"""
+
+import datetime
+import os
+import sys
+
+import numpy
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+HOLIDAYS = 'share/dates/holidays.txt'
+EXCHANGE_HOLIDAYS = 'share/dates/holidays_{0}.txt'
+WEEKMASK = 'Mon Tue Wed Thu Fri'
+
+# Exchanges whose holidays are those of share/dates/holidays.txt.
+US_EXCHANGES = ['cbot', 'cfe', 'cme', 'ecbot', 'globex', 'nybot', 'nymex',
+                'nyse', 'nyseliffe', 'smart']
+
+CALENDARS = {}
+WARNED = set()
+
+
+def to_days(dates):
+    """
+    Return datetime64[D] scalar or array for dates: datetime.date,
+    datetime.datetime, 'YYYY-MM-DD' strings, datetime64, or sequences
+    of these.
+
+    """
+    if isinstance(dates, datetime.datetime):
+        dates = dates.date()
+    elif isinstance(dates, (list, tuple)):
+        dates = [i.date() if isinstance(i, datetime.datetime) else i
+                 for i in dates]
+    return numpy.asarray(dates, dtype='datetime64[D]')
+
+
+def to_dates(days):
+    """Return list of datetime.date for datetime64[D] array days."""
+    return days.astype(datetime.date).tolist()
+
+
+class TradingCalendar(object):
+    """Trading days of one exchange."""
+
+    def __init__(self, holidays=None, weekmask=WEEKMASK):
+        self.holidays = numpy.unique(to_days(list(holidays or [])))
+        self.busdaycal = numpy.busdaycalendar(weekmask=weekmask,
+                                              holidays=self.holidays)
+
+    def is_trading_day(self, dates):
+        """Return bool (array) True where dates are trading days."""
+        return numpy.is_busday(to_days(dates), busdaycal=self.busdaycal)
+
+    def check_date(self, date):
+        """Return True if date is a trading day, False otherwise."""
+        return bool(self.is_trading_day(date))
+
+    def offset(self, dates, offsets, roll='forward'):
+        """
+        Return datetime64[D] (array) offsets trading days from dates,
+        rolled to a trading day first as for numpy.busday_offset.
+
+        """
+        return numpy.busday_offset(to_days(dates), offsets, roll=roll,
+                                   busdaycal=self.busdaycal)
+
+    def count(self, start, end):
+        """Return number (array) of trading days in [start, end)."""
+        return numpy.busday_count(to_days(start), to_days(end),
+                                  busdaycal=self.busdaycal)
+
+    def trading_days(self, start, end):
+        """Return datetime64[D] array of trading days start through end."""
+        days = numpy.arange(to_days(start), to_days(end) + 1,
+                            dtype='datetime64[D]')
+        return days[self.is_trading_day(days)]
+
+    def missing_days(self, dates):
+        """
+        Return datetime64[D] array of trading days between the first
+        and last of dates that are not in dates.
+
+        """
+        days = numpy.unique(to_days(list(dates)))
+        if not len(days):
+            return days
+        return numpy.setdiff1d(self.trading_days(days[0], days[-1]), days,
+                               assume_unique=True)
+
+    def trading_dates(self, start, end):
+        """Return list of datetime.date trading days start through end."""
+        return to_dates(self.trading_days(start, end))
+
+
+def read_holidays(filename):
+    """Return list of YYYY-MM-DD holiday strings in filename."""
+    with open(filename, 'r') as infile:
+        values = [i.strip() for i in infile]
+    return [i for i in values if i]
+
+
+def get_holidays_file(exchange=None):
+    """Return holidays file for exchange, else the shared one."""
+    home = os.getenv('BICYCLE_HOME')
+    if exchange:
+        infile = os.path.join(home, EXCHANGE_HOLIDAYS.format(
+            exchange.lower()))
+        if os.path.isfile(infile):
+            return infile
+    return os.path.join(home, HOLIDAYS)
+
+
+def get_calendar(exchange=None):
+    """Return TradingCalendar for exchange (shared holidays if None)."""
+    infile = get_holidays_file(exchange)
+    if exchange and infile == get_holidays_file() and \
+            exchange.lower() not in US_EXCHANGES and exchange not in WARNED:
+        WARNED.add(exchange)
+        sys.stderr.write("No holidays file for {0}; using US holidays of "
+                         "{1}.\n".format(exchange, infile))
+    if infile not in CALENDARS:
+        CALENDARS[infile] = TradingCalendar(read_holidays(infile))
+    return CALENDARS[infile]
@@ -0,0 +1,164 @@
+"""
+Compression codecs for ticker plant partitions.
+
+A partition's codec is given by its file extension:
+
+none : SYMBOL.tks
+gzip : SYMBOL.tks.gz
+bz2 : SYMBOL.tks.bz2
+lzma : SYMBOL.tks.xz
+
+so every reader works on any codec. lzma needs the lzma module
+(Python 3) or backports.lzma (Python 2).
+
+"""
+
+import bz2
+import gzip
+import os
+import zlib
+
+try:
+    import lzma
+except ImportError:
+    try:
+        from backports import lzma
+    except ImportError:
+        lzma = None
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+SUFFIX = '.tks'
+
+EXTENSIONS = {'none': '',
+              'gzip': '.gz',
+              'bz2': '.bz2',
+              'lzma': '.xz'}
+
+LEVELS = {'none': None,
+          'gzip': 6,
+          'bz2': 9,
+          'lzma': 6}
+
+ALIASES = {'zlib': 'gzip',
+           'gz': 'gzip',
+           'xz': 'lzma',
+           'plain': 'none'}
+
+DEFAULT = 'bz2'
+
+GZIP_WBITS = 16 + zlib.MAX_WBITS
+
+
+def check_codec(codec):
+    """Return canonical codec name, raise ValueError if unavailable."""
+    codec = ALIASES.get(codec, codec)
+    if codec not in EXTENSIONS:
+        raise ValueError("Unknown codec {0}.".format(codec))
+    if codec == 'lzma' and lzma is None:
+        raise ValueError("Codec lzma requires lzma or backports.lzma.")
+    return codec
+
+
+def get_codec(filename):
+    """Return codec name for filename from its extension."""
+    for codec, extension in EXTENSIONS.items():
+        if extension and filename.endswith(SUFFIX + extension):
+            return codec
+    return 'none'
+
+
+def is_tks(filename):
+    """Return True if filename is a text partition of any codec."""
+    return any(filename.endswith(SUFFIX + i) for i in EXTENSIONS.values())
+
+
+def get_filename(symbol, codec=DEFAULT):
+    """Return partition file name for symbol written with codec."""
+    return symbol + SUFFIX + EXTENSIONS[check_codec(codec)]
+
+
+def get_level(codec, level=None):
+    """Return compression level, default for codec if level is None."""
+    if level is None:
+        return LEVELS[check_codec(codec)]
+    return int(level)
+
+
+def find_tks(dirname, symbol):
+    """
+    Return path of partition for symbol in dirname written with any
+    codec, or None if there is none.
+
+    """
+    for codec in ['none', 'bz2', 'gzip', 'lzma']:
+        infile = os.path.join(dirname, symbol + SUFFIX + EXTENSIONS[codec])
+        if os.path.isfile(infile):
+            return infile
+    return None
+
+
+def open_tks(filename, mode='rb', **kwargs):
+    """
+    Return file object for partition filename. The codec is taken from
+    the extension unless given as codec; level is used when writing.
+
+    """
+    codec = check_codec(kwargs.get('codec') or get_codec(filename))
+    level = get_level(codec, kwargs.get('level'))
+    writing = mode[0] in 'wa'
+    if codec == 'none':
+        return open(filename, mode)
+    if codec == 'gzip':
+        if writing:
+            return gzip.GzipFile(filename, mode, compresslevel=level)
+        return gzip.GzipFile(filename, mode)
+    if codec == 'bz2':
+        if writing:
+            return bz2.BZ2File(filename, mode, compresslevel=level)
+        return bz2.BZ2File(filename, mode)
+    if writing:
+        return lzma.LZMAFile(filename, mode, preset=level)
+    return lzma.LZMAFile(filename, mode)
+
+
+def read_lines(filename):
+    """Return lines of partition filename without newlines."""
+    infile = open_tks(filename, 'rb')
+    try:
+        values = infile.read().splitlines()
+    finally:
+        infile.close()
+    return [i.strip() for i in values if i.strip()]
+
+
+def compress(data, codec=DEFAULT, level=None):
+    """
+    Return data compressed in memory with codec, in the same format as
+    a partition file written with that codec.
+
+    """
+    codec = check_codec(codec)
+    level = get_level(codec, level)
+    if codec == 'none':
+        return data
+    if codec == 'gzip':
+        packer = zlib.compressobj(level, zlib.DEFLATED, GZIP_WBITS)
+        return packer.compress(data) + packer.flush()
+    if codec == 'bz2':
+        return bz2.compress(data, level)
+    return lzma.compress(data, preset=level)
+
+
+def decompress(data, codec=DEFAULT):
+    """Return data decompressed in memory with codec."""
+    codec = check_codec(codec)
+    if codec == 'none':
+        return data
+    if codec == 'gzip':
+        return zlib.decompress(data, GZIP_WBITS)
+    if codec == 'bz2':
+        return bz2.decompress(data)
+    return lzma.decompress(data)
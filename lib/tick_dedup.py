@@ -0,0 +1,249 @@
+"""
+Duplicate tick removal.
+
+A duplicate is a row whose timestamp repeats an earlier row's. Rows
+sharing a timestamp are resolved to one with a policy:
+
+first : keep the first row
+last : keep the last row
+volume : keep the row with the highest volume (first of ties)
+orders : keep the row with the most orders (first of ties)
+merge : one bar with open of the first row, highest high, lowest
+        low, close of the last row, summed volume and orders, and
+        volume-weighted vwap
+
+Groups are found on the timestamp column with NumPy alone (a diff
+when the rows are already sorted, as partitions are, otherwise a
+stable sort) and every policy is a grouped reduction. The resolved
+row takes the place of its group's first row. remove_duplicates()
+takes a symbol's whole history at once and rewrites only the
+partitions and packed files that change, each after copying it to a
+.original backup; resolve_lines() applies a policy to text lines at
+ingestion time.
+
+"""
+
+import collections
+import shutil
+
+import numpy
+
+import tick_binary
+import tick_blocks
+import tick_layout
+import tick_partition
+import tick_scan
+import tick_text
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+BACKUP = '.original'
+
+POLICIES = ['first', 'last', 'volume', 'orders', 'merge']
+
+
+def get_keep(timestamps):
+    """Return boolean mask of the first row of each value in timestamps."""
+    keep = numpy.ones(len(timestamps), dtype=bool)
+    if len(timestamps) < 2:
+        return keep
+    diff = numpy.diff(timestamps)
+    if (diff >= 0).all():
+        keep[1:] = diff != 0
+        return keep
+    order = numpy.argsort(timestamps, kind='mergesort')
+    ordered = timestamps[order]
+    first = numpy.ones(len(order), dtype=bool)
+    first[1:] = ordered[1:] != ordered[:-1]
+    keep[:] = False
+    keep[order[first]] = True
+    return keep
+
+
+def check_policy(policy):
+    """Return policy, raise ValueError if it is unknown."""
+    if policy not in POLICIES:
+        raise ValueError("Unknown duplicate policy {0}.".format(policy))
+    return policy
+
+
+def get_groups(timestamps):
+    """
+    Return tuple of stable order sorting timestamps and start index
+    (into the sorted rows) of each run of equal timestamps.
+
+    """
+    order = numpy.arange(len(timestamps))
+    if len(timestamps) > 1 and (numpy.diff(timestamps) < 0).any():
+        order = numpy.argsort(timestamps, kind='mergesort')
+    ordered = timestamps[order]
+    first = numpy.ones(len(order), dtype=bool)
+    first[1:] = ordered[1:] != ordered[:-1]
+    return order, numpy.flatnonzero(first)
+
+
+def merge_groups(data, starts):
+    """Return one merged bar per group of sorted data beginning at starts."""
+    ends = numpy.append(starts[1:], len(data)) - 1
+    values = data[starts].copy()
+    values['high'] = numpy.maximum.reduceat(data['high'], starts)
+    values['low'] = numpy.minimum.reduceat(data['low'], starts)
+    values['close'] = data['close'][ends]
+    values['volume'] = numpy.add.reduceat(data['volume'], starts)
+    values['orders'] = numpy.add.reduceat(data['orders'], starts)
+    values['gaps'] = numpy.logical_or.reduceat(data['gaps'], starts)
+    # Volume-weighted vwap; groups without volume keep a plain mean.
+    volume = values['volume'].astype(float)
+    weighted = numpy.add.reduceat(data['vwap'] * data['volume'], starts)
+    mean = numpy.add.reduceat(data['vwap'], starts) / \
+        numpy.diff(numpy.append(starts, len(data)))
+    values['vwap'] = numpy.where(
+        volume > 0, weighted / numpy.where(volume > 0, volume, 1), mean)
+    return values
+
+
+def resolve(data, policy='first'):
+    """
+    Return tuple of data with each group of rows sharing a timestamp
+    resolved to one row by policy, and the number of rows removed.
+
+    """
+    check_policy(policy)
+    if len(data) < 2:
+        return data, 0
+    order, starts = get_groups(data['timestamp'])
+    if len(starts) == len(data):
+        return data, 0
+    if policy in ['volume', 'orders']:
+        # Within each timestamp, largest value first, ties in row order.
+        order = numpy.lexsort((-data[policy], data['timestamp']))
+    ends = numpy.append(starts[1:], len(data)) - 1
+    if policy == 'merge':
+        values = merge_groups(data[order], starts)
+    elif policy == 'last':
+        values = data[order[ends]]
+    else:
+        values = data[order[starts]]
+    # Keep groups at the position of their first row.
+    positions = numpy.minimum.reduceat(order, starts)
+    values = values[numpy.argsort(positions, kind='mergesort')]
+    return values, len(data) - len(values)
+
+
+def resolve_lines(lines, policy='first'):
+    """
+    Return tuple of text partition lines with duplicates resolved by
+    policy, and the number of lines removed. Only lines sharing a
+    timestamp are parsed; the rest are passed through as they are.
+
+    """
+    check_policy(policy)
+    if len(lines) < 2:
+        return lines, 0
+    timestamps = tick_text.get_timestamps(lines)
+    order, starts = get_groups(timestamps)
+    if len(starts) == len(lines):
+        return lines, 0
+    if policy == 'first':
+        keep = get_keep(timestamps)
+        return ([i for i, j in zip(lines, keep) if j],
+                len(lines) - int(keep.sum()))
+    counts = numpy.diff(numpy.append(starts, len(lines)))
+    repeated = numpy.repeat(counts > 1, counts)
+    rows = numpy.sort(order[repeated])
+    values, removed = resolve(tick_binary.parse_lines(
+        [lines[i] for i in rows]), policy)
+    # Each resolved row replaces the first line of its group.
+    keep = get_keep(timestamps)
+    keep[rows] = False
+    firsts = rows[get_keep(timestamps[rows])]
+    replaced = dict(zip(firsts.tolist(),
+                        [tick_binary.TEXT_FORMAT % i
+                         for i in values.tolist()]))
+    return ([replaced.get(i, line) for i, line in enumerate(lines)
+             if keep[i] or i in replaced], removed)
+
+
+def get_options(partition):
+    """Return write_array options preserving the codec of partition."""
+    if partition.codec != 'blocks':
+        return {}
+    with open(partition.path, 'rb') as infile:
+        rows, codec, dtype, index = tick_blocks.read_index(infile)
+    return {'codec': codec}
+
+
+def write_packed(filename, period, changed, **kwargs):
+    """
+    Rewrite packed filename of period with the days in dict changed
+    (arrays keyed on day number) replaced, backing it up first unless
+    backup is False. Return manifest entries of the changed days.
+
+    """
+    index, data = tick_layout.load_packed(filename)
+    days = dict((day, numpy.array(data[first:first + rows]))
+                for day, first, rows in index.tolist())
+    days.update(changed)
+    if kwargs.get('backup', True):
+        shutil.copyfile(filename, filename + BACKUP)
+    tick_writer.write_atomic(filename, tick_layout.pack(days.items()),
+                             dirs=kwargs.get('dirs', None))
+    return tick_layout.get_entries(
+        tick_layout.get_tree_path(filename, period), filename,
+        sorted(changed.items()), period)
+
+
+def remove_duplicates(partitions, **kwargs):
+    """
+    Resolve duplicate rows in partitions, a list of tick_scan Partition
+    for one symbol (or contract), with policy. Rows repeating a
+    timestamp of an earlier partition are dropped. Rewrite only day
+    partitions and packed files (see tick_layout) that change, backing
+    each up first unless backup is False. Return number of rows
+    removed.
+
+    """
+    policy = check_policy(kwargs.get('policy', 'first'))
+    backup = kwargs.get('backup', True)
+    partitions = [i for i in partitions if i.size]
+    # Only the timestamp columns are held; changed days are reloaded.
+    timestamps = [numpy.array(tick_scan.load(i)['timestamp'])
+                  for i in partitions]
+    if not timestamps:
+        return 0
+    keep = get_keep(numpy.concatenate(timestamps))
+    if keep.all():
+        return 0
+    bounds = numpy.cumsum([0] + [len(i) for i in timestamps])
+    removed = 0
+    dirs = set()
+    entries = []
+    packed = collections.defaultdict(dict)
+    for i, partition in enumerate(partitions):
+        mask = keep[bounds[i]:bounds[i + 1]]
+        if mask.all():
+            continue
+        data = numpy.array(tick_scan.load(partition))
+        earlier = timestamps[i][get_keep(timestamps[i]) & ~mask]
+        values, count = resolve(
+            data[~numpy.in1d(data['timestamp'], earlier)], policy)
+        removed += len(data) - len(values)
+        if partition.codec in tick_layout.SUFFIXES:
+            # Days of one packed file are rewritten together.
+            packed[(partition.path, partition.codec)][
+                tick_partition.get_date_day(partition.date)] = values
+            continue
+        if backup:
+            shutil.copyfile(partition.path, partition.path + BACKUP)
+        entries.append(tick_writer.write_array(partition.path, values,
+                                               dirs=dirs,
+                                               **get_options(partition)))
+    for (filename, period), changed in sorted(packed.items()):
+        entries.extend(write_packed(filename, period, changed,
+                                    backup=backup, dirs=dirs))
+    tick_writer.sync_dirs(dirs)
+    tick_writer.update_manifest(entries)
+    return removed
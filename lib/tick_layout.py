@@ -0,0 +1,376 @@
+"""
+Consolidated month and year partition layouts.
+
+By default a symbol tree holds one partition per trading day under
+YYYY/MM/DD. The packed layouts hold a symbol's month in
+YYYY/MM/SYMBOL.tkm, or its year in YYYY/SYMBOL.tky, as one file:
+
+magic : 4 bytes, '\\x93TKP'
+version : uint16
+header length : uint16, bytes before the day index
+rows : uint64
+days : uint32
+dtype : repr of dtype.descr, ASCII, space padded
+index : days rows of (day, first, rows), int64, sorted on day
+ticks : rows of dtype, days in index order
+
+where day is the UTC day number and first the offset of the day's
+first tick. Rows are memory mapped, so loading one day from a packed
+file costs as little as loading a .tkb day partition. load_day() and
+iter_days() read any layout, so day-level callers do not change;
+load_day() also resolves pointer partitions (see tick_pointer).
+
+The manifest keeps one entry per packed day, with PATH the day
+directory joined with the packed file name, BYTES and CHECKSUM taken
+over the day's rows, and CODEC the period.
+
+"""
+
+import ast
+import collections
+import datetime
+import os
+import struct
+
+import numpy
+
+import tick_binary
+import tick_codecs
+import tick_manifest
+import tick_partition
+import tick_pointer
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+MAGIC = '\x93TKP'
+VERSION = 1
+PREFIX = struct.Struct('<4sHHQI')
+INDEX = numpy.dtype([('day', '<i8'), ('first', '<i8'), ('rows', '<i8')])
+
+SUFFIXES = {'month': '.tkm',
+            'year': '.tky'}
+
+
+def get_packed_file(path, symbol, date, period):
+    """Return packed file holding date for symbol under tree path."""
+    if period == 'month':
+        return os.path.join(path, '{0:04d}'.format(date.year),
+                            '{0:02d}'.format(date.month),
+                            symbol + SUFFIXES[period])
+    return os.path.join(path, '{0:04d}'.format(date.year),
+                        symbol + SUFFIXES[period])
+
+
+def get_tree_path(filename, period):
+    """Return symbol tree holding packed filename of period."""
+    path = os.path.dirname(os.path.abspath(filename))
+    if period == 'month':
+        path = os.path.dirname(path)
+    return os.path.dirname(path)
+
+
+def get_symbol(name):
+    """Return symbol for partition or packed file name, else None."""
+    for suffix in SUFFIXES.values():
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    if tick_binary.is_partition(name):
+        return tick_binary.get_symbol(name)
+    return None
+
+
+def pack(days):
+    """Return packed file contents for list of (day, array) pairs."""
+    days = sorted(days, key=lambda x: x[0])
+    index = numpy.zeros(len(days), dtype=INDEX)
+    offset = 0
+    for i, (day, data) in enumerate(days):
+        index[i] = (day, offset, len(data))
+        offset += len(data)
+    descr = repr(tick_binary.RECORDTYPE.descr)
+    length = PREFIX.size + len(descr) + 1
+    length += -length % tick_binary.ALIGN
+    header = PREFIX.pack(MAGIC, VERSION, length, offset, len(days)) + descr
+    header += ' ' * (length - len(header) - 1) + '\n'
+    rows = [numpy.ascontiguousarray(
+        numpy.asarray(data, dtype=tick_binary.RECORDTYPE))
+        for day, data in days]
+    return header + index.tostring() + ''.join(i.tostring() for i in rows)
+
+
+def read_index(filename):
+    """Return tuple of day index, dtype, and offset of the first row."""
+    with open(filename, 'rb') as infile:
+        prefix = infile.read(PREFIX.size)
+        if len(prefix) != PREFIX.size:
+            raise ValueError("Truncated packed header.")
+        magic, version, length, rows, days = PREFIX.unpack(prefix)
+        if magic != MAGIC:
+            raise ValueError("Not a packed tick file.")
+        if version > VERSION:
+            raise ValueError("Unsupported packed version {0}.".format(
+                version))
+        descr = infile.read(length - PREFIX.size).strip()
+        index = numpy.fromstring(infile.read(days * INDEX.itemsize),
+                                 dtype=INDEX)
+    dtype = numpy.dtype(ast.literal_eval(descr))
+    return index, dtype, length + days * INDEX.itemsize
+
+
+def load_packed(filename):
+    """Return tuple of day index and memory-mapped rows of filename."""
+    index, dtype, offset = read_index(filename)
+    rows = int(index['rows'].sum())
+    if rows == 0:
+        return index, numpy.zeros(0, dtype=dtype)
+    return index, numpy.memmap(filename, dtype=dtype, mode='r',
+                               offset=offset, shape=(rows,))
+
+
+def load_packed_day(filename, day):
+    """Return rows of UTC day number day in packed filename, or None."""
+    index, data = load_packed(filename)
+    i = numpy.searchsorted(index['day'], day)
+    if i == len(index) or index['day'][i] != day:
+        return None
+    first = index['first'][i]
+    return data[first:first + index['rows'][i]]
+
+
+def load_day(path, symbol, date, low=None, high=None):
+    """
+    Return ticks of symbol on date from tree path in any layout, or
+    None if there is no partition for that day. Block partitions
+    decompress only blocks holding low <= timestamp < high. A pointer
+    for date wins over partitions of the tree itself.
+
+    """
+    pointers = tick_pointer.read_pointers(
+        tick_pointer.get_pointer_file(path, symbol))
+    if date in pointers:
+        pointer = pointers[date]
+        data = load_day(tick_pointer.get_source_path(pointer), symbol, date)
+        if data is None:
+            return None
+        return tick_pointer.resolve(pointer, data)
+    dirname = tick_partition.get_day_path(path, date)
+    if os.path.isdir(dirname):
+        infile = tick_binary.find_partition(dirname, symbol)
+        if infile is not None:
+            return tick_binary.load_partition(infile, low, high)
+    day = (date - tick_partition.EPOCH).days
+    for period in ['month', 'year']:
+        infile = get_packed_file(path, symbol, date, period)
+        if os.path.isfile(infile):
+            return load_packed_day(infile, day)
+    return None
+
+
+def iter_day_files(path):
+    """Yield (date, symbol, filename) for day partitions under path."""
+    for year in sorted(os.listdir(path)):
+        if not (year.isdigit() and len(year) == 4):
+            continue
+        for month in sorted(os.listdir(os.path.join(path, year))):
+            if not (month.isdigit() and len(month) == 2):
+                continue
+            for day in sorted(os.listdir(os.path.join(path, year, month))):
+                dirname = os.path.join(path, year, month, day)
+                if not (day.isdigit() and os.path.isdir(dirname)):
+                    continue
+                date = datetime.date(int(year), int(month), int(day))
+                for name in sorted(os.listdir(dirname)):
+                    symbol = get_symbol(name)
+                    if symbol is not None and not name.endswith(
+                            tuple(SUFFIXES.values())):
+                        yield date, symbol, os.path.join(dirname, name)
+
+
+def iter_day_partitions(path):
+    """
+    Yield (date, symbol, filename, others) for each day of each symbol
+    with day partitions under path, where filename is the partition
+    readers use (see tick_binary.find_partition) and others are the
+    stale partitions of the same day in other formats.
+
+    """
+    days = collections.OrderedDict()
+    for date, symbol, infile in iter_day_files(path):
+        days.setdefault((date, symbol), []).append(infile)
+    for (date, symbol), files in days.items():
+        infile = tick_binary.find_partition(os.path.dirname(files[0]),
+                                            symbol)
+        if infile in files:
+            yield date, symbol, infile, [i for i in files if i != infile]
+
+
+def iter_packed_files(path):
+    """Yield (period, symbol, filename) for packed files under path."""
+    for dirname, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            for period, suffix in SUFFIXES.items():
+                if name.endswith(suffix):
+                    yield period, name[:-len(suffix)], \
+                        os.path.join(dirname, name)
+
+
+def iter_days(path, symbol):
+    """Yield (date, ticks) for every day of symbol under tree path."""
+    days = {}
+    for period, name, infile in iter_packed_files(path):
+        if name != symbol:
+            continue
+        index, data = load_packed(infile)
+        for day, first, rows in index.tolist():
+            days[day] = data[first:first + rows]
+    for date, name, infile, others in iter_day_partitions(path):
+        if name == symbol:
+            days[(date - tick_partition.EPOCH).days] = \
+                tick_binary.load_partition(infile)
+    for date in tick_pointer.read_pointers(
+            tick_pointer.get_pointer_file(path, symbol)):
+        data = load_day(path, symbol, date)
+        if data is not None:
+            days[tick_partition.get_date_day(date)] = data
+    for day in sorted(days):
+        yield tick_partition.get_day_date(day), days[day]
+
+
+def get_tree_days(path, symbol):
+    """
+    Return sorted UTC day numbers of symbol under tree path in any
+    layout, from file names, packed indexes, and pointers only.
+
+    """
+    days = set()
+    if os.path.isdir(path):
+        for period, name, infile in iter_packed_files(path):
+            if name == symbol:
+                days.update(read_index(infile)[0]['day'].tolist())
+        days.update(tick_partition.get_date_day(date) for date, name, infile
+                    in iter_day_files(path) if name == symbol)
+    days.update(tick_partition.get_date_day(i) for i in
+                tick_pointer.read_pointers(
+                    tick_pointer.get_pointer_file(path, symbol)))
+    return sorted(days)
+
+
+def get_entries(path, filename, days, period):
+    """
+    Return manifest entries for days, list of (day, array), packed in
+    filename under tree path. Each entry's path is the day directory
+    joined with the packed file name.
+
+    """
+    values = []
+    for day, data in days:
+        date = tick_partition.get_day_date(day)
+        first = last = float('nan')
+        if len(data):
+            first = data['timestamp'][0]
+            last = data['timestamp'][-1]
+        values.append(tick_manifest.make_entry(
+            os.path.join(tick_partition.get_day_path(path, date),
+                         os.path.basename(filename)),
+            numpy.asarray(data).tostring(), first, last, len(data), period))
+    return values
+
+
+def remove_empty_dirs(path, dirname):
+    """Remove dirname and its empty parents up to (not including) path."""
+    path = os.path.abspath(path)
+    dirname = os.path.abspath(dirname)
+    while dirname != path and dirname.startswith(path):
+        try:
+            os.rmdir(dirname)
+        except OSError:
+            break
+        dirname = os.path.dirname(dirname)
+
+
+def pack_tree(path, period='month'):
+    """
+    Pack day partitions and packed files of another period under tree
+    path into one file per symbol and period. Return files written.
+
+    """
+    groups = collections.defaultdict(dict)
+    sources = set()
+    packed = []
+    for other, symbol, infile in iter_packed_files(path):
+        index, data = load_packed(infile)
+        for day, first, rows in index.tolist():
+            date = tick_partition.get_day_date(day)
+            outfile = get_packed_file(path, symbol, date, period)
+            groups[outfile][day] = numpy.array(data[first:first + rows])
+            if infile != outfile:
+                sources.add(infile)
+    # Day partitions are newer than packed days they overlap; only the
+    # one readers use is packed.
+    for date, symbol, infile, others in iter_day_partitions(path):
+        outfile = get_packed_file(path, symbol, date, period)
+        day = (date - tick_partition.EPOCH).days
+        groups[outfile][day] = numpy.array(tick_binary.load_partition(infile))
+        packed.append((symbol, infile, os.stat(infile).st_mtime, others))
+    dirs = set()
+    entries = []
+    for outfile in sorted(groups):
+        days = sorted(groups[outfile].items())
+        tick_writer.write_atomic(outfile, pack(days), dirs=dirs)
+        entries.extend(get_entries(path, outfile, days, period))
+    tick_writer.sync_dirs(dirs)
+    tick_writer.update_manifest(entries)
+    for infile in sorted(sources):
+        if os.path.isfile(infile):
+            os.remove(infile)
+            remove_empty_dirs(path, os.path.dirname(infile))
+    # A day written while packing keeps its partitions, which readers
+    # use before the packed copy.
+    for symbol, infile, mtime, others in packed:
+        dirname = os.path.dirname(infile)
+        if tick_binary.find_partition(dirname, symbol) != infile or \
+                os.stat(infile).st_mtime != mtime:
+            continue
+        for name in [infile] + others:
+            if os.path.isfile(name):
+                os.remove(name)
+        remove_empty_dirs(path, dirname)
+    return len(groups)
+
+
+def unpack_tree(path, codec='binary', level=None):
+    """
+    Write every day in packed files under tree path back to a day
+    partition (binary, or text with codec). Return days written.
+
+    """
+    dirs = set()
+    entries = []
+    packed = list(iter_packed_files(path))
+    for period, symbol, infile in packed:
+        index, data = load_packed(infile)
+        for day, first, rows in index.tolist():
+            dirname = tick_partition.get_day_path(
+                path, tick_partition.get_day_date(day))
+            tick_partition.make_dirs(dirname)
+            if codec == 'binary':
+                outfile = os.path.join(dirname,
+                                       tick_binary.get_filename(symbol))
+                entries.append(tick_writer.write_array(
+                    outfile, data[first:first + rows], dirs=dirs))
+            else:
+                outfile = os.path.join(
+                    dirname, tick_codecs.get_filename(symbol, codec))
+                entries.append(tick_writer.write_array(
+                    outfile, data[first:first + rows], codec=codec,
+                    level=level, dirs=dirs))
+    tick_writer.sync_dirs(dirs)
+    tick_writer.update_manifest(entries)
+    for period, symbol, infile in packed:
+        os.remove(infile)
+        remove_empty_dirs(path, os.path.dirname(infile))
+    return len(entries)
@@ -0,0 +1,144 @@
+"""
+Partition manifests.
+
+Each symbol (or contract) tree has one manifest, kept with the other
+metadata outside the YYYY/MM/DD tree (see tick_partition.get_meta_path).
+It holds one line per day partition:
+
+PATH FIRST LAST ROWS BYTES CODEC CHECKSUM
+
+where PATH is YYYY/MM/DD/FILE relative to the tree, FIRST and LAST are
+UNIX timestamps of the first and last ticks, BYTES is the file size,
+CODEC is the codec (or binary), and CHECKSUM is the CRC-32 of the file
+contents in hex. Writers record entries as they write partitions, so
+statistics can be answered without opening tick files.
+
+"""
+
+import collections
+import datetime
+import os
+import zlib
+
+import tick_partition
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+MANIFEST = 'manifest'
+
+Entry = collections.namedtuple('Entry', ['path', 'first', 'last', 'rows',
+                                         'size', 'codec', 'checksum'])
+
+
+def get_checksum(data):
+    """Return CRC-32 of string data as 8 hex digits."""
+    return '{0:08x}'.format(zlib.crc32(data) & 0xffffffff)
+
+
+def get_date(entry):
+    """Return (year, month, day) strings for entry."""
+    year, month, day = entry.path.split('/')[:3]
+    return year, month, day
+
+
+def get_tree_path(filename):
+    """Return symbol tree holding partition filename (above YYYY/MM/DD)."""
+    path = os.path.abspath(filename)
+    for i in range(4):
+        path = os.path.dirname(path)
+    return path
+
+
+def make_entry(filename, data, first, last, rows, codec):
+    """Return Entry for partition filename just written with data."""
+    return Entry(os.path.abspath(filename), float(first), float(last),
+                 int(rows), len(data), codec, get_checksum(data))
+
+
+def format_entry(entry):
+    """Return manifest line for entry."""
+    return '{0} {1:.6f} {2:.6f} {3} {4} {5} {6}'.format(*entry)
+
+
+def parse_entry(line):
+    """Return Entry for manifest line."""
+    path, first, last, rows, size, codec, checksum = line.split()
+    return Entry(path, float(first), float(last), int(rows), int(size),
+                 codec, checksum)
+
+
+def get_manifest_file(path):
+    """Return manifest file name for symbol tree path."""
+    return tick_partition.get_meta_path(path, MANIFEST)
+
+
+def read_manifest(path):
+    """
+    Return list of Entry for symbol tree path sorted on date, or None
+    if the tree has no manifest.
+
+    """
+    infile = get_manifest_file(path)
+    if not os.path.isfile(infile):
+        return None
+    with open(infile, 'r') as tmp:
+        values = [parse_entry(i) for i in tmp if i.strip()]
+    return sorted(values, key=lambda x: x.path)
+
+
+def merge_entries(path, entries, new):
+    """
+    Return entries updated with new entries (absolute or relative
+    paths) for symbol tree path. One entry is kept per day.
+
+    """
+    values = collections.OrderedDict((os.path.dirname(i.path), i)
+                                     for i in entries or [])
+    for i in new:
+        relpath = i.path
+        if os.path.isabs(relpath):
+            relpath = os.path.relpath(relpath, path).replace(os.sep, '/')
+        values[os.path.dirname(relpath)] = i._replace(path=relpath)
+    return sorted(values.values(), key=lambda x: x.path)
+
+
+def format_manifest(entries):
+    """Return manifest file contents for entries."""
+    return ''.join(format_entry(i) + '\n' for i in entries)
+
+
+def format_time(timestamp, fmt='%Y/%m/%d %H:%M:%S'):
+    """Return UTC time string for timestamp."""
+    return datetime.datetime.utcfromtimestamp(timestamp).strftime(fmt)
+
+
+def get_missing_dates(entries):
+    """Return YYYY/MM/DD dates of empty partitions in entries."""
+    return ['/'.join(get_date(i)) for i in entries if i.rows == 0]
+
+
+def get_tks_datetime(entries, **kwargs):
+    """
+    Return list of 'start end' strings for non-empty partitions in
+    entries (rows may be None if not counted), start formatted with
+    fmt and end with end_fmt.
+
+    """
+    fmt = kwargs.get('fmt', '%Y/%m/%d %H:%M:%S')
+    end_fmt = kwargs.get('end_fmt', '%H:%M:%S')
+    return [format_time(i.first, fmt) + ' ' + format_time(i.last, end_fmt)
+            for i in entries if i.rows != 0]
+
+
+def get_tks_data(entries, exchange, label, **kwargs):
+    """
+    Return list of [exchange, label, year, month, day, start, end,
+    rows] for non-empty partitions in entries, times formatted with fmt.
+
+    """
+    fmt = kwargs.get('fmt', '%Y/%m/%d %H:%M:%S')
+    return [[exchange, label] + list(get_date(i)) +
+            [format_time(i.first, fmt), format_time(i.last, fmt), i.rows]
+            for i in entries if i.rows]
@@ -0,0 +1,254 @@
+"""
+Plant-wide overlap detection.
+
+Per-partition duplicate removal (see tick_dedup) cannot see ticks
+written twice across partitions: a day appended to its own file again,
+the same day held in two formats (or in a day file and a packed file),
+or the same bars copied into an adjacent contract or day. Each
+partition is hashed once into an index kept with the plant metadata
+(see tick_partition.get_meta_path), one line per partition:
+
+PATH SIZE MTIME ROWS OUTSIDE RESETS DIGEST BLOCKS
+
+where PATH is relative to the plant root (packed days as in a
+manifest), SIZE and MTIME identify the file contents hashed, OUTSIDE
+counts ticks outside the partition's day (its UTC day, or its trading
+session in a tree partitioned on sessions), RESETS counts places
+where timestamps go backwards, DIGEST hashes every row, and BLOCKS is
+a comma-separated list of digests of contiguous runs of rows within
+one BLOCK_SECONDS span of time (- if none). Rows are hashed after
+rounding to the precision of text partitions, so a copy in another
+format hashes the same. update_index() rehashes only partitions whose
+size or mtime changed; find_overlaps() reads the index alone.
+
+"""
+
+import collections
+import hashlib
+import multiprocessing
+import os
+
+import numpy
+
+import tick_binary
+import tick_partition
+import tick_scan
+import tick_session
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+INDEX = 'overlap'
+BLOCK_SECONDS = 900
+# Runs shorter than this are too common to mean a copy.
+MIN_ROWS = 4
+DIGITS = 16
+
+Record = collections.namedtuple('Record', ['path', 'size', 'mtime', 'rows',
+                                           'outside', 'resets', 'digest',
+                                           'blocks'])
+
+Finding = collections.namedtuple('Finding', ['kind', 'count', 'paths'])
+
+
+def get_digest(data):
+    """Return hex digest of canonical rows of structured array data."""
+    values = numpy.zeros(len(data), dtype=tick_binary.RECORDTYPE)
+    for name in tick_binary.RECORDTYPE.names:
+        values[name] = data[name]
+        if values.dtype[name].kind == 'f':
+            values[name] = numpy.round(values[name], 6)
+    return hashlib.sha1(values.tostring()).hexdigest()[:DIGITS]
+
+
+def get_runs(timestamps):
+    """
+    Return list of (first, last) row ranges of timestamps, split where
+    the BLOCK_SECONDS span changes or timestamps go backwards.
+
+    """
+    if not len(timestamps):
+        return []
+    spans = numpy.floor_divide(timestamps, BLOCK_SECONDS)
+    breaks = numpy.flatnonzero((numpy.diff(spans) != 0) |
+                               (numpy.diff(timestamps) < 0)) + 1
+    starts = numpy.append(0, breaks)
+    ends = numpy.append(breaks, len(timestamps))
+    return zip(starts.tolist(), ends.tolist())
+
+
+def get_relpath(partition):
+    """Return index path of partition relative to its plant root."""
+    dirname = tick_partition.get_day_path(
+        os.path.join(partition.exchange, partition.symbol,
+                     partition.contract), partition.date)
+    return os.path.join(dirname, os.path.basename(partition.path)).replace(
+        os.sep, '/')
+
+
+def hash_partition(task):
+    """
+    Return Record for task of (partition, size, mtime, session),
+    hashing the rows of partition; session is the tree's Session if it
+    is partitioned on sessions, else None.
+
+    """
+    partition, size, mtime, session = task
+    path = get_relpath(partition)
+    data = tick_scan.load(partition) if partition.size else None
+    if data is None or not len(data):
+        return Record(path, size, mtime, 0, 0, 0, '-', '-')
+    timestamps = numpy.asarray(data['timestamp'])
+    if session is None:
+        days = tick_partition.get_days(timestamps)
+    else:
+        days = tick_session.get_session_days(timestamps, session)
+    outside = int((days != tick_partition.get_date_day(
+        partition.date)).sum())
+    resets = int((numpy.diff(timestamps) < 0).sum())
+    blocks = [get_digest(data[first:last])
+              for first, last in get_runs(timestamps)
+              if last - first >= MIN_ROWS]
+    return Record(path, size, mtime, len(data), outside, resets,
+                  get_digest(data), ','.join(blocks) or '-')
+
+
+def format_record(record):
+    """Return index line for record."""
+    return '{0} {1} {2:.6f} {3} {4} {5} {6} {7}'.format(*record)
+
+
+def parse_record(line):
+    """Return Record for index line."""
+    path, size, mtime, rows, outside, resets, digest, blocks = line.split()
+    return Record(path, int(size), float(mtime), int(rows), int(outside),
+                  int(resets), digest, blocks)
+
+
+def get_index_file(root):
+    """Return overlap index file name for plant root."""
+    return tick_partition.get_meta_path(root, INDEX)
+
+
+def read_index(root):
+    """Return dict of Record for plant root keyed on path (empty if none)."""
+    infile = get_index_file(root)
+    if not os.path.isfile(infile):
+        return {}
+    with open(infile, 'r') as tmp:
+        values = [parse_record(i) for i in tmp if i.strip()]
+    return dict((i.path, i) for i in values)
+
+
+def write_index(root, records):
+    """Write records (sorted on path) as the overlap index of root."""
+    outfile = get_index_file(root)
+    tick_partition.make_dirs(os.path.dirname(outfile))
+    tick_writer.write_atomic(outfile, ''.join(
+        format_record(i) + '\n'
+        for i in sorted(records, key=lambda x: x.path)))
+
+
+def update_index(root, exchanges=None, jobs=1):
+    """
+    Bring the overlap index of plant root up to date for every
+    partition on exchanges (all if None), hashing on jobs processes
+    only partitions that are new or changed. Return tuple of records
+    and number of partitions hashed.
+
+    """
+    index = read_index(root)
+    stats = {}
+    records = []
+    tasks = []
+    for exchange, symbol, contract, path in tick_scan.find_trees(root,
+                                                                 exchanges):
+        session = tick_session.get_tree_session(path)
+        for partition in tick_scan.scan_tree(path, exchange=exchange,
+                                             symbol=symbol,
+                                             contract=contract, every=True):
+            # Packed files hold many days; stat each once.
+            if partition.path not in stats:
+                stats[partition.path] = os.stat(partition.path)
+            info = stats[partition.path]
+            record = index.get(get_relpath(partition))
+            if (record is not None and record.size == info.st_size and
+                    abs(record.mtime - info.st_mtime) < 1e-6):
+                records.append(record)
+            else:
+                tasks.append((partition, info.st_size, info.st_mtime,
+                              session))
+    if jobs > 1 and len(tasks) > 1:
+        pool = multiprocessing.Pool(jobs)
+        try:
+            records.extend(pool.map(hash_partition, tasks))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        records.extend(hash_partition(i) for i in tasks)
+    if exchanges is not None:
+        # Keep records of exchanges not scanned this time.
+        records.extend(i for i in index.values()
+                       if i.path.split('/', 1)[0] not in exchanges)
+    write_index(root, records)
+    return records, len(tasks)
+
+
+def find_overlaps(records):
+    """
+    Return list of Finding for records of an overlap index, with
+    count the rows involved (runs for blocks):
+
+    outside : ticks outside the partition's day
+    doubled : timestamps going backwards, as when a day is appended to
+              its partition again
+    day : the same day held by more than one partition of a tree
+    copy : partitions with identical rows
+    blocks : runs of rows repeated in other partitions
+
+    """
+    values = []
+    for i in records:
+        if i.outside:
+            values.append(Finding('outside', i.outside, [i.path]))
+        if i.resets:
+            values.append(Finding('doubled', i.rows, [i.path]))
+    days = collections.defaultdict(list)
+    digests = collections.defaultdict(list)
+    for i in records:
+        days[i.path.rsplit('/', 1)[0]].append(i)
+        if i.rows:
+            digests[i.digest].append(i)
+    for key in sorted(days):
+        if len(days[key]) > 1:
+            values.append(Finding('day', max(i.rows for i in days[key]),
+                                  sorted(i.path for i in days[key])))
+    copies = set()
+    for digest in sorted(digests):
+        group = digests[digest]
+        if len(group) > 1:
+            paths = sorted(i.path for i in group)
+            copies.add(tuple(paths))
+            values.append(Finding('copy', group[0].rows, paths))
+    # Group repeated runs by the partitions sharing them.
+    owners = collections.defaultdict(set)
+    for i in records:
+        if i.blocks == '-':
+            continue
+        for block in i.blocks.split(','):
+            owners[block].add(i.path)
+    shared = collections.Counter(tuple(sorted(paths))
+                                 for paths in owners.values()
+                                 if len(paths) > 1)
+    for paths in sorted(shared):
+        if paths not in copies:
+            values.append(Finding('blocks', shared[paths], list(paths)))
+    return values
+
+
+def format_finding(finding):
+    """Return report line for finding: KIND COUNT PATH [PATH ...]."""
+    return ' '.join([finding.kind, str(finding.count)] + finding.paths)
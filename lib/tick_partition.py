@@ -0,0 +1,187 @@
+"""
+Single-pass partitioning of sorted tick data into UTC days.
+
+Tick data is a list of strings (or any sequence of records) whose
+first field is a UNIX timestamp. Day boundaries are found in one walk
+over the data, so a multi-year contract costs O(ticks), not
+O(days x ticks).
+
+"""
+
+import datetime
+import errno
+import itertools
+import os
+
+import numpy
+
+import tick_text
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+EPOCH = datetime.date(1970, 1, 1)
+SECONDS_PER_DAY = 86400
+
+
+def get_day(timestamp):
+    """Return UTC day number (days since epoch) for a UNIX timestamp."""
+    return int(timestamp // SECONDS_PER_DAY)
+
+
+def get_days(timestamps):
+    """Return int array of UTC day numbers for array of timestamps."""
+    return numpy.floor_divide(numpy.asarray(timestamps, dtype=float),
+                              SECONDS_PER_DAY).astype(int)
+
+
+def get_day_bounds(timestamps, days=None):
+    """
+    Return list of (day, first, last) tuples for sorted timestamps,
+    where timestamps[first:last] are all the ticks on day number day:
+    the UTC day, or the day given for each tick in days.
+
+    """
+    if not len(timestamps):
+        return []
+    if days is None:
+        days = get_days(timestamps)
+    starts = numpy.append(0, numpy.flatnonzero(numpy.diff(days)) + 1)
+    ends = numpy.append(starts[1:], len(days))
+    return zip(days[starts].tolist(), starts.tolist(), ends.tolist())
+
+
+def get_day_date(day):
+    """Return datetime.date for UTC day number."""
+    return EPOCH + datetime.timedelta(days=day)
+
+
+def get_date_day(date):
+    """Return day number of datetime.date date."""
+    return (date - EPOCH).days
+
+
+def get_day_path(path, date):
+    """Return YYYY/MM/DD partition directory under path for date."""
+    return os.path.join(path,
+                        '{0:04d}'.format(date.year),
+                        '{0:02d}'.format(date.month),
+                        '{0:02d}'.format(date.day))
+
+
+def get_meta_path(path, name):
+    """
+    Return path of metadata file name for the partition tree at path.
+
+    Metadata is kept outside the YYYY/MM/DD tree, under
+    $TICKS_HOME/.meta/<path relative to $TICKS_HOME>, so directory
+    walks over the plant never see it.
+
+    """
+    path = os.path.abspath(path)
+    root = os.getenv('TICKS_HOME')
+    if root:
+        root = os.path.abspath(root)
+        relpath = os.path.relpath(path, root)
+        if not relpath.startswith(os.pardir):
+            return os.path.join(root, '.meta', relpath, name)
+    return os.path.join(os.path.dirname(path), '.meta',
+                        os.path.basename(path), name)
+
+
+def is_day_path(path):
+    """Return True if path ends in a YYYY/MM/DD partition directory."""
+    parts = os.path.normpath(path).split(os.sep)[-3:]
+    return ([len(i) for i in parts] == [4, 2, 2] and
+            all(i.isdigit() for i in parts))
+
+
+def make_dirs(path):
+    """
+    Create directory path and any missing parents, tolerating another
+    process creating the same directories concurrently.
+
+    """
+    try:
+        os.makedirs(path, 0755)
+    except OSError as err:
+        if err.errno != errno.EEXIST or not os.path.isdir(path):
+            raise
+
+
+def get_timestamps(data):
+    """Return list of float timestamps from first field of data lines."""
+    return tick_text.get_timestamps(data).tolist()
+
+
+def iter_days(data, start=None, end=None, **kwargs):
+    """
+    Yield (date, subset) for each UTC day in data, in a single pass.
+
+    data is a list of tick lines; it is sorted on the full numeric
+    timestamp first if it is not already in order. Days before start
+    or after end (datetime.date or datetime.datetime) are skipped, as
+    are non-trading days of calendar (a tick_calendar.TradingCalendar,
+    tested for all days at once) and days for which check(date) is
+    False. Ticks are assigned to days by get_days (UTC days by
+    default; see tick_session for trading sessions).
+
+    """
+    calendar = kwargs.get('calendar', None)
+    check = kwargs.get('check', None)
+    days = kwargs.get('get_days', get_days)
+    timestamps = kwargs.get('timestamps', None)
+    if timestamps is None:
+        timestamps = get_timestamps(data)
+    timestamps = numpy.asarray(timestamps, dtype=float)
+    if (numpy.diff(timestamps) < 0).any():
+        order = numpy.argsort(timestamps, kind='mergesort')
+        data = [data[i] for i in order]
+        timestamps = timestamps[order]
+    if isinstance(start, datetime.datetime):
+        start = start.date()
+    if isinstance(end, datetime.datetime):
+        end = end.date()
+    bounds = get_day_bounds(timestamps, days(timestamps))
+    trading = [True] * len(bounds)
+    if calendar is not None and bounds:
+        trading = calendar.is_trading_day(
+            numpy.array([i[0] for i in bounds], dtype='datetime64[D]'))
+    for (day, first, last), ok in zip(bounds, trading):
+        date = get_day_date(day)
+        if start is not None and date < start:
+            continue
+        if end is not None and date > end:
+            break
+        if not ok or (check is not None and not check(date)):
+            continue
+        yield date, data[first:last]
+
+
+def iter_record_days(records, start=None, end=None, **kwargs):
+    """
+    Yield (date, subset) for each UTC day in an iterable of sorted
+    (timestamp, line) records, holding one day in memory at a time.
+    Arguments are as for iter_days, but with get_day mapping one
+    timestamp to its day number; subset is a list of lines.
+
+    """
+    calendar = kwargs.get('calendar', None)
+    check = kwargs.get('check', None)
+    day_of = kwargs.get('get_day', get_day)
+    if isinstance(start, datetime.datetime):
+        start = start.date()
+    if isinstance(end, datetime.datetime):
+        end = end.date()
+    for day, group in itertools.groupby(records, lambda x: day_of(x[0])):
+        date = get_day_date(day)
+        if start is not None and date < start:
+            continue
+        if end is not None and date > end:
+            break
+        if calendar is not None and not calendar.check_date(date):
+            continue
+        if check is not None and not check(date):
+            continue
+        yield date, [i[1] for i in group]
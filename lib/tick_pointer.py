@@ -0,0 +1,125 @@
+"""
+Pointer partitions for series spliced from other symbol trees.
+
+A rolling futures series (see tick_roll) holds no ticks of its own: a
+pointer file SYMBOL.tkp at the top of its tree has one line per day,
+
+DATE SOURCE FIRST LAST OFFSET
+
+naming the symbol tree SOURCE (relative to $TICKS_HOME) whose
+partition for DATE supplies rows FIRST up to LAST, with OFFSET added
+to every price. LAST is - for a range open to the end of the day, so
+a pointer to a whole day follows its source when ticks are added to it
+or duplicates are removed from it. tick_layout.load_day() resolves
+pointers, so series are read like any tree; rows of binary and packed
+partitions stay memory-mapped slices unless an offset must be added.
+A series costs one short line per day, and re-pointing it after a
+roll date changes rewrites only that file.
+
+"""
+
+import collections
+import datetime
+import os
+
+import numpy
+
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+SUFFIX = '.tkp'
+PRICES = ['open', 'high', 'low', 'close', 'vwap']
+
+Pointer = collections.namedtuple('Pointer', ['date', 'source', 'first',
+                                             'last', 'offset'])
+
+# Parsed pointer files keyed on file name, with the (size, mtime) read.
+POINTERS = {}
+
+
+def get_pointer_file(path, symbol):
+    """Return pointer file of symbol in tree path."""
+    return os.path.join(path, symbol + SUFFIX)
+
+
+def get_source(path):
+    """Return source tree relative to $TICKS_HOME, if under it."""
+    path = os.path.abspath(path)
+    root = os.getenv('TICKS_HOME')
+    if root:
+        relpath = os.path.relpath(path, os.path.abspath(root))
+        if not relpath.startswith(os.pardir):
+            return relpath.replace(os.sep, '/')
+    return path
+
+
+def get_source_path(pointer):
+    """Return absolute source tree of pointer."""
+    return os.path.join(os.getenv('TICKS_HOME') or '', pointer.source)
+
+
+def format_pointer(pointer):
+    """Return pointer file line for pointer (last None for open)."""
+    last = '-' if pointer.last is None else pointer.last
+    return '{0} {1} {2} {3} {4!r}'.format(pointer.date.isoformat(),
+                                          pointer.source, pointer.first,
+                                          last, pointer.offset)
+
+
+def parse_pointer(line):
+    """Return Pointer for pointer file line."""
+    date, source, first, last, offset = line.split()
+    return Pointer(datetime.datetime.strptime(date, '%Y-%m-%d').date(),
+                   source, int(first), None if last == '-' else int(last),
+                   float(offset))
+
+
+def read_pointers(filename):
+    """
+    Return dict of Pointer keyed on date from filename (empty if there
+    is none), parsed once per change of the file.
+
+    """
+    try:
+        info = os.stat(filename)
+    except OSError:
+        return {}
+    key = (info.st_size, info.st_mtime)
+    if filename not in POINTERS or POINTERS[filename][0] != key:
+        with open(filename, 'r') as infile:
+            values = [parse_pointer(i) for i in infile if i.strip()]
+        POINTERS[filename] = key, dict((i.date, i) for i in values)
+    return POINTERS[filename][1]
+
+
+def write_pointers(filename, pointers, **kwargs):
+    """
+    Merge list of Pointer into filename, one per date, replacing all
+    of its pointers if replace is True.
+
+    """
+    replace = kwargs.get('replace', False)
+    values = {} if replace else dict(read_pointers(filename))
+    values.update((i.date, i) for i in pointers)
+    tick_writer.write_atomic(filename, ''.join(
+        format_pointer(values[i]) + '\n' for i in sorted(values)),
+        dirs=kwargs.get('dirs', None))
+    POINTERS.pop(filename, None)
+
+
+def adjust(data, offset):
+    """Return ticks data with offset added to every price (a copy)."""
+    if not offset:
+        return data
+    values = numpy.array(data)
+    for name in PRICES:
+        values[name] += offset
+    return values
+
+
+def resolve(pointer, data):
+    """Return rows of pointer in ticks data of its source day."""
+    return adjust(data[pointer.first:pointer.last], pointer.offset)
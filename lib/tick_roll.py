@@ -0,0 +1,424 @@
+"""
+Continuous futures series spliced from contract partitions.
+
+Roll dates are read from etc/conf.d/futures/ib/expiry-rolls.txt, one
+contract per line,
+
+SYMBOL CONTRACT EXCHANGE FIRST LAST ROLL
+
+with FIRST and LAST its first and last trading dates and ROLL the date
+from which the next contract is traded in its place. On a date, the
+front contract ([0]) of a root is the first whose roll date is after
+that date, and [k] is the k-th contract after the front. get_index()
+parses the file into a RollIndex once per change of its mtime:
+
+>>> get_index().active_contract('CL', [1326758400.0, 1326844800.0])
+array(['201202', '201203'], dtype='|S6')
+
+Series [0] through [N] are written under the rolling group of the
+plant, as pointers to the contract partitions (see tick_pointer),
+
+$TICKS_HOME/rolling/SOURCE/EXCHANGE/SYMBOL/K/SYMBOL.tkp
+
+or as copies in YYYY/MM/DD/SYMBOL.tkb, so they are read like any
+symbol tree (TickStore.read('rolling', exchange, symbol, str(k), ...))
+and are not scanned with the contract trees. Each series records the
+contract and price offset of each day in its metadata (see
+get_roll_log). Back-adjusted series add to every price the sum of the
+gaps (next contract's close less this contract's close on the trading
+day before the roll) of every later roll of the whole schedule that
+has been measured, so the latest contract is unadjusted; when a roll
+is first measured, every earlier day of the series is moved again.
+
+"""
+
+import collections
+import datetime
+import os
+
+import numpy
+
+import tick_binary
+import tick_calendar
+import tick_layout
+import tick_partition
+import tick_pointer
+import tick_session
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+ROLLS = 'etc/conf.d/futures/ib/expiry-rolls.txt'
+GROUP = 'rolling'
+ROLL_LOG = 'rolls'
+GAPS = 'gaps'
+
+# RollIndex keyed on roll file, with the mtime read.
+INDEXES = {}
+
+Roll = collections.namedtuple('Roll', ['symbol', 'contract', 'exchange',
+                                       'first', 'last', 'roll'])
+
+
+def get_rolls_file():
+    """Return the expiry-rolls.txt of $BICYCLE_HOME."""
+    return os.path.join(os.getenv('BICYCLE_HOME'), ROLLS)
+
+
+def to_date(value):
+    """Return datetime.date for YYYY-MM-DD string value."""
+    return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def read_rolls(filename=None):
+    """Return list of Roll in filename (expiry-rolls.txt if None)."""
+    if filename is None:
+        filename = get_rolls_file()
+    values = []
+    with open(filename, 'r') as infile:
+        for line in infile:
+            fields = line.split()
+            if len(fields) != 6 or fields[0].startswith('#'):
+                continue
+            symbol, contract, exchange = fields[:3]
+            values.append(Roll(symbol, contract, exchange.lower(),
+                               *[to_date(i) for i in fields[3:]]))
+    return values
+
+
+def get_schedules(rolls):
+    """
+    Return OrderedDict of lists of Roll sorted on contract, keyed on
+    (exchange, symbol).
+
+    """
+    values = collections.defaultdict(list)
+    for i in rolls:
+        values[(i.exchange, i.symbol)].append(i)
+    return collections.OrderedDict(
+        (key, sorted(values[key], key=lambda x: x.contract))
+        for key in sorted(values))
+
+
+class RollIndex(object):
+    """
+    Roll schedules of every root in a roll file, as sorted arrays of
+    contracts and of roll boundaries (UNIX timestamps of UTC midnight
+    of each roll date), so the contract [k] active at any number of
+    timestamps is found with one binary search.
+
+    """
+
+    def __init__(self, rolls):
+        self.schedules = {}
+        self.contracts = {}
+        self.bounds = {}
+        for (exchange, symbol), schedule in get_schedules(rolls).items():
+            self.schedules[symbol] = schedule
+            self.contracts[symbol] = numpy.array(
+                [i.contract for i in schedule] + [''])
+            self.bounds[symbol] = numpy.array(
+                [i.roll for i in schedule], dtype='datetime64[D]').astype(
+                    'int64') * float(tick_partition.SECONDS_PER_DAY)
+
+    def get_roots(self, exchanges=None, symbols=None):
+        """
+        Return roots on exchanges and symbols (all if None), sorted on
+        exchange and symbol.
+
+        """
+        values = [(i[0].exchange, root)
+                  for root, i in self.schedules.items()]
+        return [root for exchange, root in sorted(values)
+                if (exchanges is None or exchange in exchanges) and
+                (symbols is None or root in symbols)]
+
+    def active_index(self, root, timestamps, depth=0):
+        """
+        Return int array of the index in the schedule of root of
+        contract [depth] at timestamps (UNIX, any shape; depth may be
+        an array broadcast against them), -1 where there is none.
+
+        """
+        values = numpy.searchsorted(self.bounds[root],
+                                    numpy.asarray(timestamps, dtype=float),
+                                    side='right') + depth
+        return numpy.where(values >= len(self.schedules[root]), -1, values)
+
+    def active_contract(self, root, timestamps, depth=0):
+        """
+        Return string array of contract [depth] of root at timestamps,
+        '' where there is none.
+
+        """
+        return self.contracts[root][self.active_index(root, timestamps,
+                                                      depth)]
+
+    def get_plan(self, root, dates, depth):
+        """
+        Return int array of shape (len(dates), depth + 1) of the index
+        in the schedule of root of contract [k] on each of dates, -1
+        where there is none.
+
+        """
+        days = numpy.array(dates, dtype='datetime64[D]').astype('int64')
+        return self.active_index(
+            root, days[:, None] * float(tick_partition.SECONDS_PER_DAY),
+            numpy.arange(depth + 1))
+
+
+def get_index(filename=None):
+    """
+    Return RollIndex of filename (expiry-rolls.txt if None), parsed
+    again only when its mtime changes.
+
+    """
+    if filename is None:
+        filename = get_rolls_file()
+    mtime = os.path.getmtime(filename)
+    if filename not in INDEXES or INDEXES[filename][0] != mtime:
+        INDEXES[filename] = mtime, RollIndex(read_rolls(filename))
+    return INDEXES[filename][1]
+
+
+def get_last_close(path, symbol, date):
+    """Return last close of symbol tree path on date, or nan."""
+    data = tick_layout.load_day(path, symbol, date)
+    if data is None or not len(data):
+        return float('nan')
+    return float(data['close'][-1])
+
+
+def read_gaps(path):
+    """
+    Return dict of gaps measured for series tree path, keyed on
+    (date, contract, next contract).
+
+    """
+    infile = tick_partition.get_meta_path(path, GAPS)
+    if not os.path.isfile(infile):
+        return {}
+    values = {}
+    with open(infile, 'r') as tmp:
+        for line in tmp:
+            date, contract, following, gap = line.split()
+            values[(to_date(date), contract, following)] = float(gap)
+    return values
+
+
+def write_gaps(path, values):
+    """Replace the gaps of series tree path with dict values."""
+    outfile = tick_partition.get_meta_path(path, GAPS)
+    tick_partition.make_dirs(os.path.dirname(outfile))
+    tick_writer.write_atomic(outfile, ''.join(
+        '{0} {1} {2} {3!r}\n'.format(key[0].isoformat(), key[1], key[2],
+                                      values[key])
+        for key in sorted(values)))
+
+
+def get_gaps(index, symbol, depth, plant, path):
+    """
+    Return float array of the gap of series [depth] of root symbol at
+    each roll of its schedule: the close of the contract rolled into
+    less the close of the contract rolled out of, on the trading day
+    before the roll. Gaps are measured once, from contract trees under
+    plant, and kept in the metadata of series tree path; rolls without
+    both closes (as yet) add nothing.
+
+    """
+    schedule = index.schedules[symbol]
+    exchange = schedule[0].exchange
+    days = tick_calendar.to_dates(tick_calendar.get_calendar(
+        exchange).offset([i.roll for i in schedule], -1))
+    cached = read_gaps(path)
+    count = len(cached)
+    values = numpy.zeros(len(schedule))
+    for j, date in enumerate(days[:len(schedule) - depth - 1]):
+        old, new = schedule[j + depth], schedule[j + depth + 1]
+        key = (date, old.contract, new.contract)
+        if key not in cached:
+            gap = get_last_close(os.path.join(plant, exchange, symbol,
+                                              new.contract), symbol, date) - \
+                get_last_close(os.path.join(plant, exchange, symbol,
+                                            old.contract), symbol, date)
+            if numpy.isnan(gap):
+                continue
+            cached[key] = gap
+        values[j] = cached[key]
+    if len(cached) != count:
+        write_gaps(path, cached)
+    return values
+
+
+def get_offsets(gaps, fronts):
+    """
+    Return float array of back-adjustment offsets of days whose front
+    contracts have schedule indexes fronts: the sum of the gaps of
+    every later roll.
+
+    """
+    totals = numpy.append(numpy.cumsum(gaps[::-1])[::-1], 0.0)
+    return totals[numpy.asarray(fronts, dtype=int)]
+
+
+def readjust_series(path, symbol, schedule, depth, gaps, **kwargs):
+    """
+    Move every day in the roll log of series [depth] tree path to the
+    offset of gaps, rewriting the pointer or the copy of each day that
+    changed and the log. Return manifest entries of copies written.
+
+    """
+    dirs = kwargs.get('dirs', None)
+    log = get_roll_log(path)
+    if not log:
+        return []
+    positions = dict((j.contract, i) for i, j in enumerate(schedule))
+    known = [i for i in log if i[1] in positions]
+    offsets = get_offsets(gaps, [positions[i[1]] - depth for i in known])
+    filename = tick_pointer.get_pointer_file(path, symbol)
+    pointers = tick_pointer.read_pointers(filename)
+    moved = []
+    values = []
+    entries = []
+    for (date, contract, old), new in zip(known, offsets.tolist()):
+        if abs(new - old) < 1e-9:
+            continue
+        values.append((date, contract, new))
+        if date in pointers:
+            moved.append(pointers[date]._replace(offset=new))
+            continue
+        dirname = tick_partition.get_day_path(path, date)
+        infile = tick_binary.find_partition(dirname, symbol) \
+            if os.path.isdir(dirname) else None
+        if infile is not None:
+            entries.append(tick_writer.write_array(
+                infile, tick_pointer.adjust(numpy.array(
+                    tick_binary.load_partition(infile)), new - old),
+                dirs=dirs))
+    if moved:
+        tick_pointer.write_pointers(filename, moved, dirs=dirs)
+    if values:
+        set_roll_log(path, values)
+    return entries
+
+
+def get_series_path(root, exchange, symbol, depth):
+    """Return tree of series [depth] of symbol under rolling root."""
+    return os.path.join(root, exchange, symbol, str(depth))
+
+
+def get_roll_log(path):
+    """
+    Return list of (date, contract, offset) recorded for series tree
+    path, sorted on date.
+
+    """
+    infile = tick_partition.get_meta_path(path, ROLL_LOG)
+    if not os.path.isfile(infile):
+        return []
+    values = []
+    with open(infile, 'r') as tmp:
+        for line in tmp:
+            date, contract, offset = line.split()
+            values.append((to_date(date), contract, float(offset)))
+    return values
+
+
+def set_roll_log(path, values):
+    """Merge list of (date, contract, offset) into the log of path."""
+    days = dict((i[0], i) for i in get_roll_log(path))
+    days.update((i[0], i) for i in values)
+    outfile = tick_partition.get_meta_path(path, ROLL_LOG)
+    tick_partition.make_dirs(os.path.dirname(outfile))
+    tick_writer.write_atomic(outfile, ''.join(
+        '{0} {1} {2!r}\n'.format(i[0].isoformat(), i[1], i[2])
+        for key, i in sorted(days.items())))
+
+
+def build_series(index, symbol, dates, plant, root, **kwargs):
+    """
+    Write series [0] through [depth] of root symbol of RollIndex index
+    on dates under rolling root, from contract trees under plant, as
+    pointers (see tick_pointer) or, with copy, as binary partitions.
+    Every contract day is read once. With back-adjust, prices are
+    moved by the gaps of every later roll in the whole schedule, and
+    days written before are moved again as new rolls are measured.
+    Return number of days written.
+
+    """
+    depth = kwargs.get('depth', 0)
+    back_adjust = kwargs.get('adjust', False)
+    copy = kwargs.get('copy', False)
+    schedule = index.schedules[symbol]
+    exchange = schedule[0].exchange
+    paths = [os.path.join(plant, exchange, symbol, i.contract)
+             for i in schedule]
+    plan = index.get_plan(symbol, dates, depth)
+    outputs = [get_series_path(root, exchange, symbol, k)
+               for k in range(depth + 1)]
+    offsets = numpy.zeros(plan.shape)
+    gaps = []
+    if back_adjust:
+        for k, outpath in enumerate(outputs):
+            gaps.append(get_gaps(index, symbol, k, plant, outpath))
+            offsets[:, k] = get_offsets(gaps[k],
+                                        numpy.maximum(plan[:, k] - k, 0))
+    session = None
+    for i in paths:
+        session = tick_session.get_tree_session(i)
+        if session is not None:
+            break
+    dirs = set()
+    entries = []
+    pointers = [[] for k in outputs]
+    logs = [[] for k in outputs]
+    for i, date in enumerate(dates):
+        for k, outpath in enumerate(outputs):
+            if plan[i, k] < 0:
+                continue
+            data = tick_layout.load_day(paths[plan[i, k]], symbol, date)
+            if data is None or not len(data):
+                continue
+            if copy:
+                outdir = tick_partition.get_day_path(outpath, date)
+                tick_partition.make_dirs(outdir)
+                entries.append(tick_writer.write_array(
+                    os.path.join(outdir, tick_binary.get_filename(symbol)),
+                    tick_pointer.adjust(data, offsets[i, k]), dirs=dirs))
+            else:
+                pointers[k].append(tick_pointer.Pointer(
+                    date, tick_pointer.get_source(paths[plan[i, k]]), 0,
+                    None, float(offsets[i, k])))
+            logs[k].append((date, schedule[plan[i, k]].contract,
+                            offsets[i, k]))
+    for outpath, values, log in zip(outputs, pointers, logs):
+        if not log:
+            continue
+        filename = tick_pointer.get_pointer_file(outpath, symbol)
+        if copy:
+            # Copies replace pointers for the same days.
+            written = set(i[0] for i in log)
+            kept = [j for i, j in tick_pointer.read_pointers(
+                filename).items() if i not in written]
+            if kept:
+                tick_pointer.write_pointers(filename, kept, replace=True,
+                                            dirs=dirs)
+            elif os.path.isfile(filename):
+                os.remove(filename)
+        else:
+            tick_partition.make_dirs(outpath)
+            tick_pointer.write_pointers(filename, values, dirs=dirs)
+    for outpath, log in zip(outputs, logs):
+        if log:
+            set_roll_log(outpath, log)
+            if session is not None:
+                tick_session.set_tree_session(outpath, session)
+    # Move days written by earlier runs to the gaps of new rolls.
+    for k, values in enumerate(gaps):
+        entries.extend(readjust_series(outputs[k], symbol, schedule, k,
+                                       values, dirs=dirs))
+    tick_writer.sync_dirs(dirs)
+    tick_writer.update_manifest(entries)
+    return sum(len(i) for i in logs)
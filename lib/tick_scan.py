@@ -0,0 +1,283 @@
+"""
+Single-walk ticker plant scanner.
+
+A plant root ($TICKS_HOME/GROUP/SOURCE) holds symbol trees at
+EXCHANGE/SYMBOL or EXCHANGE/SYMBOL/CONTRACT, each with partitions under
+YYYY/MM/DD (or packed, see tick_layout). scan() lists every directory
+once with scandir and yields one Partition per day, its size taken
+from the directory entry, so reports need no further walks or stats.
+Symbol trees are spread over a thread pool, which overlaps the round
+trips of a network filesystem. scandir is os.scandir (Python 3) or the
+scandir package (Python 2); without either, entries are listed with
+os.listdir and stat'ed once each.
+
+"""
+
+import collections
+import datetime
+import itertools
+import multiprocessing.pool
+import os
+import stat
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+import tick_binary
+import tick_blocks
+import tick_codecs
+import tick_layout
+import tick_manifest
+import tick_partition
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+Partition = collections.namedtuple('Partition', ['exchange', 'symbol',
+                                                 'contract', 'date', 'size',
+                                                 'path', 'codec'])
+
+# Partition preferred for a day held in more than one format.
+PREFERENCE = [tick_binary.SUFFIX, tick_blocks.SUFFIX] + \
+    [tick_codecs.SUFFIX + tick_codecs.EXTENSIONS[i]
+     for i in ['none', 'bz2', 'gzip', 'lzma']]
+
+
+class DirEntry(object):
+    """Directory entry, for systems without scandir."""
+
+    def __init__(self, dirname, name):
+        self.name = name
+        self.path = os.path.join(dirname, name)
+        self.info = None
+
+    def stat(self):
+        """Return stat result of entry, cached after the first call."""
+        if self.info is None:
+            self.info = os.stat(self.path)
+        return self.info
+
+    def is_dir(self):
+        """Return True if entry is a directory."""
+        return stat.S_ISDIR(self.stat().st_mode)
+
+    def is_file(self):
+        """Return True if entry is a regular file."""
+        return stat.S_ISREG(self.stat().st_mode)
+
+
+def list_dir(dirname):
+    """Return entries of dirname sorted on name."""
+    if scandir is None:
+        values = [DirEntry(dirname, i) for i in os.listdir(dirname)]
+    else:
+        values = list(scandir(dirname))
+    return sorted(values, key=lambda x: x.name)
+
+
+def is_number(entry, digits):
+    """Return True if entry is a directory named with digits digits."""
+    return (len(entry.name) == digits and entry.name.isdigit() and
+            entry.is_dir())
+
+
+def get_packed(exchange, symbol, contract, entry, period):
+    """Return list of Partition for the days in packed file entry."""
+    index, dtype, offset = tick_layout.read_index(entry.path)
+    return [Partition(exchange, symbol, contract,
+                      tick_partition.get_day_date(day),
+                      rows * dtype.itemsize, entry.path, period)
+            for day, first, rows in index.tolist()]
+
+
+def scan_tree(path, **kwargs):
+    """
+    Return list of Partition for symbol tree path sorted on date, one
+    per day. A day partition wins over the same day in a packed file,
+    the newest day partition wins, and formats written at the same
+    time win in PREFERENCE order; with every True, every partition
+    holding a day is returned, the winner first.
+
+    """
+    exchange = kwargs.get('exchange', "")
+    symbol = kwargs.get('symbol', "")
+    contract = kwargs.get('contract', "")
+    every = kwargs.get('every', False)
+    names = [symbol + i for i in PREFERENCE]
+    days = collections.defaultdict(list)
+    packed = collections.defaultdict(list)
+    for year in list_dir(path):
+        if not is_number(year, 4):
+            continue
+        for month in list_dir(year.path):
+            if month.name == symbol + tick_layout.SUFFIXES['year']:
+                for i in get_packed(exchange, symbol, contract, month, 'year'):
+                    packed[i.date].append(i)
+            if not is_number(month, 2):
+                continue
+            for day in list_dir(month.path):
+                if day.name == symbol + tick_layout.SUFFIXES['month']:
+                    for i in get_packed(exchange, symbol, contract, day,
+                                        'month'):
+                        packed[i.date].append(i)
+                if not is_number(day, 2):
+                    continue
+                files = dict((i.name, i) for i in list_dir(day.path))
+                found = [(-files[name].stat().st_mtime, rank, files[name])
+                         for rank, name in enumerate(names)
+                         if name in files and files[name].is_file()]
+                # The newest file wins, as in tick_binary.find_partition.
+                for mtime, rank, entry in sorted(found):
+                    date = datetime.date(int(year.name), int(month.name),
+                                         int(day.name))
+                    days[date].append(Partition(
+                        exchange, symbol, contract, date,
+                        entry.stat().st_size, entry.path,
+                        tick_binary.get_codec(entry.name)))
+    # Month files win over year files.
+    for date, values in packed.items():
+        days[date].extend(sorted(values, key=lambda x: x.codec != 'month'))
+    if every:
+        return [i for date in sorted(days) for i in days[date]]
+    return [days[i][0] for i in sorted(days)]
+
+
+def find_trees(root, exchanges=None):
+    """
+    Return list of (exchange, symbol, contract, path) for the symbol
+    trees under plant root, on exchanges (all if None).
+
+    """
+    values = []
+    for exchange in list_dir(root):
+        if not exchange.is_dir() or exchange.name.startswith('.'):
+            continue
+        if exchanges is not None and exchange.name not in exchanges:
+            continue
+        for symbol in list_dir(exchange.path):
+            if not symbol.is_dir():
+                continue
+            children = [i for i in list_dir(symbol.path) if i.is_dir()]
+            if any(is_number(i, 4) for i in children):
+                values.append((exchange.name, symbol.name, "", symbol.path))
+                continue
+            for contract in children:
+                values.append((exchange.name, symbol.name, contract.name,
+                               contract.path))
+    return values
+
+
+def scan_task(tree):
+    """Return list of Partition for tree from find_trees."""
+    exchange, symbol, contract, path = tree
+    return scan_tree(path, exchange=exchange, symbol=symbol,
+                     contract=contract)
+
+
+def scan(root, exchanges=None, jobs=1):
+    """
+    Yield Partition for every day of every symbol tree under plant
+    root on exchanges, scanning jobs trees at a time.
+
+    """
+    trees = find_trees(root, exchanges)
+    if jobs <= 1:
+        for tree in trees:
+            for i in scan_task(tree):
+                yield i
+        return
+    pool = multiprocessing.pool.ThreadPool(jobs)
+    try:
+        for values in pool.imap(scan_task, trees):
+            for i in values:
+                yield i
+    finally:
+        pool.terminate()
+
+
+def scan_trees(root, exchanges=None, jobs=1):
+    """
+    Yield ((exchange, symbol, contract), partitions) for every symbol
+    tree with partitions under plant root on exchanges, from one scan()
+    of jobs trees at a time.
+
+    """
+    for key, values in itertools.groupby(
+            scan(root, exchanges, jobs),
+            lambda x: (x.exchange, x.symbol, x.contract)):
+        yield key, list(values)
+
+
+def load(partition):
+    """Return structured array of ticks in partition."""
+    if partition.codec in tick_layout.SUFFIXES:
+        return tick_layout.load_packed_day(
+            partition.path,
+            (partition.date - tick_partition.EPOCH).days)
+    return tick_binary.load_partition(partition.path)
+
+
+def get_relpath(partition):
+    """Return YYYY/MM/DD/FILE path of partition as in a manifest."""
+    return partition.date.strftime('%Y/%m/%d/') + \
+        os.path.basename(partition.path)
+
+
+def make_entry(partition, data):
+    """
+    Return manifest Entry (without checksum) for partition holding
+    structured array data, or None if it is empty.
+
+    """
+    first = last = float('nan')
+    rows = 0 if data is None else len(data)
+    if rows:
+        first = data['timestamp'][0]
+        last = data['timestamp'][-1]
+    return tick_manifest.Entry(get_relpath(partition), first, last, rows,
+                               partition.size, partition.codec, '-')
+
+
+def read_entry(partition, count=True):
+    """
+    Return manifest Entry (without checksum) for partition, reading
+    only its first and last records and row count. Unless count is
+    True, rows of a plain text partition are None rather than counted
+    by a scan of the whole file.
+
+    """
+    if partition.size == 0:
+        return make_entry(partition, None)
+    if partition.codec in tick_layout.SUFFIXES:
+        return make_entry(partition, load(partition))
+    first, last, rows = tick_binary.read_bounds(partition.path, count=count)
+    if first is None:
+        return make_entry(partition, None)
+    return tick_manifest.Entry(get_relpath(partition),
+                               float(first['timestamp']),
+                               float(last['timestamp']), rows,
+                               partition.size, partition.codec, '-')
+
+
+def read_entries(partitions, count=True):
+    """Return manifest Entry (without checksum) for each of partitions."""
+    return [read_entry(i, count) for i in partitions]
+
+
+def get_entries(path, symbol, count=True):
+    """
+    Return manifest entries for symbol tree path, read from its
+    manifest, or scanned from its partitions if it has none (with rows
+    None for uncounted text partitions unless count is True).
+
+    """
+    entries = tick_manifest.read_manifest(path)
+    if entries is None:
+        entries = read_entries(scan_tree(path, symbol=symbol), count)
+    return entries
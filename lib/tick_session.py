@@ -0,0 +1,271 @@
+"""
+Exchange trading sessions.
+
+GLOBEX, NYMEX, and ECBOT sessions open the evening before their
+trading day, so partitions split on UTC midnight hold parts of two
+sessions. Sessions are defined per exchange in config.ini,
+
+[sessions]
+    [[globex]]
+    open = 17:00
+    close = 16:00
+    timezone = America/Chicago
+
+with open and close local times in timezone (a zoneinfo name). A
+session that opens later in the day than it closes opens the evening
+before its trading day. A symbol tree written in session mode holds
+one partition per session under the YYYY/MM/DD of its trading day,
+and records the exchange in its metadata (see get_tree_session), so
+readers know partitions are not UTC days. Local times are converted
+with a table of the UTC offset transitions of each timezone, read
+once from the system zoneinfo by a child process (see
+load_transitions), so TZ is never changed in a threaded process.
+Writers seed the session and transition tables once with
+set_sessions before starting workers, which inherit them.
+
+"""
+
+import calendar
+import collections
+import datetime
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import numpy
+
+import tick_partition
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+SESSION = 'session'
+SECONDS_PER_HOUR = 3600
+
+Session = collections.namedtuple('Session', ['exchange', 'open', 'close',
+                                             'timezone'])
+
+# Last UTC day number of transition tables (2100-01-01).
+LAST_DAY = 47482
+
+ZONEINFO = ['/usr/share/zoneinfo', '/usr/lib/zoneinfo',
+            '/usr/share/lib/zoneinfo']
+
+SESSIONS = None
+TRANSITIONS = {}
+LOCK = threading.Lock()
+
+
+def parse_time(value):
+    """Return seconds after midnight for HH:MM[:SS] string value."""
+    fields = [int(i) for i in value.split(':')]
+    fields += [0] * (3 - len(fields))
+    return fields[0] * 3600 + fields[1] * 60 + fields[2]
+
+
+def check_timezone(timezone):
+    """Return timezone, raise ValueError if it is not a zoneinfo name."""
+    dirs = [os.getenv('TZDIR')] if os.getenv('TZDIR') else ZONEINFO
+    if not timezone.startswith('/') and '..' not in timezone.split('/'):
+        for i in dirs:
+            if os.path.isfile(os.path.join(i, timezone)):
+                return timezone
+    raise ValueError("Unknown timezone {0}.".format(timezone))
+
+
+def is_overnight(session):
+    """Return True if session opens the evening before its trading day."""
+    return session.open > session.close
+
+
+def read_sessions(config=None):
+    """
+    Return dict of Session keyed on exchange from the sessions section
+    of config (a configobj.ConfigObj; config.ini if None).
+
+    """
+    if config is None:
+        import configobj
+        config = configobj.ConfigObj(os.path.join(os.getenv('BICYCLE_HOME'),
+                                                  'config.ini'))
+    values = {}
+    for exchange, fields in config.get('sessions', {}).items():
+        values[exchange] = Session(exchange, parse_time(fields['open']),
+                                   parse_time(fields['close']),
+                                   check_timezone(
+                                       fields.get('timezone', 'UTC')))
+    return values
+
+
+def get_session(exchange):
+    """Return Session of exchange, or None if it has none."""
+    global SESSIONS
+    if SESSIONS is None:
+        SESSIONS = read_sessions()
+    return SESSIONS.get(exchange)
+
+
+def set_sessions(sessions):
+    """
+    Set the Session table of get_session to dict sessions (as from
+    read_sessions) and load the transitions of their timezones, so
+    that processes forked afterwards read neither config.ini nor the
+    zoneinfo.
+
+    """
+    global SESSIONS
+    SESSIONS = dict(sessions)
+    load_transitions(set(i.timezone for i in SESSIONS.values()))
+
+
+def find_transitions(first=0, last=LAST_DAY):
+    """
+    Return lists of the UTC hour numbers at which the UTC offset of
+    the local timezone changes, UTC days first through last, and of
+    the offsets (seconds east) from each. Only run where TZ may be
+    set, as in the process started by load_transitions.
+
+    """
+    def get_local_offset(hour):
+        """Return UTC offset of the local timezone at hour."""
+        utc = hour * SECONDS_PER_HOUR
+        return calendar.timegm(time.localtime(utc)) - utc
+
+    hours = [first * 24]
+    offsets = [get_local_offset(first * 24)]
+    for day in range(first + 1, last + 1):
+        if get_local_offset(day * 24) == offsets[-1]:
+            continue
+        for hour in range((day - 1) * 24 + 1, day * 24 + 1):
+            value = get_local_offset(hour)
+            if value != offsets[-1]:
+                hours.append(hour)
+                offsets.append(value)
+    return hours, offsets
+
+
+def load_transitions(timezones):
+    """
+    Build the transition tables of timezones not yet loaded, all in
+    one child process that sets TZ for each, since setting TZ and
+    calling time.tzset in this one would change local time for every
+    thread. Raise ValueError for an unknown timezone.
+
+    """
+    with LOCK:
+        names = sorted(set(check_timezone(i) for i in timezones) -
+                       set(TRANSITIONS))
+        if not names:
+            return
+        output = subprocess.check_output(
+            [sys.executable, os.path.splitext(__file__)[0] + '.py'] + names)
+        values = [i.split() for i in output.splitlines()]
+        for timezone in names:
+            rows = numpy.array([i[1:] for i in values if i[0] == timezone],
+                               dtype=int)
+            TRANSITIONS[timezone] = rows[:, 0], rows[:, 1]
+
+
+def get_transitions(timezone):
+    """
+    Return int arrays of UTC hour numbers and UTC offsets of timezone
+    from each (see find_transitions), loading its table if need be.
+
+    """
+    if timezone not in TRANSITIONS:
+        load_transitions([timezone])
+    return TRANSITIONS[timezone]
+
+
+def get_offsets(timestamps, timezone):
+    """
+    Return int array of UTC offsets (seconds east) of timezone at
+    timestamps, from its table of transitions.
+
+    """
+    hours, offsets = get_transitions(timezone)
+    index = numpy.searchsorted(
+        hours, numpy.floor_divide(numpy.asarray(timestamps, dtype=float),
+                                  SECONDS_PER_HOUR), side='right') - 1
+    return offsets[numpy.maximum(index, 0)]
+
+
+def get_offset(timestamp, timezone):
+    """Return UTC offset (seconds east) of timezone at timestamp."""
+    return int(get_offsets([timestamp], timezone)[0])
+
+
+def get_shift(session):
+    """
+    Return seconds added to local time so that a session's ticks fall
+    on its trading day.
+
+    """
+    if is_overnight(session):
+        return tick_partition.SECONDS_PER_DAY - session.open
+    return 0
+
+
+def get_session_days(timestamps, session):
+    """Return int array of trading day numbers of session at timestamps."""
+    timestamps = numpy.asarray(timestamps, dtype=float)
+    if not len(timestamps):
+        return numpy.zeros(0, dtype=int)
+    local = timestamps + get_offsets(timestamps, session.timezone) + \
+        get_shift(session)
+    return numpy.floor_divide(local, tick_partition.SECONDS_PER_DAY).astype(
+        int)
+
+
+def get_session_day(timestamp, session):
+    """Return trading day number of session at timestamp."""
+    local = timestamp + get_offset(timestamp, session.timezone) + \
+        get_shift(session)
+    return int(local // tick_partition.SECONDS_PER_DAY)
+
+
+def to_utc(date, seconds, timezone):
+    """Return UNIX timestamp of seconds after local midnight of date."""
+    local = calendar.timegm(date.timetuple()) + seconds
+    # The offset at the local time is taken as a first guess at the
+    # offset at the UTC time.
+    utc = local - get_offset(local, timezone)
+    return float(local - get_offset(utc, timezone))
+
+
+def get_session_bounds(date, session):
+    """Return UNIX timestamps of open and close of session on date."""
+    opens = date
+    if is_overnight(session):
+        opens = date - datetime.timedelta(days=1)
+    return (to_utc(opens, session.open, session.timezone),
+            to_utc(date, session.close, session.timezone))
+
+
+def get_tree_session(path):
+    """Return Session of symbol tree path in session mode, else None."""
+    infile = tick_partition.get_meta_path(path, SESSION)
+    if not os.path.isfile(infile):
+        return None
+    with open(infile, 'r') as tmp:
+        exchange = tmp.read().strip()
+    return get_session(exchange)
+
+
+def set_tree_session(path, session):
+    """Record that symbol tree path is partitioned on session."""
+    outfile = tick_partition.get_meta_path(path, SESSION)
+    tick_partition.make_dirs(os.path.dirname(outfile))
+    tick_writer.write_atomic(outfile, session.exchange + '\n')
+
+
+if __name__ == '__main__':
+    for timezone in sys.argv[1:]:
+        os.environ['TZ'] = timezone
+        time.tzset()
+        for pair in zip(*find_transitions()):
+            print("{0} {1} {2}").format(timezone, *pair)
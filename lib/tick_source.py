@@ -0,0 +1,103 @@
+"""
+Streaming reader for source tks files.
+
+Records are yielded as (timestamp, line) tuples in bounded memory.
+Input that is not in timestamp order is put in order with a chunked
+external merge sort on the full numeric timestamp; input that is
+already in order is streamed as is.
+
+"""
+
+import heapq
+import os
+import shutil
+import tempfile
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+CHUNK_SIZE = 1000000
+
+
+def get_timestamp(line):
+    """Return float timestamp from first field of a tks line."""
+    return float(line.split(None, 1)[0])
+
+
+def iter_records(infile):
+    """Yield (timestamp, line) for non-blank lines of infile."""
+    with open(infile, 'r') as tmp:
+        for line in tmp:
+            line = line.strip()
+            if line:
+                yield get_timestamp(line), line
+
+
+def is_sorted(infile):
+    """Return True if timestamps in infile are non-decreasing."""
+    last = None
+    for timestamp, line in iter_records(infile):
+        if last is not None and timestamp < last:
+            return False
+        last = timestamp
+    return True
+
+
+def iter_chunks(records, size):
+    """Yield lists of at most size records."""
+    chunk = []
+    for i in records:
+        chunk.append(i)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def write_run(chunk, path):
+    """Sort chunk on timestamp and write it to path as a sorted run."""
+    chunk.sort(key=lambda x: x[0])
+    with open(path, 'w') as outfile:
+        for timestamp, line in chunk:
+            outfile.write(line + '\n')
+
+
+def iter_run(path, run):
+    """Yield (timestamp, run, position, line) from a sorted run file."""
+    position = 0
+    for timestamp, line in iter_records(path):
+        yield timestamp, run, position, line
+        position += 1
+
+
+def iter_sorted(infile, **kwargs):
+    """
+    Yield (timestamp, line) records of infile in timestamp order.
+
+    Sorted input is streamed directly. Otherwise chunks of chunk_size
+    lines are sorted into run files under tmpdir and merged; equal
+    timestamps keep their input order.
+
+    """
+    chunk_size = kwargs.get('chunk_size', CHUNK_SIZE)
+    tmpdir = kwargs.get('tmpdir', None)
+    if is_sorted(infile):
+        for i in iter_records(infile):
+            yield i
+        return
+    workdir = tempfile.mkdtemp(prefix='tks-sort-', dir=tmpdir)
+    try:
+        runs = []
+        for chunk in iter_chunks(iter_records(infile), chunk_size):
+            path = os.path.join(workdir, '{0:06d}.run'.format(len(runs)))
+            write_run(chunk, path)
+            runs.append(path)
+        chunk = None
+        merged = heapq.merge(*[iter_run(name, run)
+                               for run, name in enumerate(runs)])
+        for timestamp, run, position, line in merged:
+            yield timestamp, line
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
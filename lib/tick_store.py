@@ -0,0 +1,272 @@
+"""
+Time-range reads across ticker plant day partitions.
+
+TickStore maps (group, exchange, symbol, contract) to a partition tree
+under $TICKS_HOME and returns one contiguous structured array of
+RECORDTYPE (or the requested fields) for any UTC range, e.g.
+
+>>> store = TickStore()
+>>> ticks = store.read('futures', 'nymex', 'CL', '201203',
+...                    datetime.datetime(2012, 1, 3, 14, 30),
+...                    datetime.datetime(2012, 1, 3, 15, 0),
+...                    fields=['timestamp', 'close', 'volume'])
+
+and read_window() returns the same intraday window over many days.
+The first and last day of a range are trimmed with a binary search
+on the timestamp column; binary and packed partitions (see tick_layout)
+are memory mapped, so only the rows and columns in range are copied.
+
+read_sessions() returns whole trading sessions (see tick_session)
+from trees partitioned on UTC days or on sessions. Ranges read from a
+session tree also open the partition of the following trading day,
+which holds the evening before it.
+
+"""
+
+import calendar
+import datetime
+import os
+
+import numpy
+
+import tick_binary
+import tick_layout
+import tick_manifest
+import tick_partition
+import tick_pointer
+import tick_session
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+# Day number past any partition, for ranges open at the end.
+MAX_DAY = 1 << 30
+
+
+def to_timestamp(value):
+    """Return UNIX timestamp for a naive UTC datetime, date, or number."""
+    if isinstance(value, datetime.datetime):
+        return calendar.timegm(value.utctimetuple()) + \
+            value.microsecond / 1e6
+    if isinstance(value, datetime.date):
+        return float(calendar.timegm(value.timetuple()))
+    return float(value)
+
+
+def to_seconds(value):
+    """Return seconds after midnight for a datetime.time or number."""
+    if isinstance(value, datetime.time):
+        return (value.hour * 3600 + value.minute * 60 + value.second +
+                value.microsecond / 1e6)
+    return float(value)
+
+
+def get_dtype(fields):
+    """Return dtype of RECORDTYPE restricted to fields (all if None)."""
+    if fields is None:
+        return tick_binary.RECORDTYPE
+    return numpy.dtype([(i, tick_binary.RECORDTYPE[i]) for i in fields])
+
+
+def get_bounds(data, low, high):
+    """Return index range of rows in data with low <= timestamp < high."""
+    timestamps = data['timestamp']
+    first = numpy.searchsorted(timestamps, low, side='left')
+    last = numpy.searchsorted(timestamps, high, side='left')
+    return int(first), int(last)
+
+
+class TickStore(object):
+    """Time-range tick queries over a ticker plant."""
+
+    def __init__(self, root=None, source='ib'):
+        if root is None:
+            root = os.getenv('TICKS_HOME')
+        self.root = root
+        self.source = source
+
+    def get_path(self, group, exchange, symbol, contract=""):
+        """Return partition tree for symbol (and contract)."""
+        return os.path.join(self.root, group, self.source, exchange,
+                            symbol, contract)
+
+    def get_days(self, path, first, last, symbol=None):
+        """
+        Return day numbers first through last of partitions with ticks
+        under path, from its manifest and the pointers of symbol if it
+        has either.
+
+        """
+        entries = tick_manifest.read_manifest(path)
+        pointers = {}
+        if symbol is not None:
+            pointers = tick_pointer.read_pointers(
+                tick_pointer.get_pointer_file(path, symbol))
+        if entries is None and not pointers:
+            return range(first, last + 1)
+        days = set(tick_partition.get_date_day(datetime.date(
+            *[int(j) for j in tick_manifest.get_date(i)]))
+            for i in entries or [] if i.rows)
+        days.update(tick_partition.get_date_day(i) for i in pointers)
+        return sorted(i for i in days if first <= i <= last)
+
+    def get_day_range(self, path, symbol, start, end):
+        """
+        Return tuple of UTC day numbers of start and end, where None is
+        the first or last day with ticks of symbol under path.
+
+        """
+        days = []
+        if start is None or end is None:
+            if tick_manifest.read_manifest(path) is None:
+                days = tick_layout.get_tree_days(path, symbol)
+            else:
+                days = self.get_days(path, 0, MAX_DAY, symbol)
+        if not len(days):
+            days = [0, -1]
+        first = days[0] if start is None else \
+            tick_partition.get_day(to_timestamp(start))
+        last = days[-1] if end is None else \
+            tick_partition.get_day(to_timestamp(end))
+        return first, last
+
+    def get_partitions(self, path, symbol, first, last, **kwargs):
+        """
+        Return list of (day, ticks) for symbol under path on UTC day
+        numbers first through last, in any partition layout. Block
+        partitions are only decompressed where low <= timestamp < high,
+        or between start_time and end_time seconds into each day.
+
+        """
+        low = kwargs.get('low', None)
+        high = kwargs.get('high', None)
+        start_time = kwargs.get('start_time', None)
+        end_time = kwargs.get('end_time', None)
+        values = []
+        for day in self.get_days(path, first, last, symbol):
+            if start_time is not None:
+                midnight = day * tick_partition.SECONDS_PER_DAY
+                low = midnight + start_time
+                high = midnight + end_time
+            data = tick_layout.load_day(path, symbol,
+                                        tick_partition.get_day_date(day),
+                                        low, high)
+            if data is not None:
+                values.append((day, data))
+        return values
+
+    def read(self, group, exchange, symbol, contract="", start=None,
+             end=None, fields=None):
+        """
+        Return structured array of ticks with start <= timestamp < end
+        (naive UTC datetimes or UNIX timestamps), restricted to fields.
+        A start or end of None leaves that end of the range open.
+
+        """
+        path = self.get_path(group, exchange, symbol, contract)
+        low = -numpy.inf if start is None else to_timestamp(start)
+        high = numpy.inf if end is None else to_timestamp(end)
+        first, last = self.get_day_range(
+            path, symbol, start,
+            None if end is None else numpy.nextafter(high, low))
+        if tick_session.get_tree_session(path) is not None:
+            last += 1
+        ranges = [(data, low, high) for day, data in
+                  self.get_partitions(path, symbol, first, last, low=low,
+                                      high=high)]
+        return self.read_ranges(ranges, fields)
+
+    def read_window(self, group, exchange, symbol, contract="",
+                    start=None, end=None, **kwargs):
+        """
+        Return structured array of ticks between start_time and
+        end_time (datetime.time or seconds after UTC midnight) on each
+        day from start through end (dates, None for the first or last
+        day with ticks), restricted to fields.
+
+        """
+        start_time = to_seconds(kwargs.get('start_time', 0))
+        end_time = to_seconds(kwargs.get('end_time',
+                                         tick_partition.SECONDS_PER_DAY))
+        fields = kwargs.get('fields', None)
+        path = self.get_path(group, exchange, symbol, contract)
+        first, last = self.get_day_range(path, symbol, start, end)
+        ranges = []
+        # A session partition holds the window of its own day and of
+        # the day before it; read whole partitions in time order.
+        if tick_session.get_tree_session(path) is not None:
+            for day, data in self.get_partitions(path, symbol, first,
+                                                 last + 1):
+                for i in [day - 1, day]:
+                    if first <= i <= last:
+                        midnight = i * tick_partition.SECONDS_PER_DAY
+                        ranges.append((data, midnight + start_time,
+                                       midnight + end_time))
+            return self.read_ranges(ranges, fields)
+        for day, data in self.get_partitions(path, symbol, first, last,
+                                             start_time=start_time,
+                                             end_time=end_time):
+            midnight = day * tick_partition.SECONDS_PER_DAY
+            ranges.append((data, midnight + start_time,
+                           midnight + end_time))
+        return self.read_ranges(ranges, fields)
+
+    def read_sessions(self, group, exchange, symbol, contract="",
+                      start=None, end=None, fields=None):
+        """
+        Return list of (date, ticks) for each trading session of
+        exchange from start through end (dates, None for the first or
+        last day with ticks) with ticks, restricted to fields. A session
+        tree returns its partitions as written; other trees return
+        ticks from open to close of each session.
+
+        """
+        path = self.get_path(group, exchange, symbol, contract)
+        first, last = self.get_day_range(path, symbol, start, end)
+        values = []
+        if tick_session.get_tree_session(path) is not None:
+            for day, data in self.get_partitions(path, symbol, first, last):
+                ticks = self.read_ranges([(data, -numpy.inf, numpy.inf)],
+                                         fields)
+                if len(ticks):
+                    values.append((tick_partition.get_day_date(day), ticks))
+            return values
+        session = tick_session.get_session(exchange)
+        if session is None:
+            raise ValueError("No session for exchange {0}.".format(exchange))
+        for day in range(first, last + 1):
+            date = tick_partition.get_day_date(day)
+            low, high = tick_session.get_session_bounds(date, session)
+            ticks = self.read(group, exchange, symbol, contract, low, high,
+                              fields)
+            if len(ticks):
+                values.append((date, ticks))
+        return values
+
+    def read_ranges(self, ranges, fields=None):
+        """
+        Return one contiguous array of the rows of each (ticks, low,
+        high) in ranges with low <= timestamp < high, where ticks is an
+        array or a partition file name.
+
+        """
+        slices = []
+        for data, low, high in ranges:
+            if isinstance(data, basestring):
+                data = tick_binary.load_partition(data)
+            first, last = get_bounds(data, low, high)
+            if last > first:
+                part = data[first:last]
+                # Release the rest of a parsed day; memory maps are free.
+                if not isinstance(data, numpy.memmap):
+                    part = part.copy()
+                slices.append(part)
+        dtype = get_dtype(fields)
+        values = numpy.empty(sum(len(i) for i in slices), dtype=dtype)
+        offset = 0
+        for i in slices:
+            for name in dtype.names:
+                values[name][offset:offset + len(i)] = i[name]
+            offset += len(i)
+        return values
@@ -0,0 +1,110 @@
+"""
+Bulk parser for text tick partitions.
+
+A text partition holds one tick per line, its fields separated by
+whitespace (see tick_binary.TEXT_FORMAT). numpy.loadtxt converts each
+field of each line in Python; here text is read in CHUNK byte pieces
+cut at line ends, every number of a piece is converted at once by
+numpy.fromstring, and the columns are copied into one structured
+array allocated for all rows. A one-row file gives a one-row array,
+never a 0-d one. Blank lines are skipped; text whose count of numbers
+does not fill its other lines raises ValueError.
+
+"""
+
+import numpy
+
+import tick_codecs
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+# Bytes parsed at a time when reading files.
+CHUNK = 1 << 22
+
+
+def parse_values(text, columns):
+    """
+    Return 2-d float array of the numbers in text, one row per line of
+    columns numbers.
+
+    """
+    text = text.strip()
+    if not text:
+        return numpy.zeros((0, columns))
+    values = numpy.fromstring(text, dtype=float, sep=' ')
+    rows = text.count('\n') + 1
+    if len(values) != rows * columns or '\n\n' in text:
+        # Blank lines are skipped, as numpy.loadtxt skips them.
+        rows = sum(1 for i in text.splitlines() if i.strip())
+    if len(values) != rows * columns:
+        raise ValueError("Expected {0} lines of {1} numbers.".format(
+            rows, columns))
+    return values.reshape(rows, columns)
+
+
+def to_array(blocks, dtype):
+    """Return structured array of dtype holding the rows of blocks."""
+    values = numpy.empty(sum(len(i) for i in blocks), dtype=dtype)
+    offset = 0
+    for block in blocks:
+        for i, name in enumerate(dtype.names):
+            values[name][offset:offset + len(block)] = block[:, i]
+        offset += len(block)
+    return values
+
+
+def join_lines(lines):
+    """Return text of lines, with or without their newlines."""
+    if lines[0].endswith('\n'):
+        return ''.join(lines)
+    return '\n'.join(lines)
+
+
+def parse(text, dtype):
+    """Return structured array of dtype for tick text."""
+    dtype = numpy.dtype(dtype)
+    return to_array([parse_values(text, len(dtype.names))], dtype)
+
+
+def parse_lines(lines, dtype):
+    """Return structured array of dtype for tick lines."""
+    if not len(lines):
+        return numpy.zeros(0, dtype=dtype)
+    return parse(join_lines(lines), dtype)
+
+
+def read(infile, dtype):
+    """Return structured array of dtype for tick text in file infile."""
+    dtype = numpy.dtype(dtype)
+    blocks = []
+    rest = ''
+    while True:
+        data = infile.read(CHUNK)
+        if not data:
+            break
+        data = rest + data
+        end = data.rfind('\n') + 1
+        rest = data[end:]
+        blocks.append(parse_values(data[:end], len(dtype.names)))
+    blocks.append(parse_values(rest, len(dtype.names)))
+    return to_array(blocks, dtype)
+
+
+def load(filename, dtype):
+    """Return structured array of dtype for text partition filename."""
+    with tick_codecs.open_tks(filename) as infile:
+        return read(infile, dtype)
+
+
+def get_timestamps(lines):
+    """
+    Return float array of the first field of tick lines, which must
+    all have as many fields as the first.
+
+    """
+    if not len(lines):
+        return numpy.zeros(0)
+    columns = len(lines[0].split())
+    return parse_values(join_lines(lines), columns)[:, 0]
@@ -0,0 +1,139 @@
+"""
+Per-symbol (or per-contract) high-water marks for incremental ingestion.
+
+The mark is the timestamp of the last tick committed to the partition
+tree at path. A re-run only writes ticks after the mark, and merges
+them into the day holding the mark, so partial days are completed and
+no tick is written twice. The mark only moves when a run's window
+holds every tick after it (see in_window).
+
+"""
+
+import datetime
+import os
+
+import tick_binary
+import tick_codecs
+import tick_layout
+import tick_partition
+import tick_session
+import tick_text
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+WATERMARK = 'watermark'
+
+
+def get_watermark(path):
+    """Return last committed timestamp for path, or None if not set."""
+    infile = tick_partition.get_meta_path(path, WATERMARK)
+    if not os.path.isfile(infile):
+        return None
+    with open(infile, 'r') as tmp:
+        value = tmp.read().strip()
+    if not value:
+        return None
+    return float(value)
+
+
+def set_watermark(path, timestamp):
+    """Record timestamp as last committed for path."""
+    outfile = tick_partition.get_meta_path(path, WATERMARK)
+    tick_partition.make_dirs(os.path.dirname(outfile))
+    tick_writer.write_atomic(outfile, repr(float(timestamp)) + '\n')
+
+
+def get_watermark_day(mark, session=None):
+    """
+    Return datetime.date holding mark (the trading day of session if
+    given, else the UTC day), or None if mark is None.
+
+    """
+    if mark is None:
+        return None
+    if session is not None:
+        return tick_partition.get_day_date(
+            tick_session.get_session_day(mark, session))
+    return tick_partition.get_day_date(tick_partition.get_day(mark))
+
+
+def filter_lines(data, mark):
+    """Return lines of data with timestamps after mark."""
+    if mark is None:
+        return data
+    timestamps = tick_text.get_timestamps(data)
+    return [i for i, j in zip(data, timestamps) if j > mark]
+
+
+def filter_records(records, mark):
+    """Yield (timestamp, line) records with timestamps after mark."""
+    for i in records:
+        if mark is None or i[0] > mark:
+            yield i
+
+
+def track_records(records, seen):
+    """
+    Yield (timestamp, line) records, keeping the first and last
+    timestamps drawn from them in dict seen.
+
+    """
+    for i in records:
+        seen.setdefault('first', i[0])
+        seen['last'] = i[0]
+        yield i
+
+
+def in_window(first, last, start, end, get_day=tick_partition.get_day):
+    """
+    Return True if the days (by get_day) of ticks first through last
+    lie between start and end (dates, datetimes, or None for open), or
+    there are none, so a run limited to that window wrote every tick
+    after the mark and may move it. A run that leaves ticks before or
+    after its window keeps the mark, so a later run backfills them.
+
+    """
+    if first is None:
+        return True
+    if isinstance(start, datetime.datetime):
+        start = start.date()
+    if isinstance(end, datetime.datetime):
+        end = end.date()
+    return ((start is None or
+             tick_partition.get_day_date(get_day(first)) >= start) and
+            (end is None or
+             tick_partition.get_day_date(get_day(last)) <= end))
+
+
+def get_day_lines(path, symbol, date):
+    """
+    Return text lines of the ticks of symbol on date in tree path, from
+    whichever partition readers use in any layout (see
+    tick_layout.load_day), or an empty list if there is none.
+
+    """
+    dirname = tick_partition.get_day_path(path, date)
+    if os.path.isdir(dirname):
+        infile = tick_binary.find_partition(dirname, symbol)
+        if infile is not None and tick_codecs.is_tks(infile):
+            return tick_codecs.read_lines(infile)
+    data = tick_layout.load_day(path, symbol, date)
+    if data is None:
+        return []
+    return [tick_binary.TEXT_FORMAT % i for i in data.tolist()]
+
+
+def merge_lines(lines, subset, mark):
+    """
+    Return existing partition lines at or before mark followed by
+    subset, so re-running after an interrupted write is safe.
+
+    """
+    values = [i.strip() for i in lines]
+    values = [i for i in values if i]
+    timestamps = tick_text.get_timestamps(values)
+    return [i for i, j in zip(values, timestamps) if j <= mark] + \
+        list(subset)
@@ -0,0 +1,144 @@
+"""
+Crash-safe partition writes.
+
+A partition is assembled in one buffer, compressed in memory with the
+codec given by its extension, written to a temporary file in the same
+directory, fsynced, and renamed into place. Readers therefore see
+either the old partition or the complete new one, never a truncated
+file. Directory fsyncs, which make the renames durable, are batched:
+pass a set as dirs and call sync_dirs(dirs) once at the end.
+
+"""
+
+import collections
+import os
+import tempfile
+
+import numpy
+
+import tick_binary
+import tick_blocks
+import tick_codecs
+import tick_manifest
+import tick_partition
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+
+def sync_dirs(dirs):
+    """fsync each directory in dirs, then empty dirs."""
+    for i in sorted(dirs):
+        try:
+            fd = os.open(i, os.O_RDONLY)
+        except OSError:
+            continue
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass  # Some filesystems do not support directory fsync.
+        finally:
+            os.close(fd)
+    dirs.clear()
+
+
+def write_atomic(filename, data, **kwargs):
+    """
+    Write string data to filename through a fsynced temporary file
+    and rename. The directory is added to the set dirs if given,
+    otherwise it is fsynced immediately.
+
+    """
+    dirs = kwargs.get('dirs', None)
+    dirname = os.path.dirname(os.path.abspath(filename))
+    fd, tmp = tempfile.mkstemp(dir=dirname,
+                               prefix='.' + os.path.basename(filename),
+                               suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as outfile:
+            outfile.write(data)
+            outfile.flush()
+            os.fsync(outfile.fileno())
+        os.chmod(tmp, 0644)
+        os.rename(tmp, filename)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    if dirs is None:
+        sync_dirs(set([dirname]))
+    else:
+        dirs.add(dirname)
+
+
+def write_lines(filename, lines, **kwargs):
+    """
+    Write lines (without newlines) to text partition filename, with
+    the codec from its extension unless codec is given. Return
+    manifest Entry for the partition.
+
+    """
+    codec = kwargs.pop('codec', None) or tick_codecs.get_codec(filename)
+    level = kwargs.pop('level', None)
+    data = tick_codecs.compress(''.join(i + '\n' for i in lines), codec,
+                                level)
+    write_atomic(filename, data, **kwargs)
+    first = last = float('nan')
+    if lines:
+        first = float(lines[0].split(None, 1)[0])
+        last = float(lines[-1].split(None, 1)[0])
+    return tick_manifest.make_entry(filename, data, first, last,
+                                    len(lines), tick_codecs.check_codec(codec))
+
+
+def write_array(filename, data, **kwargs):
+    """
+    Write structured array data to partition filename: binary for a
+    .tkb file, block-compressed with codec for a .tkz file, and text
+    (with the codec from its extension) otherwise. Return manifest
+    Entry for the partition.
+
+    """
+    data = numpy.atleast_1d(data)
+    codec = tick_binary.get_codec(filename)
+    if codec == 'blocks':
+        packed = tick_blocks.to_bytes(
+            numpy.asarray(data, dtype=tick_binary.RECORDTYPE),
+            codec=kwargs.pop('codec', None) or tick_blocks.CODEC,
+            level=kwargs.pop('level', None),
+            block_rows=kwargs.pop('block_rows', tick_blocks.BLOCK_ROWS))
+    elif codec == 'binary':
+        packed = tick_binary.to_bytes(data)
+    else:
+        lines = [tick_binary.TEXT_FORMAT % i for i in data.tolist()]
+        return write_lines(filename, lines, **kwargs)
+    write_atomic(filename, packed, **kwargs)
+    first = last = float('nan')
+    if len(data):
+        first = data['timestamp'][0]
+        last = data['timestamp'][-1]
+    return tick_manifest.make_entry(filename, packed, first, last,
+                                    len(data), codec)
+
+
+def update_manifest(entries):
+    """
+    Merge manifest entries from write_lines or write_array into the
+    manifest of each symbol tree they belong to.
+
+    """
+    trees = collections.defaultdict(list)
+    for i in entries:
+        trees[tick_manifest.get_tree_path(i.path)].append(i)
+    for path, new in trees.items():
+        write_manifest(path, tick_manifest.merge_entries(
+            path, tick_manifest.read_manifest(path), new))
+
+
+def write_manifest(path, entries):
+    """Replace manifest of symbol tree path with entries."""
+    entries = tick_manifest.merge_entries(path, [], entries)
+    outfile = tick_manifest.get_manifest_file(path)
+    tick_partition.make_dirs(os.path.dirname(outfile))
+    write_atomic(outfile, tick_manifest.format_manifest(entries))
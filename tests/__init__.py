@@ -0,0 +1,43 @@
+"""
+Regression tests, run from the top of the tree with
+
+python -m unittest discover -s tests -t .
+
+Modules in lib and bin are imported as they are by the scripts, and
+$BICYCLE_HOME defaults to the top of the tree. Each test writes its
+partitions under its own temporary $TICKS_HOME (see TickTestCase).
+
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+HOME = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+for name in ['bin', 'lib']:
+    if os.path.join(HOME, name) not in sys.path:
+        sys.path.insert(0, os.path.join(HOME, name))
+os.environ.setdefault('BICYCLE_HOME', HOME)
+
+
+class TickTestCase(unittest.TestCase):
+    """Test case with a temporary $TICKS_HOME."""
+
+    def setUp(self):
+        self.saved = os.environ.get('TICKS_HOME')
+        self.root = tempfile.mkdtemp(prefix='ticks')
+        os.environ['TICKS_HOME'] = self.root
+
+    def tearDown(self):
+        if self.saved is None:
+            del os.environ['TICKS_HOME']
+        else:
+            os.environ['TICKS_HOME'] = self.saved
+        shutil.rmtree(self.root)
@@ -0,0 +1,81 @@
+"""Tests of block-compressed tick partitions."""
+
+import datetime
+import os
+
+import numpy
+
+from tests import TickTestCase
+from tests.test_pointer import make_day
+
+import tick_binary
+import tick_blocks
+import tick_codecs
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+DATE = datetime.date(2012, 1, 3)
+
+
+class BlocksTest(TickTestCase):
+    """Block partitions read back whole, by range, and by bounds."""
+
+    def write(self, data, block_rows=4):
+        """Write data to a block partition, return its file name."""
+        filename = os.path.join(self.root, tick_blocks.get_filename('CL'))
+        with open(filename, 'wb') as outfile:
+            outfile.write(tick_blocks.to_bytes(data, block_rows=block_rows))
+        return filename
+
+    def test_round_trip(self):
+        data = make_day(DATE, 10, 100.0)
+        data['volume'] = numpy.arange(10)
+        filename = self.write(data)
+        numpy.testing.assert_array_equal(tick_blocks.load(filename), data)
+        numpy.testing.assert_array_equal(
+            tick_blocks.load(filename, jobs=2), data)
+        numpy.testing.assert_array_equal(
+            tick_binary.load_partition(filename), data)
+
+    def test_range(self):
+        data = make_day(DATE, 10, 100.0)
+        filename = self.write(data)
+        # Rows 3 through 8 span the first, second, and third blocks.
+        values = tick_blocks.load(filename, data['timestamp'][3],
+                                  data['timestamp'][9])
+        numpy.testing.assert_array_equal(values, data[3:9])
+        with open(filename, 'rb') as infile:
+            index = tick_blocks.read_index(infile)[3]
+        self.assertEqual(tick_blocks.get_blocks(
+            index, data['timestamp'][5], data['timestamp'][6]).tolist(),
+            [1])
+
+    def test_bounds(self):
+        data = make_day(DATE, 10, 100.0)
+        filename = self.write(data)
+        blocks = []
+        decompress = tick_codecs.decompress
+
+        def counting(value, codec):
+            blocks.append(value)
+            return decompress(value, codec)
+
+        tick_codecs.decompress = counting
+        try:
+            first, last, rows = tick_blocks.read_bounds(filename)
+        finally:
+            tick_codecs.decompress = decompress
+        self.assertEqual(len(blocks), 2)
+        self.assertEqual(first, data[0])
+        self.assertEqual(last, data[-1])
+        self.assertEqual(rows, 10)
+
+    def test_empty(self):
+        data = make_day(DATE, 0, 100.0)
+        filename = self.write(data)
+        self.assertEqual(len(tick_blocks.load(filename)), 0)
+        self.assertEqual(tick_blocks.load(filename).dtype,
+                         tick_binary.RECORDTYPE)
+        self.assertEqual(tick_blocks.read_bounds(filename), (None, None, 0))
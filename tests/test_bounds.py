@@ -0,0 +1,68 @@
+"""Tests of partition bounds read without loading the partition."""
+
+import datetime
+import os
+import unittest
+
+from tests import TickTestCase
+from tests.test_pointer import make_day
+
+import tick_binary
+import tick_codecs
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+DATE = datetime.date(2012, 1, 3)
+
+
+class BoundsTest(TickTestCase):
+    """Bounds of every partition format match its first and last rows."""
+
+    def check(self, name, rows=5):
+        """Write rows ticks to partition name and check its bounds."""
+        data = make_day(DATE, rows, 100.0)
+        filename = os.path.join(self.root, name)
+        tick_writer.write_array(filename, data)
+        first, last, count = tick_binary.read_bounds(filename, count=True)
+        if not rows:
+            self.assertEqual((first, last, count), (None, None, 0))
+            return
+        self.assertEqual(first, data[0])
+        self.assertEqual(last, data[-1])
+        self.assertEqual(count, rows)
+
+    def check_codec(self, codec):
+        """Check bounds of text partitions written with codec."""
+        self.check(tick_codecs.get_filename('CL', codec))
+        self.check(tick_codecs.get_filename('CL', codec), 1)
+        self.check(tick_codecs.get_filename('CL', codec), 0)
+
+    def test_binary(self):
+        self.check('CL.tkb')
+        self.check('CL.tkb', 0)
+
+    def test_blocks(self):
+        self.check('CL.tkz')
+        self.check('CL.tkz', 0)
+
+    def test_plain(self):
+        self.check_codec('none')
+        # Uncounted plain text reads only its first and last lines.
+        filename = os.path.join(self.root, 'CL.tks')
+        data = make_day(DATE, 5, 100.0)
+        tick_writer.write_array(filename, data)
+        self.assertEqual(tick_binary.read_bounds(filename),
+                         (data[0], data[-1], None))
+
+    def test_bz2(self):
+        self.check_codec('bz2')
+
+    def test_gzip(self):
+        self.check_codec('gzip')
+
+    @unittest.skipIf(tick_codecs.lzma is None, 'lzma is not installed')
+    def test_lzma(self):
+        self.check_codec('lzma')
@@ -0,0 +1,62 @@
+"""Tests of exchange trading calendars."""
+
+import StringIO
+import datetime
+import sys
+
+import numpy
+
+from tests import TickTestCase
+
+import tick_calendar
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+
+class CalendarTest(TickTestCase):
+    """Trading days skip weekends and the exchange's holidays."""
+
+    def setUp(self):
+        TickTestCase.setUp(self)
+        self.calendar = tick_calendar.get_calendar('nymex')
+
+    def test_offset(self):
+        # 2012-01-02 is a holiday, 2012-01-16 a Monday holiday.
+        offset = self.calendar.offset
+        self.assertEqual(str(offset(datetime.date(2012, 1, 2), 0)),
+                         '2012-01-03')
+        self.assertEqual(str(offset(datetime.date(2011, 12, 31), 0)),
+                         '2012-01-03')
+        self.assertEqual(str(offset(datetime.date(2012, 1, 13), 1)),
+                         '2012-01-17')
+        self.assertEqual(str(offset(datetime.date(2012, 1, 17), -1)),
+                         '2012-01-13')
+        self.assertEqual([str(i) for i in offset(
+            ['2012-01-02', '2012-01-16'], [1, 0])],
+            ['2012-01-04', '2012-01-17'])
+
+    def test_count(self):
+        count = self.calendar.count
+        self.assertEqual(count(datetime.date(2012, 1, 1),
+                               datetime.date(2012, 2, 1)), 20)
+        self.assertEqual(count(datetime.date(2012, 1, 2),
+                               datetime.date(2012, 1, 3)), 0)
+        self.assertEqual(count(datetime.date(2012, 1, 13),
+                               datetime.date(2012, 1, 18)), 2)
+        self.assertEqual(len(self.calendar.trading_dates(
+            datetime.date(2012, 1, 1), datetime.date(2012, 1, 31))), 20)
+
+    def test_missing_holidays(self):
+        saved = sys.stderr
+        sys.stderr = StringIO.StringIO()
+        try:
+            calendar = tick_calendar.get_calendar('testexchange')
+            tick_calendar.get_calendar('testexchange')
+            message = sys.stderr.getvalue()
+        finally:
+            sys.stderr = saved
+        self.assertEqual(message.count('No holidays file for testexchange'),
+                         1)
+        self.assertFalse(calendar.check_date(numpy.datetime64('2012-01-02')))
@@ -0,0 +1,125 @@
+"""Tests of duplicate removal across partition layouts."""
+
+import datetime
+import os
+
+import numpy
+
+from tests import TickTestCase
+from tests.test_pointer import make_day
+
+import duplicates
+import tick_binary
+import tick_dedup
+import tick_layout
+import tick_partition
+import tick_scan
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+DATES = [datetime.date(2012, 1, 3), datetime.date(2012, 1, 4)]
+
+
+class PackedDedupTest(TickTestCase):
+    """Duplicates in packed files are removed in place."""
+
+    def test_packed(self):
+        path = os.path.join(self.root, 'futures', 'ib', 'nymex', 'CL',
+                            '201203')
+        for date in DATES:
+            data = make_day(date, 3, 100.0)
+            outdir = tick_partition.get_day_path(path, date)
+            tick_partition.make_dirs(outdir)
+            tick_writer.write_array(os.path.join(outdir, 'CL.tkb'),
+                                    numpy.concatenate([data, data[-1:]]))
+        tick_layout.pack_tree(path, 'month')
+        removed = tick_dedup.remove_duplicates(
+            tick_scan.scan_tree(path, symbol='CL'), policy='first')
+        self.assertEqual(removed, 2)
+        for date in DATES:
+            self.assertEqual(len(tick_layout.load_day(path, 'CL', date)), 3)
+        filename = tick_layout.get_packed_file(path, 'CL', DATES[0], 'month')
+        self.assertTrue(os.path.isfile(filename + tick_dedup.BACKUP))
+
+
+class ScanDedupTest(TickTestCase):
+    """duplicates removes duplicates from every tree of one scan."""
+
+    def test_main(self):
+        for contract in ['201202', '201203']:
+            path = os.path.join(self.root, 'futures', 'ib', 'nymex', 'CL',
+                                contract)
+            data = make_day(DATES[0], 3, 100.0)
+            outdir = tick_partition.get_day_path(path, DATES[0])
+            tick_partition.make_dirs(outdir)
+            tick_writer.write_array(os.path.join(outdir, 'CL.tkb'),
+                                    numpy.concatenate([data, data]))
+        duplicates.main(['--jobs', '2'])
+        for contract in ['201202', '201203']:
+            path = os.path.join(self.root, 'futures', 'ib', 'nymex', 'CL',
+                                contract)
+            self.assertEqual(
+                len(tick_layout.load_day(path, 'CL', DATES[0])), 3)
+
+
+def make_bars(rows):
+    """
+    Return ticks for rows of (timestamp, open, high, low, close, volume,
+    orders, vwap).
+
+    """
+    data = numpy.zeros(len(rows), dtype=tick_binary.RECORDTYPE)
+    for name, values in zip(['timestamp', 'open', 'high', 'low', 'close',
+                             'volume', 'orders', 'vwap'], zip(*rows)):
+        data[name] = values
+    return data
+
+
+BARS = [(1.0, 10.0, 12.0, 9.0, 11.0, 100, 2, 10.5),
+        (2.0, 11.0, 13.0, 10.0, 12.0, 100, 1, 11.0),
+        (2.0, 12.0, 15.0, 11.0, 14.0, 300, 4, 13.0),
+        (2.0, 14.0, 14.5, 8.0, 9.0, 0, 5, 12.0),
+        (3.0, 9.0, 9.5, 8.5, 9.0, 50, 1, 9.0)]
+
+
+class PolicyTest(TickTestCase):
+    """Rows sharing a timestamp resolve to one row by each policy."""
+
+    def resolve(self, policy):
+        """Return the row resolved for timestamp 2 and rows removed."""
+        values, removed = tick_dedup.resolve(make_bars(BARS), policy)
+        self.assertEqual(values['timestamp'].tolist(), [1.0, 2.0, 3.0])
+        self.assertEqual(removed, 2)
+        return values[1]
+
+    def test_first_last(self):
+        self.assertEqual(self.resolve('first')['close'], 12.0)
+        self.assertEqual(self.resolve('last')['close'], 9.0)
+
+    def test_volume_orders(self):
+        self.assertEqual(self.resolve('volume')['close'], 14.0)
+        self.assertEqual(self.resolve('orders')['close'], 9.0)
+
+    def test_merge(self):
+        row = self.resolve('merge')
+        self.assertEqual(row['open'], 11.0)
+        self.assertEqual(row['high'], 15.0)
+        self.assertEqual(row['low'], 8.0)
+        self.assertEqual(row['close'], 9.0)
+        self.assertEqual(row['volume'], 400)
+        self.assertEqual(row['orders'], 10)
+        self.assertAlmostEqual(row['vwap'], (11.0 * 100 + 13.0 * 300) / 400)
+
+    def test_lines(self):
+        lines = [tick_binary.TEXT_FORMAT % i
+                 for i in make_bars(BARS).tolist()]
+        for policy in ['first', 'last', 'merge']:
+            values, removed = tick_dedup.resolve_lines(lines, policy)
+            self.assertEqual(removed, 2)
+            numpy.testing.assert_array_equal(
+                tick_binary.parse_lines(values),
+                tick_dedup.resolve(tick_binary.parse_lines(lines),
+                                   policy)[0])
@@ -0,0 +1,93 @@
+"""Tests of incremental ingestion into any partition layout."""
+
+import calendar
+import datetime
+import os
+
+import numpy
+
+from tests import TickTestCase
+
+import create_ticker_plant
+import tick_binary
+import tick_layout
+import tick_partition
+import tick_watermark
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+DATE = datetime.date(2012, 1, 3)
+START = datetime.datetime(2012, 1, 1)
+END = datetime.datetime(2012, 2, 1)
+
+
+def make_records(count):
+    """Return count (timestamp, line) records a minute apart on DATE."""
+    first = calendar.timegm(DATE.timetuple()) + 3600
+    return [(first + i * 60.0,
+             '{0:.6f} 1.0 2.0 0.5 1.5 10 2 1.25 0'.format(first + i * 60.0))
+            for i in range(count)]
+
+
+class PackedIngestTest(TickTestCase):
+    """Ingest, pack, ingest, pack keeps every tick of the mark day."""
+
+    def test_ingest_pack_ingest_pack(self):
+        path = os.path.join(self.root, 'futures', 'ib', 'nymex', 'CL',
+                            '201203')
+        records = make_records(10)
+        create_ticker_plant.write_tks_file(START, END, 'CL',
+                                           iter(records[:5]), path,
+                                           codec='none')
+        tick_layout.pack_tree(path, 'month')
+        create_ticker_plant.write_tks_file(START, END, 'CL', iter(records),
+                                           path, codec='none')
+        tick_layout.pack_tree(path, 'month')
+        data = tick_layout.load_day(path, 'CL', DATE)
+        self.assertEqual(len(data), 10)
+        numpy.testing.assert_array_equal(data['timestamp'],
+                                         [i[0] for i in records])
+
+
+class ConvertedIngestTest(TickTestCase):
+    """Ingest after converting without --remove reads the new ticks."""
+
+    def test_ingest_after_convert(self):
+        path = os.path.join(self.root, 'futures', 'ib', 'nymex', 'CL',
+                            '201203')
+        records = make_records(10)
+        create_ticker_plant.write_tks_file(START, END, 'CL',
+                                           iter(records[:5]), path,
+                                           codec='none')
+        outdir = tick_partition.get_day_path(path, DATE)
+        outfile = os.path.join(outdir, tick_binary.get_filename('CL'))
+        tick_writer.write_array(outfile,
+                                tick_layout.load_day(path, 'CL', DATE))
+        os.utime(outfile, (0, 0))
+        create_ticker_plant.write_tks_file(START, END, 'CL', iter(records),
+                                           path, codec='none')
+        self.assertEqual(len(tick_layout.load_day(path, 'CL', DATE)), 10)
+
+
+class WindowIngestTest(TickTestCase):
+    """A run limited to a window leaves later ticks to a later run."""
+
+    def test_backfill(self):
+        path = os.path.join(self.root, 'futures', 'ib', 'nymex', 'CL',
+                            '201203')
+        first = make_records(5)
+        later = [(i + 86400, '{0:.6f}{1}'.format(i + 86400, j[17:]))
+                 for i, j in first]
+        create_ticker_plant.write_tks_file(START, DATE, 'CL',
+                                           iter(first + later), path,
+                                           codec='none')
+        self.assertEqual(tick_watermark.get_watermark(path), None)
+        create_ticker_plant.write_tks_file(START, END, 'CL',
+                                           iter(first + later), path,
+                                           codec='none')
+        self.assertEqual(tick_watermark.get_watermark(path), later[-1][0])
+        following = DATE + datetime.timedelta(days=1)
+        self.assertEqual(len(tick_layout.load_day(path, 'CL', following)), 5)
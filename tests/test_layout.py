@@ -0,0 +1,40 @@
+"""Tests of packed partition layouts."""
+
+import datetime
+import os
+
+from tests import TickTestCase
+from tests.test_pointer import make_day
+
+import tick_codecs
+import tick_layout
+import tick_partition
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+DATE = datetime.date(2012, 1, 3)
+
+
+class PackTest(TickTestCase):
+    """Packing keeps the partition readers use of each day."""
+
+    def test_newest_format(self):
+        path = os.path.join(self.root, 'futures', 'ib', 'nymex', 'CL',
+                            '201203')
+        outdir = tick_partition.get_day_path(path, DATE)
+        tick_partition.make_dirs(outdir)
+        stale = os.path.join(outdir, tick_codecs.get_filename('CL', 'bz2'))
+        tick_writer.write_array(stale, make_day(DATE, 5, 100.0),
+                                codec='bz2')
+        os.utime(stale, (0, 0))
+        tick_writer.write_array(os.path.join(outdir, 'CL.tkb'),
+                                make_day(DATE, 3, 100.0))
+        self.assertEqual(len(tick_layout.load_day(path, 'CL', DATE)), 3)
+        self.assertEqual([len(i[1]) for i in
+                          tick_layout.iter_days(path, 'CL')], [3])
+        tick_layout.pack_tree(path, 'month')
+        self.assertFalse(os.path.isdir(outdir))
+        self.assertEqual(len(tick_layout.load_day(path, 'CL', DATE)), 3)
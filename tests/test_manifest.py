@@ -0,0 +1,38 @@
+"""Tests of rebuilt partition manifests."""
+
+import datetime
+import os
+
+from tests import TickTestCase
+from tests.test_pointer import make_day
+
+import build_manifest
+import tick_codecs
+import tick_manifest
+import tick_partition
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+DATE = datetime.date(2012, 1, 3)
+
+
+class BuildManifestTest(TickTestCase):
+    """A rebuilt manifest describes the partitions readers use."""
+
+    def test_newest_format(self):
+        path = os.path.join(self.root, 'futures', 'ib', 'nymex', 'CL',
+                            '201203')
+        outdir = tick_partition.get_day_path(path, DATE)
+        tick_partition.make_dirs(outdir)
+        stale = os.path.join(outdir, 'CL.tkb')
+        tick_writer.write_array(stale, make_day(DATE, 5, 100.0))
+        os.utime(stale, (0, 0))
+        tick_writer.write_array(
+            os.path.join(outdir, tick_codecs.get_filename('CL', 'none')),
+            make_day(DATE, 3, 100.0), codec='none')
+        self.assertEqual(build_manifest.build_manifests(self.root), 1)
+        entries = tick_manifest.read_manifest(path)
+        self.assertEqual([i.rows for i in entries], [3])
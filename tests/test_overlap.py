@@ -0,0 +1,109 @@
+"""Tests of plant-wide overlap detection."""
+
+import StringIO
+import calendar
+import datetime
+import os
+import sys
+
+import numpy
+
+from tests import TickTestCase
+from tests.test_pointer import make_day
+
+import find_overlaps
+import tick_codecs
+import tick_overlap
+import tick_partition
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+DATES = [datetime.date(2012, 1, 3), datetime.date(2012, 1, 4),
+         datetime.date(2012, 1, 5)]
+
+
+def get_path(contract, date, name='CL.tkb'):
+    """Return index path of partition name of contract on date."""
+    return '/'.join(['nymex', 'CL', contract, date.strftime('%Y/%m/%d'),
+                     name])
+
+
+def make_minutes(date, rows):
+    """Return rows ticks a minute apart from 01:00 on date."""
+    data = make_day(date, rows, 100.0)
+    data['timestamp'] = calendar.timegm(date.timetuple()) + 3600 + \
+        numpy.arange(rows) * 60.0
+    return data
+
+
+class OverlapTest(TickTestCase):
+    """Overlaps across partitions are found from the hash index."""
+
+    def setUp(self):
+        TickTestCase.setUp(self)
+        self.plant = os.path.join(self.root, 'futures', 'ib')
+        day = make_minutes(DATES[1], 8)
+        # A day in two formats, a copied contract, a day appended
+        # twice, and a day of ticks written into the next day's
+        # partition.
+        self.write('201203', DATES[0], make_minutes(DATES[0], 8))
+        self.write('201203', DATES[0], make_minutes(DATES[0], 8),
+                   tick_codecs.get_filename('CL', 'bz2'))
+        self.write('201204', DATES[0], make_minutes(DATES[0], 8))
+        self.write('201203', DATES[1], numpy.concatenate([day, day]))
+        self.write('201204', DATES[2], day)
+
+    def write(self, contract, date, data, name='CL.tkb'):
+        """Write data to partition name of contract on date."""
+        outdir = tick_partition.get_day_path(
+            os.path.join(self.plant, 'nymex', 'CL', contract), date)
+        tick_partition.make_dirs(outdir)
+        tick_writer.write_array(os.path.join(outdir, name), data)
+
+
+    def test_findings(self):
+        records, count = tick_overlap.update_index(self.plant)
+        self.assertEqual(count, 5)
+        text = get_path('201203', DATES[0], 'CL.tks.bz2')
+        self.assertEqual(sorted(tick_overlap.find_overlaps(records)), [
+            ('blocks', 1, [get_path('201203', DATES[1]),
+                           get_path('201204', DATES[2])]),
+            ('copy', 8, [get_path('201203', DATES[0]), text,
+                         get_path('201204', DATES[0])]),
+            ('day', 8, [get_path('201203', DATES[0]), text]),
+            ('doubled', 16, [get_path('201203', DATES[1])]),
+            ('outside', 8, [get_path('201204', DATES[2])])])
+
+    def test_incremental(self):
+        records = tick_overlap.update_index(self.plant)[0]
+        findings = sorted(tick_overlap.find_overlaps(records))
+        values, count = tick_overlap.update_index(self.plant)
+        self.assertEqual(count, 0)
+        self.assertEqual(sorted(tick_overlap.find_overlaps(values)),
+                         findings)
+        values, count = tick_overlap.update_index(self.plant, ['cme'])
+        self.assertEqual((len(values), count), (5, 0))
+        # Fixing the doubled day rehashes that partition alone.
+        self.write('201203', DATES[1], make_minutes(DATES[1], 8))
+        values, count = tick_overlap.update_index(self.plant)
+        self.assertEqual(count, 1)
+        self.assertEqual(
+            [i[0] for i in sorted(tick_overlap.find_overlaps(values))],
+            ['copy', 'copy', 'day', 'outside'])
+        self.assertEqual(sorted(tick_overlap.read_index(self.plant)),
+                         sorted(i.path for i in values))
+
+    def test_rebuild(self):
+        tick_overlap.update_index(self.plant)
+        saved = sys.stdout
+        sys.stdout = StringIO.StringIO()
+        try:
+            find_overlaps.main(['--rebuild'])
+            lines = sys.stdout.getvalue().splitlines()
+        finally:
+            sys.stdout = saved
+        self.assertEqual(lines[0], 'Hashed 5 of 5 partitions.')
+        self.assertEqual(len(lines), 6)
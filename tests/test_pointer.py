@@ -0,0 +1,103 @@
+"""Tests of roll schedules and rolling series of pointer partitions."""
+
+import calendar
+import datetime
+import os
+
+import numpy
+
+from tests import TickTestCase
+
+import tick_binary
+import tick_layout
+import tick_partition
+import tick_roll
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+DATE = datetime.date(2012, 1, 17)
+ROLLS = ['CL 201202 NYMEX 2006-11-20 2012-01-20 2012-01-18',
+         'CL 201203 NYMEX 2006-11-20 2012-02-21 2012-02-16']
+
+
+def make_day(date, rows, price):
+    """Return rows ticks an hour apart on date, all at price."""
+    data = numpy.zeros(rows, dtype=tick_binary.RECORDTYPE)
+    data['timestamp'] = calendar.timegm(date.timetuple()) + \
+        numpy.arange(rows) * 3600.0
+    for name in ['open', 'high', 'low', 'close', 'vwap']:
+        data[name] = price
+    return data
+
+
+class RollTestCase(TickTestCase):
+    """Test case with the roll schedule ROLLS."""
+
+    def setUp(self):
+        TickTestCase.setUp(self)
+        self.plant = os.path.join(self.root, 'futures', 'ib')
+        self.rolling = os.path.join(self.root, tick_roll.GROUP, 'ib')
+        filename = os.path.join(self.root, 'expiry-rolls.txt')
+        with open(filename, 'w') as outfile:
+            outfile.write('\n'.join(ROLLS) + '\n')
+        self.index = tick_roll.RollIndex(tick_roll.read_rolls(filename))
+
+
+class PointerTest(RollTestCase):
+    """Pointer series resolve the current rows of their source days."""
+
+    def write_day(self, rows, contract='201202', date=DATE, price=100.0):
+        """Write rows ticks of contract on date at price."""
+        outdir = tick_partition.get_day_path(
+            os.path.join(self.plant, 'nymex', 'CL', contract), date)
+        tick_partition.make_dirs(outdir)
+        tick_writer.write_array(os.path.join(outdir, 'CL.tkb'),
+                                make_day(date, rows, price))
+
+    def load_series(self, date=DATE):
+        """Return series [0] on date."""
+        return tick_layout.load_day(
+            tick_roll.get_series_path(self.rolling, 'nymex', 'CL', 0),
+            'CL', date)
+
+    def test_source_changes(self):
+        self.write_day(5)
+        tick_roll.build_series(self.index, 'CL', [DATE], self.plant,
+                               self.rolling)
+        self.assertEqual(len(self.load_series()), 5)
+        self.write_day(10)
+        self.assertEqual(len(self.load_series()), 10)
+        self.write_day(3)
+        self.assertEqual(len(self.load_series()), 3)
+
+    def test_later_roll_adjusts(self):
+        self.write_day(5)
+        tick_roll.build_series(self.index, 'CL', [DATE], self.plant,
+                               self.rolling, adjust=True)
+        self.assertEqual(self.load_series()['close'][-1], 100.0)
+        # The roll enters on the first date of a later run.
+        after = datetime.date(2012, 1, 18)
+        self.write_day(5, '201203', DATE, 103.0)
+        self.write_day(5, '201203', after, 104.0)
+        for copy in [False, True]:
+            tick_roll.build_series(self.index, 'CL', [after], self.plant,
+                                   self.rolling, adjust=True, copy=copy)
+            self.assertEqual(self.load_series()['close'][-1], 103.0)
+            self.assertEqual(self.load_series(after)['close'][-1], 104.0)
+
+
+class RollIndexTest(RollTestCase):
+    """Active contracts are found for scalar and array timestamps."""
+
+    def test_scalar(self):
+        timestamp = calendar.timegm(DATE.timetuple())
+        self.assertEqual(self.index.active_contract('CL', timestamp),
+                         '201202')
+        self.assertEqual(self.index.active_contract('CL', timestamp, 1),
+                         '201203')
+        self.assertEqual(self.index.active_contract('CL', timestamp, 2), '')
+        self.assertEqual(list(self.index.active_contract(
+            'CL', [timestamp, timestamp + 86400])), ['201202', '201203'])
@@ -0,0 +1,81 @@
+"""Tests of the ticker plant report rollup."""
+
+import csv
+import datetime
+import json
+import os
+import StringIO
+
+import numpy
+
+from tests import TickTestCase
+from tests.test_pointer import make_day
+
+import tick_partition
+import tick_scan
+import tick_writer
+import ticker_plant_statistics
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+# January 4 is a trading day with no partition.
+DATES = [datetime.date(2012, 1, 3), datetime.date(2012, 1, 5)]
+
+
+class ReportTest(TickTestCase):
+    """Partition rows roll up into one symbol row per tree."""
+
+    def setUp(self):
+        TickTestCase.setUp(self)
+        self.plant = os.path.join(self.root, 'futures', 'ib')
+        path = os.path.join(self.plant, 'nymex', 'CL', '201203')
+        entries = []
+        for date in DATES:
+            data = make_day(date, 3, 100.0)
+            if date == DATES[0]:
+                data = numpy.concatenate([data, data[-1:]])
+            outdir = tick_partition.get_day_path(path, date)
+            tick_partition.make_dirs(outdir)
+            entries.append(tick_writer.write_array(
+                os.path.join(outdir, 'CL.tkb'), data))
+        tick_writer.update_manifest(entries)
+
+    def run_report(self, duplicates):
+        """Return report rows of the plant, asserting none failed."""
+        rows, failed = ticker_plant_statistics.run_report(
+            tick_scan.find_trees(self.plant), 1, duplicates)
+        self.assertEqual(failed, [])
+        return rows
+
+    def test_rollup(self):
+        rows = self.run_report(False)
+        self.assertEqual([i['level'] for i in rows],
+                         ['partition', 'partition', 'symbol'])
+        self.assertEqual([i['date'] for i in rows[:2]],
+                         ['2012-01-03', '2012-01-05'])
+        rollup = rows[-1]
+        self.assertEqual(rollup['days'], 2)
+        self.assertEqual(rollup['rows'], 7)
+        self.assertEqual(rollup['missing'], 1)
+        self.assertEqual(rollup['empty'], 0)
+        self.assertEqual(rollup['duplicates'], None)
+        self.assertEqual(rollup['first'], '2012-01-03 00:00:00.000000')
+        self.assertEqual(rollup['last'], '2012-01-05 02:00:00.000000')
+        self.assertEqual(rollup['size'], sum(i['size'] for i in rows[:2]))
+
+    def test_duplicates(self):
+        rows = self.run_report(True)
+        self.assertEqual([i['duplicates'] for i in rows], [1, 0, 1])
+
+    def test_formats(self):
+        rows = self.run_report(False)
+        values = json.loads(ticker_plant_statistics.format_report(rows))
+        self.assertEqual(len(values['partitions']), 2)
+        self.assertEqual(values['symbols'][0]['rows'], 7)
+        report = ticker_plant_statistics.format_report(rows, 'csv')
+        lines = list(csv.DictReader(StringIO.StringIO(report)))
+        self.assertEqual([i['level'] for i in lines],
+                         ['partition', 'partition', 'symbol'])
+        self.assertEqual(lines[-1]['missing'], '1')
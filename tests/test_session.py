@@ -0,0 +1,74 @@
+"""Tests of trading session time zones."""
+
+import calendar
+import datetime
+import os
+
+from tests import TickTestCase
+
+import tick_partition
+import tick_session
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+SESSION = tick_session.Session('globex', 17 * 3600, 16 * 3600,
+                               'America/Chicago')
+
+
+class TimeZoneTest(TickTestCase):
+    """Offsets follow daylight saving time without changing TZ."""
+
+    def test_offsets(self):
+        saved = os.environ.get('TZ')
+        winter = calendar.timegm(datetime.date(2012, 1, 3).timetuple())
+        summer = calendar.timegm(datetime.date(2012, 7, 3).timetuple())
+        self.assertEqual(tick_session.get_offsets(
+            [winter, summer], SESSION.timezone).tolist(), [-21600, -18000])
+        self.assertEqual(os.environ.get('TZ'), saved)
+
+    def test_session_bounds(self):
+        low, high = tick_session.get_session_bounds(
+            datetime.date(2012, 7, 3), SESSION)
+        self.assertEqual(high - low, 23 * 3600)
+        self.assertEqual(tick_session.get_session_day(low, SESSION),
+                         tick_partition.get_date_day(
+                             datetime.date(2012, 7, 3)))
+
+    def test_unknown_timezone(self):
+        self.assertRaises(ValueError, tick_session.get_offsets, [0],
+                          'America/Nowhere')
+        self.assertRaises(ValueError, tick_session.read_sessions, {
+            'sessions': {'globex': {'open': '17:00', 'close': '16:00',
+                                    'timezone': 'America/Nowhere'}}})
+        self.assertFalse('America/Nowhere' in tick_session.TRANSITIONS)
+
+
+class SetSessionsTest(TickTestCase):
+    """Seeded sessions are read without config.ini or a child process."""
+
+    def setUp(self):
+        TickTestCase.setUp(self)
+        self.tables = tick_session.SESSIONS, tick_session.TRANSITIONS.copy()
+
+    def tearDown(self):
+        tick_session.SESSIONS = self.tables[0]
+        tick_session.TRANSITIONS.clear()
+        tick_session.TRANSITIONS.update(self.tables[1])
+        TickTestCase.tearDown(self)
+
+    def test_set_sessions(self):
+        tick_session.TRANSITIONS.clear()
+        tick_session.set_sessions({'globex': SESSION})
+        self.assertEqual(sorted(tick_session.TRANSITIONS),
+                         ['America/Chicago'])
+        check_output = tick_session.subprocess.check_output
+        tick_session.subprocess.check_output = None
+        try:
+            self.assertEqual(tick_session.get_session('globex'), SESSION)
+            self.assertEqual(tick_session.get_session('nyse'), None)
+            self.assertEqual(tick_session.get_offset(0, 'America/Chicago'),
+                             -21600)
+        finally:
+            tick_session.subprocess.check_output = check_output
@@ -0,0 +1,55 @@
+"""Tests of the external sort of source tks files."""
+
+import os
+
+from tests import TickTestCase
+
+import tick_source
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+# Timestamps out of order, with ties falling in different runs.
+TIMESTAMPS = [5, 3, 2, 3, 1, 5, 2, 4, 3, 1, 5]
+
+
+class ExternalSortTest(TickTestCase):
+    """Unsorted input spills to sorted runs and merges in order."""
+
+    def write_source(self, timestamps):
+        """Write one line per timestamp, tagged by position, return name."""
+        filename = os.path.join(self.root, 'CL.tks')
+        with open(filename, 'w') as outfile:
+            for position, timestamp in enumerate(timestamps):
+                outfile.write('{0:.6f} {1}\n'.format(timestamp, position))
+        return filename
+
+    def test_spill_merge(self):
+        filename = self.write_source(TIMESTAMPS)
+        tmpdir = os.path.join(self.root, 'tmp')
+        os.mkdir(tmpdir)
+        runs = []
+        write_run = tick_source.write_run
+
+        def counting(chunk, path):
+            runs.append(path)
+            return write_run(chunk, path)
+
+        tick_source.write_run = counting
+        try:
+            records = list(tick_source.iter_sorted(filename, chunk_size=3,
+                                                   tmpdir=tmpdir))
+        finally:
+            tick_source.write_run = write_run
+        self.assertEqual(len(runs), 4)
+        expected = sorted(enumerate(TIMESTAMPS), key=lambda x: x[1])
+        self.assertEqual([(i[0], int(i[1].split()[1])) for i in records],
+                         [(float(i[1]), i[0]) for i in expected])
+        self.assertEqual(os.listdir(tmpdir), [])
+
+    def test_sorted(self):
+        filename = self.write_source(sorted(TIMESTAMPS))
+        self.assertTrue(tick_source.is_sorted(filename))
+        self.assertEqual([i[0] for i in tick_source.iter_sorted(
+            filename, chunk_size=3)], sorted(TIMESTAMPS))
@@ -0,0 +1,50 @@
+"""Tests of time-range reads through TickStore."""
+
+import datetime
+import os
+
+from tests import TickTestCase
+from tests.test_pointer import make_day
+
+import tick_partition
+import tick_store
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+DATES = [datetime.date(2012, 1, 3), datetime.date(2012, 1, 4)]
+
+
+class OpenRangeTest(TickTestCase):
+    """A start or end of None reads from the first or to the last day."""
+
+    def write_days(self, manifest):
+        """Write three ticks on each of DATES, with or without manifest."""
+        self.store = tick_store.TickStore(self.root)
+        path = self.store.get_path('futures', 'nymex', 'CL', '201203')
+        entries = []
+        for date in DATES:
+            outdir = tick_partition.get_day_path(path, date)
+            tick_partition.make_dirs(outdir)
+            entries.append(tick_writer.write_array(
+                os.path.join(outdir, 'CL.tkb'), make_day(date, 3, 100.0)))
+        if manifest:
+            tick_writer.update_manifest(entries)
+
+    def check_reads(self):
+        """Assert each read of the whole tree finds every tick."""
+        args = ['futures', 'nymex', 'CL', '201203']
+        self.assertEqual(len(self.store.read(*args)), 6)
+        self.assertEqual(len(self.store.read(*args, end=DATES[1])), 3)
+        self.assertEqual(len(self.store.read(*args, start=DATES[1])), 3)
+        self.assertEqual(len(self.store.read_window(*args)), 6)
+
+    def test_manifest(self):
+        self.write_days(True)
+        self.check_reads()
+
+    def test_no_manifest(self):
+        self.write_days(False)
+        self.check_reads()
@@ -0,0 +1,30 @@
+"""Tests of the bulk text partition parser."""
+
+import numpy
+
+from tests import TickTestCase
+
+import tick_binary
+import tick_text
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+LINES = ['1325595600.000000 1.0 2.0 0.5 1.5 10 2 1.25 0',
+         '1325595660.000000 1.5 2.5 1.0 2.0 20 3 1.75 0']
+
+
+class ParseTest(TickTestCase):
+    """Text parses as numpy.loadtxt parsed it."""
+
+    def test_blank_lines(self):
+        text = '\n' + LINES[0] + '\n\n  \n' + LINES[1] + '\n\n'
+        data = tick_text.parse(text, tick_binary.RECORDTYPE)
+        self.assertEqual(len(data), 2)
+        numpy.testing.assert_array_equal(data['volume'], [10, 20])
+
+    def test_short_line(self):
+        text = LINES[0] + '\n' + LINES[1].rsplit(' ', 1)[0] + '\n'
+        self.assertRaises(ValueError, tick_text.parse, text,
+                          tick_binary.RECORDTYPE)
@@ -0,0 +1,49 @@
+"""Tests of atomic partition writes."""
+
+import os
+
+from tests import TickTestCase
+
+import tick_writer
+
+__author__ = "Todd Minehardt"
+__copyright__ = "Copyright 2011, 2012 bicycle trading, llc"
+__email__ = "todd@bicycletrading.com"
+
+
+class AtomicWriteTest(TickTestCase):
+    """A write replaces the target whole or leaves it untouched."""
+
+    def setUp(self):
+        TickTestCase.setUp(self)
+        self.filename = os.path.join(self.root, 'CL.tkb')
+        tick_writer.write_atomic(self.filename, 'old')
+
+    def read(self):
+        """Return the contents of the target."""
+        with open(self.filename, 'rb') as infile:
+            return infile.read()
+
+    def test_replace(self):
+        dirs = set()
+        tick_writer.write_atomic(self.filename, 'new', dirs=dirs)
+        self.assertEqual(self.read(), 'new')
+        self.assertEqual(dirs, set([os.path.abspath(self.root)]))
+        tick_writer.sync_dirs(dirs)
+        self.assertEqual(dirs, set())
+        self.assertEqual(os.listdir(self.root), ['CL.tkb'])
+
+    def test_failure(self):
+        fsync = os.fsync
+
+        def failing(fd):
+            raise OSError('fsync failed')
+
+        os.fsync = failing
+        try:
+            self.assertRaises(OSError, tick_writer.write_atomic,
+                              self.filename, 'new')
+        finally:
+            os.fsync = fsync
+        self.assertEqual(self.read(), 'old')
+        self.assertEqual(os.listdir(self.root), ['CL.tkb'])